@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Keyword Classifier Microbenchmark
+Task analysis cost of the legacy per-check prompt.lower() chain versus the
+KeywordClassifier single lowercase pass, with a compiled alternation regex for reference
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_team_router import KeywordClassifier, TASK_KEYWORDS
+
+def make_prompt(size):
+    """A pasted spreadsheet: comma-separated numbers with a request at the end"""
+    cells = []
+    length = 0
+    while length < size:
+        cell = str(random.randint(0, 99999))
+        cells.append(cell)
+        length += len(cell) + 1
+    return ",".join(cells)[:max(0, size - 40)] + "\nSummarize this Excel sheet for me."
+
+def legacy_analysis(prompt):
+    """The pre-classifier _analyze_task, _estimate_complexity, _identify_domain and select checks"""
+    score = 3
+    if "simple" in prompt.lower():
+        score -= 1
+    if "complex" in prompt.lower() or "refactor" in prompt.lower():
+        score += 2
+    prompt_lower = prompt.lower()
+    if "vue" in prompt_lower or "react" in prompt_lower:
+        domain = "coding"
+    elif "laravel" in prompt_lower or "php" in prompt_lower:
+        domain = "coding"
+    elif "excel" in prompt_lower or "vba" in prompt_lower or "150k" in prompt_lower:
+        domain = "enterprise"
+    elif "data" in prompt_lower or "pandas" in prompt_lower:
+        domain = "data"
+    elif "image" in prompt_lower or "screenshot" in prompt_lower:
+        domain = "visual"
+    else:
+        domain = "coding"
+    needs_vision = "image" in prompt.lower() or "screenshot" in prompt.lower()
+    needs_uncensored = "uncensored" in prompt.lower()
+    needs_338 = "php" in prompt.lower() or "laravel" in prompt.lower()
+    # select_team_member re-lowered the prompt for its vue/react checks
+    is_react_vue = "react" in prompt.lower() or "vue" in prompt.lower()
+    is_react_vue = "vue" in prompt.lower() or "react" in prompt.lower()
+    return score, domain, needs_vision, needs_uncensored, needs_338, is_react_vue
+
+def build_regex():
+    """Overlap-safe alternation: a lookahead at every position, as the flag set needs substring semantics"""
+    owner = {}
+    for flag, words in TASK_KEYWORDS.items():
+        for word in words:
+            owner[word] = flag
+    pattern = re.compile("(?=(" + "|".join(re.escape(w) for w in owner) + "))", re.IGNORECASE)
+    return lambda prompt: {owner[m.group(1).lower()] for m in pattern.finditer(prompt)}
+
+def measure(fn, prompt, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(prompt)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    random.seed(42)
+    classifier = KeywordClassifier()
+    regex_classify = build_regex()
+
+    print("=" * 70)
+    print("🔤 KEYWORD CLASSIFIER MICROBENCHMARK (µs per prompt, median)")
+    print("=" * 70)
+    print(f"{'size':>10} {'legacy':>12} {'classifier':>12} {'regex':>12} {'speedup':>10}")
+
+    for size in (100, 1_000, 10_000, 100_000, 1_000_000):
+        prompt = make_prompt(size)
+        assert set(classifier.classify(prompt)) == regex_classify(prompt)
+        repeats = 2000 if size <= 10_000 else 20
+
+        legacy = measure(legacy_analysis, prompt, repeats) * 1e6
+        single = measure(classifier.classify, prompt, repeats) * 1e6
+        regex = measure(regex_classify, prompt, repeats) * 1e6
+        print(f"{size:>10} {legacy:>11.1f}µ {single:>11.1f}µ {regex:>11.1f}µ {legacy / single:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Streaming Overhead Microbenchmark
+Per-token cost of the legacy generate_streaming loop (json.loads + string +=)
+versus the TokenStream path (fast-path slicing + opt-in list accumulation)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_team_router import parse_stream_line
+
+WORDS = ["def", " the", " value", " =", " range", "(", "10", ")", ":\n", "    return", " naïve", " \"quoted\"", " <tag>"]
+
+def make_stream(n_tokens):
+    """Ollama-style compact NDJSON lines, ending with the done object"""
+    lines = []
+    for _ in range(n_tokens):
+        token = random.choice(WORDS)
+        lines.append(json.dumps(
+            {"model": "deepcoder:latest", "created_at": "2025-08-19T12:00:00.000000Z", "response": token, "done": False},
+            separators=(",", ":"), ensure_ascii=False
+        ).encode() + b"\n")
+    lines.append(json.dumps(
+        {"model": "deepcoder:latest", "response": "", "done": True, "eval_count": n_tokens},
+        separators=(",", ":")
+    ).encode() + b"\n")
+    return lines
+
+def legacy_loop(lines):
+    """The Phase 4C generate_streaming body: per-line clock reads, json.loads and +="""
+    full_response = ""
+    chunk_count = 0
+    start_time = time.time()
+    last_token_time = start_time
+    for line in lines:
+        current_time = time.time()
+        total_elapsed = current_time - start_time
+        time_since_token = current_time - last_token_time
+        if total_elapsed > 900 or time_since_token > 180:
+            break
+        if line:
+            last_token_time = current_time
+            chunk_count += 1
+            try:
+                chunk_data = json.loads(line)
+                if "response" in chunk_data:
+                    full_response += chunk_data["response"]
+                if chunk_data.get("done", False):
+                    return full_response
+            except json.JSONDecodeError:
+                continue
+    return full_response
+
+def token_stream_loop(lines, accumulate=True):
+    """The TokenStream body minus the socket read"""
+    parts = [] if accumulate else None
+    count = 0
+    for line in lines:
+        if len(line) <= 1:
+            continue
+        count += 1
+        token, chunk = parse_stream_line(line.rstrip())
+        if token and parts is not None:
+            parts.append(token)
+        if chunk is not None and chunk.get("done"):
+            break
+    return "".join(parts) if parts is not None else ""
+
+def measure(fn, lines, repeats=5):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(lines)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    random.seed(42)
+    print("=" * 70)
+    print("🌊 STREAMING OVERHEAD MICROBENCHMARK (µs per token, median of 5)")
+    print("=" * 70)
+    print(f"{'tokens':>10} {'legacy':>12} {'stream+acc':>12} {'stream':>12} {'speedup':>10}")
+    
+    for n_tokens in (1_000, 10_000, 100_000):
+        lines = make_stream(n_tokens)
+        assert legacy_loop(lines) == token_stream_loop(lines)
+        
+        legacy = measure(legacy_loop, lines) / n_tokens * 1e6
+        accumulated = measure(token_stream_loop, lines) / n_tokens * 1e6
+        plain = measure(lambda l: token_stream_loop(l, accumulate=False), lines) / n_tokens * 1e6
+        print(f"{n_tokens:>10} {legacy:>11.2f}µ {accumulated:>11.2f}µ {plain:>11.2f}µ {legacy / accumulated:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
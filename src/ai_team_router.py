@@ -4,21 +4,33 @@
 import os
 import sys
 import asyncio
+import hashlib
 import json
 import logging
+import math
+import re
+import sqlite3
+from bisect import bisect_left
 import time
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 from dataclasses import dataclass
 from enum import Enum
 from datetime import datetime
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
 
 # PHASE 4B: Replace aiohttp with requests (proven HTTP fixes)
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+# Async client: same retry/pooling/timeout profile, without blocking the event loop
+import aiohttp
 import psutil
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 
@@ -43,7 +55,142 @@ MEMORY_OVERHEAD_GB = 0.5 if IS_M3_PRO else 0.3  # Reduced from 1.5/1.0
 MEMORY_SAFETY_BUFFER_GB = 0.5 if IS_M3_PRO else 0.3  # Reduced from 1.0/0.5
 MEMORY_EDGE_MODE = True  # Allow over-edge operation with warnings
 MEMORY_EDGE_LIMIT_GB = 4.0  # Allow up to 4GB over-memory
+
+_DURATION_UNITS_S = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+def keep_alive_seconds(keep_alive):
+    """Seconds Ollama keeps an idle model for a keep_alive value ("30m", "1h30m", "300"; negative = forever)"""
+    text = str(keep_alive).strip()
+    try:
+        seconds = float(text)
+    except ValueError:
+        parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", text)
+        if not parts or "".join(n + u for n, u in parts) != text.lstrip("-"):
+            raise ValueError(f"Unrecognised keep_alive duration: {keep_alive!r}")
+        seconds = sum(float(n) * _DURATION_UNITS_S[u] for n, u in parts)
+        if text.startswith("-"):
+            seconds = -seconds
+    return math.inf if seconds < 0 else seconds
+
+# Warm residency: keep recently used models loaded instead of unloading after every request
+MODEL_KEEP_ALIVE = os.getenv("MODEL_KEEP_ALIVE", "30m")  # Passed to Ollama so it does not evict behind our back
+MODEL_IDLE_TTL_S = keep_alive_seconds(MODEL_KEEP_ALIVE)  # Our view of residency expires when Ollama's does
+MODEL_RESIDENCY_BUDGET_GB = float(os.getenv("MODEL_RESIDENCY_BUDGET_GB", str(max(1.0, TOTAL_MEMORY_GB - 4.0))))
+DEFAULT_NUM_CTX = 2048  # Phase 4A proven value - load and generate must agree or Ollama reloads
+NUM_CTX_STEPS = (2048, 4096, 8192, 16384, 32768, 65536, 131072)  # Few distinct sizes keep reloads rare
+NUM_CTX_HEADROOM = 1.25  # Token estimates from character counts run low on code and numbers
+NUM_CTX_OUTPUT_RESERVE = 1024  # Room for the answer when the request sets no num_predict
+DEFAULT_KV_CACHE_MB_PER_1K_TOKENS = 128.0  # ~8B model with grouped-query attention at f16
+CO_RESIDENCY_MIN_SHARE = 0.05  # Members below this traffic share are never pinned
+CO_RESIDENCY_DRIFT = 0.2  # Replan when traffic shares move this far (L1) from the last plan
+
+# Unload completion is detected from /api/ps and the memory slope, not fixed sleeps
+UNLOAD_MAX_WAIT_S = 10.0  # Upper bound per signal; normally returns in well under a second
+UNLOAD_FORCE_WAIT_S = 2.0
+UNLOAD_POLL_INTERVAL_S = 0.1
+MEMORY_SETTLE_EPSILON_GB = 0.05  # Rise per poll below which release is considered finished
+
+# Affinity queue: drain work for the loaded model first, but never hold a request longer than this
+QUEUE_MAX_WAIT_S = float(os.getenv("QUEUE_MAX_WAIT_S", "120"))
+
+# Scheduling: priority classes first, then shortest expected job; waiting promotes a request one class per interval
+PRIORITY_CLASSES = {"high": 0, "normal": 1, "low": 2}
+PRIORITY_AGING_S = float(os.getenv("PRIORITY_AGING_S", "30"))
+DEFAULT_LOAD_S_PER_GB = 2.5  # Cold-load estimate until a member has been observed
+DEFAULT_GENERATION_S_PER_GB = 6.0  # Generation estimate at complexity 3 until observed
+
+# Admission control: queued work that cannot finish within its deadline is rejected with 429 up front
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_DEADLINE_S = float(os.getenv("ADMISSION_DEADLINE_S", "300"))  # Per request: context["deadline_s"]
+
+# Predictive preloading from request-history transitions
+REQUEST_HISTORY_SIZE = 1000
+PRELOAD_IDLE_S = float(os.getenv("PRELOAD_IDLE_S", "60"))  # Router must be idle this long before preloading
+PRELOAD_CHECK_INTERVAL_S = 15.0
+PRELOAD_MIN_CONFIDENCE = float(os.getenv("PRELOAD_MIN_CONFIDENCE", "0.4"))
+
+# Exact-match response cache (deterministic requests only: temperature 0 or context["cache"] = True)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", "86400"))
+RESPONSE_CACHE_DISK_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_DISK_MAX_ENTRIES", "10000"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "cache/response_cache.sqlite3")  # Empty disables the disk tier
+
+# Task analysis keywords: flag -> case-insensitive substrings that raise it
+TASK_KEYWORDS = {
+    "vue_react": ("vue", "react"),
+    "php": ("laravel", "php"),
+    "enterprise": ("excel", "vba", "150k"),
+    "data": ("data", "pandas"),
+    "visual": ("image", "screenshot"),
+    "uncensored": ("uncensored",),
+    "simple": ("simple",),
+    "complex": ("complex", "refactor"),
+}
+
+# Team registry: members and per-domain BEST/QUICK/FALLBACK lists, reloaded when the file changes
+TEAM_CONFIG_PATH = os.getenv(
+    "TEAM_CONFIG_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "configs", "team.json")
+)
+TEAM_CONFIG_POLL_S = float(os.getenv("TEAM_CONFIG_POLL_S", "5"))
+ROUTE_GROUPS = ("best", "quick", "fallback")
+
+# Background memory sampler: routing reads the latest sample instead of querying psutil per call
+MEMORY_SAMPLE_INTERVAL_S = float(os.getenv("MEMORY_SAMPLE_INTERVAL_S", "0.5"))
+MEMORY_SAMPLE_BUFFER = int(os.getenv("MEMORY_SAMPLE_BUFFER", "1200"))  # 10 minutes at the default rate
+MEMORY_SAMPLE_MAX_AGE_S = 2.0  # Older than this (sampler not running) -> sample on demand
+MEMORY_TREND_WINDOW_S = 10.0
+MEMORY_TREND_HORIZON_S = 5.0  # Routing discounts memory that a falling trend will consume this soon
+
+# Learned per-member statistics (load time, footprint, ...) survive restarts here; empty disables
+MEMBER_STATS_PATH = os.getenv("MEMBER_STATS_PATH", "cache/member_stats.json")
+MEMBER_STATS_SAVE_INTERVAL_S = 30.0
+MIN_FOOTPRINT_DELTA_GB = 0.1  # Smaller memory deltas around a load are noise, not a measurement
+
+# Per-request phase timings: fixed log-spaced buckets (10ms to ~44min, two per doubling) keep every
+# histogram a constant size however many requests it has seen
+LATENCY_PHASES = ("queue_wait", "analysis", "unload", "load", "prompt_eval", "first_token", "generation", "total")
+LATENCY_BUCKETS_S = tuple(round(0.01 * 2 ** (i / 2), 4) for i in range(37))
+
+# Adaptive timeouts: derived from each member's observed load times and throughput once enough samples exist
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = 5
+TIMEOUT_SLACK = 2.0  # Multiplier over the pessimistic (p95 time / p5 rate) estimate
+TIMEOUT_FLOOR_S = 30.0
+TIMEOUT_CEILING_S = 900.0
+NO_TOKEN_FLOOR_S = 15.0
+NO_TOKEN_CEILING_S = 180.0
+CHARS_PER_TOKEN = 4  # Rough token estimate for prompts and responses
+DEFAULT_OUTPUT_TOKENS = 1024
+DEFAULT_PROMPT_TOKENS_PER_S = 100.0
+
+# Member selection: "tiers" walks BEST -> QUICK -> FALLBACK; "latency" scores every admissible
+# candidate by estimated end-to-end seconds minus quality (per-domain seconds per quality unit)
+SELECTION_MODE = os.getenv("SELECTION_MODE", "tiers")
+ROUTE_GROUP_QUALITY = {"BEST": 1.0, "QUICK": 0.7, "FALLBACK": 0.4}
+PRIORITY_QUALITY_SCALE = {"high": 1.5, "normal": 1.0, "low": 0.5}
+DEFAULT_QUALITY_WEIGHT_S = {"coding": 150.0, "enterprise": 150.0, "data": 120.0, "visual": 100.0, "default": 100.0}
+DEFAULT_UNLOAD_S = 2.0
+
 OLLAMA_API_BASE = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
+# Backend pool: comma-separated base URLs; "url=24" gives an instance its own 24GB budget. At most one
+# bare URL: it uses this host's sampled memory, so a second instance here needs an explicit share
+OLLAMA_BACKENDS = os.getenv("OLLAMA_BACKENDS", OLLAMA_API_BASE)
+
+# Circuit breaker per backend: fail fast after consecutive timeouts, connection errors or 5xx
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_RESET_S = float(os.getenv("CIRCUIT_RESET_S", "30"))
+
+# Hedging: a request with no first token after this percentile of the member's history races a
+# backup attempt (same member on another backend, else a smaller resident member)
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "0") == "1"  # Per request: context["hedge"]
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY_S = float(os.getenv("HEDGE_MIN_DELAY_S", "1.0"))
+
+# Speculative drafts: while a cold member loads, a resident tiny member streams a labelled draft
+SPECULATIVE_DRAFT = os.getenv("SPECULATIVE_DRAFT", "0") == "1"  # Per request: context["draft"]
+DRAFT_MEMBERS = tuple(m.strip() for m in os.getenv("DRAFT_MEMBERS", "gemma_tiny,granite_moe").split(",") if m.strip())
+DRAFT_MAX_TOKENS = int(os.getenv("DRAFT_MAX_TOKENS", "256"))
 
 class TeamRole(Enum):
     SENIOR_ENGINEER = "senior_engineer"
@@ -67,6 +214,7 @@ class TeamMember:
     performance_rating: int
     is_abliterated: bool = False
     tool_integration: Dict[str, bool] = None
+    kv_cache_mb_per_1k_tokens: float = DEFAULT_KV_CACHE_MB_PER_1K_TOKENS
     
     def __post_init__(self):
         if self.tool_integration is None:
@@ -78,22 +226,223 @@ class TeamMember:
                 "vision": "vision" in self.model_id.lower()
             }
 
+@dataclass(frozen=True)
+class RoutingTable:
+    """Immutable snapshot of the team and its routes; replaced whole, never mutated"""
+    members: Mapping[str, TeamMember]
+    routes: Mapping[str, Tuple[Tuple[Optional[str], Tuple[Tuple[str, Tuple[str, ...]], ...]], ...]]
+    emergency_fallback: str
+    version: int
+    quality_weight_s: Mapping[str, float]
+    
+    def groups_for(self, domain, flags):
+        """(group_name, member_ids) pairs for a domain; flag-specific variants win over the plain route"""
+        for flag, groups in self.routes.get(domain, self.routes["default"]):
+            if flag is None or flag in flags:
+                return groups
+        return self.routes["default"][-1][1]
+
+class TeamRegistry:
+    """Team members and routing lists loaded from a config file, swapped atomically when it changes"""
+    
+    def __init__(self, path=TEAM_CONFIG_PATH):
+        self.path = path
+        self._signature = None
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_error = None
+        self.table = self._load(version=1)
+    
+    @staticmethod
+    def parse(config, version):
+        """Validate a config dict and precompute its routing table; raises ValueError when invalid"""
+        members = {}
+        for member_id, spec in config["members"].items():
+            members[member_id] = TeamMember(
+                name=spec["name"],
+                model_id=spec["model_id"],
+                memory_gb=float(spec["memory_gb"]),
+                context_tokens=int(spec["context_tokens"]),
+                roles=[TeamRole(role) for role in spec.get("roles", [])],
+                expertise=list(spec.get("expertise", [])),
+                special_abilities=dict(spec.get("special_abilities", {})),
+                performance_rating=int(spec["performance_rating"]),
+                is_abliterated=bool(spec.get("is_abliterated", False)),
+                kv_cache_mb_per_1k_tokens=float(spec.get("kv_cache_mb_per_1k_tokens", DEFAULT_KV_CACHE_MB_PER_1K_TOKENS))
+            )
+        
+        emergency_fallback = config.get("emergency_fallback", "gemma_tiny")
+        if emergency_fallback not in members:
+            raise ValueError(f"emergency_fallback {emergency_fallback!r} is not a team member")
+        
+        routes = {}
+        for route_key, spec in config["routes"].items():
+            domain, _, flag = route_key.partition(":")
+            groups = []
+            for group in ROUTE_GROUPS:
+                member_ids = tuple(spec.get(group, []))
+                unknown = [m for m in member_ids if m not in members]
+                if unknown:
+                    raise ValueError(f"route {route_key!r} references unknown members {unknown}")
+                groups.append((group.upper(), member_ids))
+            routes.setdefault(domain, []).append((flag or None, tuple(groups)))
+        if "default" not in routes:
+            raise ValueError("routes must include a 'default' entry")
+        
+        # Flag variants are checked in file order, the plain domain route last
+        ordered = {
+            domain: tuple(sorted(variants, key=lambda variant: variant[0] is None))
+            for domain, variants in routes.items()
+        }
+        return RoutingTable(
+            members=MappingProxyType(members),
+            routes=MappingProxyType(ordered),
+            emergency_fallback=emergency_fallback,
+            version=version,
+            quality_weight_s=MappingProxyType({
+                **DEFAULT_QUALITY_WEIGHT_S,
+                **{domain: float(weight) for domain, weight in config.get("quality_weight_s", {}).items()}
+            })
+        )
+    
+    def _stat_signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _load(self, version):
+        signature = self._stat_signature()
+        with open(self.path) as f:
+            table = self.parse(json.load(f), version)
+        self._signature = signature
+        return table
+    
+    def reload_if_changed(self):
+        """Swap in a new table when the file changed; a bad file keeps the current table"""
+        try:
+            signature = self._stat_signature()
+        except OSError as e:
+            logger.warning(f"Team config unavailable, keeping version {self.table.version}: {e}")
+            return False
+        if signature == self._signature:
+            return False
+        
+        try:
+            table = self._load(version=self.table.version + 1)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._signature = signature  # Do not retry the same broken file every poll
+            self.reload_errors += 1
+            self.last_error = str(e)
+            logger.error(f"❌ Team config rejected, keeping version {self.table.version}: {e}")
+            return False
+        
+        # One reference assignment: readers see the old table or the new one, never a mix
+        self.table = table
+        self.reloads += 1
+        logger.info(f"🔁 Team config reloaded: version {table.version}, {len(table.members)} members")
+        return True
+    
+    def snapshot(self):
+        return {
+            "path": self.path,
+            "version": self.table.version,
+            "members": len(self.table.members),
+            "routes": sorted(
+                f"{domain}:{flag}" if flag else domain
+                for domain, variants in self.table.routes.items()
+                for flag, _ in variants
+            ),
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_error": self.last_error
+        }
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one Ollama backend.
+    
+    Opens after failure_threshold timeouts, connection errors or 5xx responses in a row and fails
+    fast for reset_s; then half-open, where one trial request closes or reopens it.
+    """
+    
+    def __init__(self, name="ollama", failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_s=CIRCUIT_RESET_S):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+    
+    def available(self, now=None):
+        """Whether a request would be let through, without claiming the half-open trial"""
+        now = now or time.time()
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return now - self.opened_at >= self.reset_s
+        return now - self.trial_started_at >= self.reset_s  # A trial that never reported is replaced
+    
+    def allow(self):
+        now = time.time()
+        if not self.available(now):
+            self.rejected += 1
+            return False
+        if self.state != "closed":
+            self.state = "half_open"
+            self.trial_started_at = now
+        return True
+    
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"🟢 CIRCUIT CLOSED: {self.name} recovered")
+        self.state = "closed"
+        self.failures = 0
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+                logger.warning(f"🔴 CIRCUIT OPEN: {self.name} after {self.failures} failure(s), failing fast for {self.reset_s:.0f}s")
+            self.state = "open"
+            self.opened_at = time.time()
+    
+    def rejection(self):
+        """Result dict for a request refused while open"""
+        return {
+            "success": False,
+            "error": f"Circuit open for {self.name}",
+            "circuit_open": True,
+            "response_time": 0.0
+        }
+    
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected
+        }
+
 class OptimizedHTTPClient:
     """Optimized HTTP client for Ollama connections - Phase 4B Integration"""
     
     def __init__(self, base_url="http://localhost:11434", max_retries=2):
         self.base_url = base_url
+        self.breaker = CircuitBreaker(base_url)
         self.session = self._create_optimized_session(max_retries)
         
     def _create_optimized_session(self, max_retries):
         """Create session with optimized connection settings"""
         session = requests.Session()
     
-        # Configure retry strategy (Phase 4A proven configuration)
+        # Configure retry strategy (Phase 4A proven configuration). POST is not retried: a resent
+        # /api/generate runs the whole generation again behind the one that stalled
         retry_strategy = Retry(
             total=max_retries,
             status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
+            allowed_methods=["HEAD", "GET", "OPTIONS"],
             backoff_factor=0.5  # 0.5s exponential backoff
         )        
         
@@ -127,6 +476,10 @@ class OptimizedHTTPClient:
             "options": options or {}
         }
         
+        if not self.breaker.allow():
+            logger.warning(f"⛔ {model_id}: circuit open for {self.base_url}, failing fast")
+            return self.breaker.rejection()
+        
         start_time = time.time()
         
         try:
@@ -144,6 +497,7 @@ class OptimizedHTTPClient:
             logger.info(f"HTTP response received in {connection_time:.1f}s")
             
             if response.status_code == 200:
+                self.breaker.record_success()
                 try:
                     result = response.json()
                     total_time = time.time() - start_time
@@ -152,7 +506,8 @@ class OptimizedHTTPClient:
                         "success": True,
                         "response": result.get("response", ""),
                         "response_time": total_time,
-                        "connection_time": connection_time
+                        "connection_time": connection_time,
+                        "stats": ollama_stats(result)
                     }
                 except json.JSONDecodeError as e:
                     logger.error(f"JSON decode error: {e}")
@@ -162,6 +517,8 @@ class OptimizedHTTPClient:
                         "response_time": time.time() - start_time
                     }
             else:
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
                 logger.error(f"HTTP error: {response.status_code} - {response.text}")
                 return {
                     "success": False,
@@ -170,6 +527,7 @@ class OptimizedHTTPClient:
                 }
                 
         except requests.exceptions.Timeout as e:
+            self.breaker.record_failure()
             total_time = time.time() - start_time
             logger.error(f"Request timeout after {total_time:.1f}s: {e}")
             return {
@@ -178,6 +536,7 @@ class OptimizedHTTPClient:
                 "response_time": total_time
             }
         except requests.exceptions.ConnectionError as e:
+            self.breaker.record_failure()
             total_time = time.time() - start_time
             logger.error(f"Connection error after {total_time:.1f}s: {e}")
             return {
@@ -208,432 +567,3008 @@ class OptimizedHTTPClient:
         if self.session:
             self.session.close()
 
-class AITeamRouter:
-    def __init__(self):
-        self.active_member = None
-        self.team_members = self._initialize_team()
-        self.request_history = []
-        self.performance_metrics = {}
-        self.emergency_mode = False
-        self.min_system_memory_gb = 2.0
-        
-        # PHASE 4B: Initialize OptimizedHTTPClient
-        self.ollama_client = OptimizedHTTPClient(OLLAMA_API_BASE)
-        
-        logger.info(f"Router initialized with {len(self.team_members)} members")
-        logger.info("🚀 Phase 4B: Using OptimizedHTTPClient with proven HTTP fixes")
-    
-    def _initialize_team(self):
-        return {
-            "deepcoder_primary": TeamMember(
-                name="DeepCoder Prime",
-                model_id="deepcoder:latest",
-                memory_gb=9.0,
-                context_tokens=32768,
-                roles=[TeamRole.SENIOR_ENGINEER, TeamRole.ARCHITECT],
-                expertise=["vuejs", "react", "python", "refactoring"],
-                special_abilities={"code_generation": "expert"},
-                performance_rating=9
-            ),
-            "qwen_analyst": TeamMember(
-                name="Qwen Data Master",
-                model_id="qwen2.5:14b",
-                memory_gb=9.0,
-                context_tokens=32768,
-                roles=[TeamRole.DATA_SCIENTIST, TeamRole.ANALYST],
-                expertise=["excel", "vba", "pandas", "150k_rows"],
-                special_abilities={"excel_optimization": "expert"},
-                performance_rating=9
-            ),
-            "deepseek_legacy": TeamMember(
-                name="DeepSeek Legacy",
-                model_id="deepseek-coder-v2:16b",
-                memory_gb=8.9,
-                context_tokens=128000,
-                roles=[TeamRole.SENIOR_ENGINEER],
-                expertise=["laravel", "php", "338_languages"],
-                special_abilities={"language_support": 338},
-                performance_rating=8
-            ),
-            "granite_enterprise": TeamMember(
-                name="Granite Enterprise",
-                model_id="granite3.3:8b",
-                memory_gb=4.9,
-                context_tokens=4096,
-                roles=[TeamRole.ENTERPRISE_SPECIALIST],
-                expertise=["enterprise", "production_reports"],
-                special_abilities={"enterprise_patterns": "expert"},
-                performance_rating=7
-            ),
-            "granite_vision": TeamMember(
-                name="Granite Vision",
-                model_id="granite3.2-vision:2b",
-                memory_gb=2.4,
-                context_tokens=4096,
-                roles=[TeamRole.VISION_SPECIALIST],
-                expertise=["ocr", "screenshots", "image_analysis"],
-                special_abilities={"vision": True},
-                performance_rating=8
-            ),
-            "mistral_versatile": TeamMember(
-                name="Mistral Versatile",
-                model_id="mistral:latest",
-                memory_gb=4.4,
-                context_tokens=8192,
-                roles=[TeamRole.JUNIOR_ENGINEER, TeamRole.DOCUMENTARIAN],
-                expertise=["general", "documentation"],
-                special_abilities={"versatility": "high"},
-                performance_rating=7
-            ),
-            "gemma_medium": TeamMember(
-                name="Gemma Medium",
-                model_id="gemma3:4b",
-                memory_gb=3.3,
-                context_tokens=8192,
-                roles=[TeamRole.JUNIOR_ENGINEER],
-                expertise=["general", "quick_tasks"],
-                special_abilities={"speed": "fast"},
-                performance_rating=6
-            ),
-            "granite_moe": TeamMember(
-                name="Granite MoE",
-                model_id="granite3.1-moe:3b",
-                memory_gb=2.0,
-                context_tokens=4096,
-                roles=[TeamRole.JUNIOR_ENGINEER],
-                expertise=["efficient", "quick_responses"],
-                special_abilities={"mixture_of_experts": True},
-                performance_rating=6
-            ),
-            "gemma_tiny": TeamMember(
-                name="Gemma Tiny",
-                model_id="gemma3:1b",
-                memory_gb=0.8,
-                context_tokens=8192,
-                roles=[TeamRole.JUNIOR_ENGINEER],
-                expertise=["simple_tasks", "quick_responses"],
-                special_abilities={"minimal_memory": True},
-                performance_rating=5
-            ),
-            "deepseek_abliterated": TeamMember(
-                name="DeepSeek Uncensored",
-                model_id="huihui_ai/deepseek-r1-abliterated:latest",
-                memory_gb=5.0,
-                context_tokens=32768,
-                roles=[TeamRole.SENIOR_ENGINEER],
-                expertise=["uncensored", "research"],
-                special_abilities={"uncensored": True},
-                performance_rating=8,
-                is_abliterated=True
-            ),
-            "dolphin_abliterated": TeamMember(
-                name="Dolphin Uncensored",
-                model_id="huihui_ai/dolphin3-abliterated:latest",
-                memory_gb=4.9,
-                context_tokens=32768,
-                roles=[TeamRole.SENIOR_ENGINEER],
-                expertise=["uncensored", "creative"],
-                special_abilities={"uncensored": True},
-                performance_rating=7,
-                is_abliterated=True
-            )
-        }
-    
-    def _get_available_memory_gb(self) -> float:
-        """M3-specific calculation with pressure-based adjustment"""
-        mem = psutil.virtual_memory()
+class AsyncOptimizedHTTPClient:
+    """Asyncio-native Ollama client with the OptimizedHTTPClient retry, pooling and timeout profile"""
     
-        # Base available memory minus overhead
-        available = (mem.available / (1024 ** 3)) - MEMORY_OVERHEAD_GB
+    def __init__(self, base_url="http://localhost:11434", max_retries=2, backoff_factor=0.5):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.breaker = CircuitBreaker(base_url)
+        self.session = None
     
-        # M3 Pro pressure-based adjustments (balanced for better routing)
-        if IS_M3_PRO:
-            if mem.percent > 90:
-                available *= 0.8  # 20% reduction (critical only)
-                logger.warning(f"High memory pressure {mem.percent}% - reducing available to {available:.1f}GB")
-            elif mem.percent > 85:
-                available *= 0.9  # 10% reduction (high pressure)
-                logger.info(f"Memory pressure {mem.percent}% - reducing available to {available:.1f}GB")
-            elif mem.percent > 75:
-                available *= 0.95  # 5% reduction (moderate)
-        else:
-            # Non-M3 systems - simpler pressure handling
-            if mem.percent > 80:
-                available *= 0.8
+    def _get_session(self):
+        """Create the pooled session lazily - aiohttp sessions must be bound to a running loop"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=10,              # Matches pool_maxsize=10
+                limit_per_host=10,
+                keepalive_timeout=60
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    'Content-Type': 'application/json',
+                    'User-Agent': 'AI-Team-Router-Phase4B/1.0'
+                }
+            )
+        return self.session
     
-        # Ensure we don't return negative values
-        return max(0.1, available)
+    async def _post(self, path, payload, timeout):
+        """POST with exponential backoff while the connection cannot be established.
+        
+        Once the request may have reached Ollama (disconnects, error statuses, timeouts) it is not
+        resent - a generation POST is not idempotent; the circuit breaker and hedging cover those.
+        """
+        session = self._get_session()
+        attempt = 0
+        while True:
+            try:
+                return await session.post(f"{self.base_url}{path}", json=payload, timeout=timeout)
+            except aiohttp.ClientConnectorError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_factor * (2 ** attempt)
+                logger.warning(f"Connection error ({e}) - retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
     
-    def _unload_model(self, model_id):
-        """Phase 4B: Synchronous unload with proven HTTP client"""
+    async def generate(self, model_id, prompt, timeout=600, stream=False, options=None, keep_alive=None):
+        """Send generation request with Phase 4A proven error handling"""
+        
+        payload = {
+            "model": model_id,
+            "prompt": prompt,
+            "stream": stream,
+            "options": options or {}
+        }
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        
+        if not self.breaker.allow():
+            logger.warning(f"⛔ {model_id}: circuit open for {self.base_url}, failing fast")
+            return self.breaker.rejection()
+        
+        start_time = time.time()
+        
         try:
-            unload_start_time = time.time()
-            logger.info(f"Unloading: {model_id}")
-            mem_before = psutil.virtual_memory().available
-            
-            # PHASE 4B: Use OptimizedHTTPClient instead of aiohttp
-            result = self.ollama_client.unload(model_id)
+            logger.info(f"HTTP Request: {model_id} (timeout: {timeout}s)")
             
-            if not result["success"]:
-                logger.warning(f"Unload request failed: {result.get('error', 'unknown')}")
-                return False
+            response = await self._post(
+                "/api/generate",
+                payload,
+                aiohttp.ClientTimeout(total=timeout)
+            )
             
-            # DATA-DRIVEN: Monitor memory release over time
-            if IS_M3_PRO:
-                # Check memory every 0.5 seconds up to 10 seconds
-                max_wait_time = 10.0  # Conservative timeout for large models (9GB)
-                check_interval = 0.5
-                target_release_gb = 0.5  # Minimum acceptable release
-                
-                memory_checks = []
-                elapsed = 0.0
-                
-                while elapsed < max_wait_time:
-                    time.sleep(check_interval)  # Synchronous sleep
-                    elapsed += check_interval
-                    
-                    current_mem = psutil.virtual_memory().available
-                    mem_released = (current_mem - mem_before) / (1024**3)
-                    
-                    memory_checks.append({
-                        "time": elapsed,
-                        "released_gb": mem_released,
-                        "available_gb": current_mem / (1024**3)
-                    })
-                    
-                    logger.info(f"  t={elapsed:.1f}s: Released {mem_released:.2f}GB")
-                    
-                    # Success condition: meaningful memory released
-                    if mem_released >= target_release_gb:
-                        total_unload_time = time.time() - unload_start_time
-                        logger.info(f"✅ SUCCESS: Model unloaded in {total_unload_time:.1f}s (released {mem_released:.2f}GB)")
-                        
-                        # Log timing data for future optimization
-                        logger.info(f"📊 TIMING DATA: {model_id} took {elapsed:.1f}s to release {mem_released:.2f}GB")
-                        
-                        # CRITICAL FIX: Memory stabilization wait (Phase 4A proven value)
-                        logger.info("🔄 MEMORY STABILIZATION: Waiting 10s for complete memory release...")
-                        time.sleep(10)
-                        
-                        return True
-                
-                # If we reach here, unload was insufficient - try force reset
-                final_mem = psutil.virtual_memory().available
-                final_released = (final_mem - mem_before) / (1024**3)
+            async with response:
+                connection_time = time.time() - start_time
+                logger.info(f"HTTP response received in {connection_time:.1f}s")
                 
-                logger.warning(f"⚠️ SLOW UNLOAD: {model_id} only released {final_released:.2f}GB in {max_wait_time}s")
-                logger.warning(f"📊 Memory progression: {[f't={c["time"]:.1f}s:{c["released_gb"]:.2f}GB' for c in memory_checks]}")
-                
-                # Force context reset as last resort
-                logger.info("🔄 Attempting force context reset...")
-                self._force_context_reset(model_id)
-                
-                # Final verification
-                time.sleep(2)
-                ultimate_mem = psutil.virtual_memory().available
-                ultimate_released = (ultimate_mem - mem_before) / (1024**3)
-                total_unload_time = time.time() - unload_start_time
-                
-                logger.info(f"🏁 FINAL: {model_id} released {ultimate_released:.2f}GB in {total_unload_time:.1f}s total")
-                return ultimate_released >= 0.2  # Accept minimal release
-            else:
-                # Non-M3 systems - simple wait
-                time.sleep(3)
-                return True
+                if response.status == 200:
+                    self.breaker.record_success()
+                    try:
+                        result = await response.json(content_type=None)
+                        total_time = time.time() - start_time
+                        logger.info(f"✅ Request completed in {total_time:.1f}s")
+                        return {
+                            "success": True,
+                            "response": result.get("response", ""),
+                            "response_time": total_time,
+                            "connection_time": connection_time,
+                            "stats": ollama_stats(result)
+                        }
+                    except json.JSONDecodeError as e:
+                        logger.error(f"JSON decode error: {e}")
+                        return {
+                            "success": False,
+                            "error": f"JSON decode error: {e}",
+                            "response_time": time.time() - start_time
+                        }
+                else:
+                    if response.status >= 500:
+                        self.breaker.record_failure()
+                    text = await response.text()
+                    logger.error(f"HTTP error: {response.status} - {text}")
+                    return {
+                        "success": False,
+                        "error": f"HTTP {response.status}: {text}",
+                        "response_time": time.time() - start_time
+                    }
                 
+        except asyncio.TimeoutError as e:
+            self.breaker.record_failure()
+            total_time = time.time() - start_time
+            logger.error(f"Request timeout after {total_time:.1f}s: {e}")
+            return {
+                "success": False,
+                "error": f"Timeout after {total_time:.1f}s: {e}",
+                "response_time": total_time
+            }
+        except aiohttp.ClientConnectionError as e:
+            self.breaker.record_failure()
+            total_time = time.time() - start_time
+            logger.error(f"Connection error after {total_time:.1f}s: {e}")
+            return {
+                "success": False,
+                "error": f"Connection error: {e}",
+                "response_time": total_time
+            }
         except Exception as e:
-            logger.error(f"Unload error: {e}")
-            return False
+            total_time = time.time() - start_time
+            logger.error(f"Unexpected error after {total_time:.1f}s: {e}")
+            return {
+                "success": False,
+                "error": f"Unexpected error: {e}",
+                "response_time": total_time
+            }
     
-    def _force_context_reset(self, model_id):
-        """Force full context reset for stubborn models - Phase 4B version"""
-        try:
-            # PHASE 4B: Use OptimizedHTTPClient for context reset
-            result = self.ollama_client.generate(
-                model_id=model_id,
-                prompt="",
-                timeout=10,
-                options={
-                    "num_ctx": 1,
-                    "num_gpu": 0,
-                    "num_threads": 1
-                }
-            )
-            
-            if result["success"]:
-                logger.info("🔄 Force context reset completed")
-            else:
-                logger.warning(f"Force context reset failed: {result.get('error', 'unknown')}")
-        except Exception as e:
-            logger.warning(f"Force context reset failed: {e}")
+    def stream_tokens(self, model_id, prompt, options=None, keep_alive=None, no_token_timeout=180,
+                      total_timeout=900, accumulate=False):
+        """Return a TokenStream - iterate it with `async for token in stream`"""
+        payload = {
+            "model": model_id,
+            "prompt": prompt,
+            "stream": True,
+            "options": options or {}
+        }
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return TokenStream(self, payload, no_token_timeout, total_timeout, accumulate)
     
-    def _analyze_task(self, prompt, context):
+    async def generate_streaming(self, model_id, prompt, no_token_timeout=180, options=None, total_timeout=900):
+        """Send streaming generation request with no-token and absolute timeouts"""
+        start_time = time.time()
+        stream = self.stream_tokens(
+            model_id, prompt, options=options, no_token_timeout=no_token_timeout,
+            total_timeout=total_timeout, accumulate=True
+        )
+        async for _ in stream:
+            pass
+        
+        elapsed = time.time() - start_time
+        if stream.error:
+            return {
+                "success": False,
+                "error": stream.error,
+                "response_time": elapsed,
+                "chunks_received": stream.chunk_count,
+                "partial_response": stream.text
+            }
+        logger.info(f"✅ STREAMING SUCCESS: {elapsed:.1f}s")
+        logger.info(f"📊 Response: {len(stream.text)} chars, {stream.chunk_count} chunks")
         return {
-            "complexity": self._estimate_complexity(prompt),
-            "domain": self._identify_domain(prompt, context),
-            "needs_vision": "image" in prompt.lower() or "screenshot" in prompt.lower(),
-            "needs_uncensored": "uncensored" in prompt.lower(),
-            "needs_large_context": len(prompt) > 3000,
-            "needs_338_languages": "php" in prompt.lower() or "laravel" in prompt.lower(),
-            "tool_requirements": {},
-            "priority": context.get("priority", "normal"),
-            "prompt": prompt  # Pass prompt for better model selection
+            "success": True,
+            "response": stream.text,
+            "response_time": elapsed,
+            "chunks": stream.chunk_count,
+            "method": "streaming",
+            "stats": stream.stats
         }
     
-    def _estimate_complexity(self, prompt):
-        score = 3
-        if "simple" in prompt.lower():
-            score -= 1
-        if "complex" in prompt.lower() or "refactor" in prompt.lower():
-            score += 2
-        if len(prompt) > 1000:
-            score += 1
-        return max(1, min(5, score))
-    
-    def _identify_domain(self, prompt, context):
-        prompt_lower = prompt.lower()
-        if "vue" in prompt_lower or "react" in prompt_lower:
-            return "coding"
-        if "laravel" in prompt_lower or "php" in prompt_lower:
-            return "coding"
-        if "excel" in prompt_lower or "vba" in prompt_lower or "150k" in prompt_lower:
-            return "enterprise"
-        if "data" in prompt_lower or "pandas" in prompt_lower:
-            return "data"
-        if "image" in prompt_lower or "screenshot" in prompt_lower:
-            return "visual"
-        return "coding"
+    async def list_running(self, timeout=5):
+        """Return the set of model names loaded in Ollama (/api/ps), or None if unavailable"""
+        sizes = await self.running_sizes(timeout)
+        return None if sizes is None else set(sizes)
     
-    def select_team_member(self, requirements):
-        available_memory = self._get_available_memory_gb()
-        logger.info(f"Selecting with {available_memory:.2f}GB available")
+    async def running_sizes(self, timeout=5):
+        """Return {model name: resident bytes} from /api/ps, or None if unavailable"""
+        try:
+            session = self._get_session()
+            async with session.get(f"{self.base_url}/api/ps", timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status != 200:
+                    return None
+                data = await response.json(content_type=None)
+        except (asyncio.TimeoutError, aiohttp.ClientError, json.JSONDecodeError) as e:
+            logger.debug(f"/api/ps unavailable: {e}")
+            return None
+        sizes = {}
+        for entry in data.get("models") or []:
+            for key in ("name", "model"):
+                if entry.get(key):
+                    sizes[entry[key]] = entry.get("size", 0)
+        return sizes
     
-        # Quality hierarchy: Best model slow > Quick model > Fallback
-        # Priority 1: Try to find the BEST model for the task (even if slow)
-        # Priority 2: Fall back to quick models if needed
-        # Priority 3: Emergency fallback to tiny model
+    async def unload(self, model_id, timeout=30):
+        """Send unload request (keep_alive=0 evicts the model immediately)"""
+        return await self.generate(
+            model_id=model_id,
+            prompt="",
+            timeout=timeout,
+            keep_alive=0
+        )
     
-        def get_model_priority_lists():
-            """Returns ordered lists: [best_models], [quick_models], [fallback_models]"""
-            domain = requirements["domain"]
+    async def close(self):
+        """Close the session"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+# Ollama stream lines look like {"model":...,"created_at":...,"response":"tok","done":false}.
+# Without a backslash the token cannot contain quotes or escapes, so it can be sliced out directly.
+_RESPONSE_KEY = b'"response":"'
+_NOT_DONE_TAIL = b'","done":false}'
+
+def parse_stream_line(line):
+    """Parse one NDJSON stream line.
     
-            if domain == "coding":
-                if "vue" in requirements.get("prompt", "").lower() or "react" in requirements.get("prompt", "").lower():
-                    return ["deepcoder_primary"], ["mistral_versatile", "gemma_medium"], ["gemma_tiny"]
-                elif requirements.get("needs_338_languages"):
-                    return ["deepseek_legacy"], ["mistral_versatile", "gemma_medium"], ["gemma_tiny"]
-                else:
-                    return ["deepcoder_primary", "deepseek_legacy"], ["mistral_versatile", "gemma_medium"], ["gemma_tiny"]
-            elif domain == "enterprise":
-                return ["qwen_analyst"], ["granite_enterprise", "mistral_versatile", "gemma_medium"], ["gemma_tiny"]
-            elif domain == "data": 
-                return ["qwen_analyst"], ["deepcoder_primary", "mistral_versatile"], ["gemma_tiny"]
-            elif domain == "visual":
-                return ["granite_vision"], ["gemma_medium"], ["gemma_tiny"]
-            else:
-                return ["deepcoder_primary", "mistral_versatile"], ["gemma_medium", "granite_moe"], ["gemma_tiny"]
+    Returns (token, chunk): chunk is the decoded object when a full parse was needed
+    (final chunk, escapes, errors, unexpected layout) and None on the fast path.
+    """
+    if line.endswith(_NOT_DONE_TAIL) and b"\\" not in line:
+        start = line.find(_RESPONSE_KEY)
+        if start != -1:
+            return line[start + len(_RESPONSE_KEY):-len(_NOT_DONE_TAIL)].decode("utf-8"), None
+    try:
+        chunk = json.loads(line)
+    except json.JSONDecodeError:
+        return "", None
+    return chunk.get("response", ""), chunk
+
+# Ollama's done object reports durations in nanoseconds
+_OLLAMA_DURATIONS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+_OLLAMA_COUNTS = ("prompt_eval_count", "eval_count")
+
+def ollama_stats(done):
+    """Ollama's own timings from a done object: durations in seconds, token counts and rates.
     
-        best_models, quick_models, fallback_models = get_model_priority_lists()
+    Returns {} when the server reported none (older Ollama, errors, fakes).
+    """
+    if not done:
+        return {}
+    stats = {f"{key}_s": done[key] / 1e9 for key in _OLLAMA_DURATIONS if done.get(key)}
+    stats.update({key: done[key] for key in _OLLAMA_COUNTS if key in done})
+    if stats.get("eval_count") and stats.get("eval_duration_s"):
+        stats["tokens_per_s"] = stats["eval_count"] / stats["eval_duration_s"]
+    if stats.get("prompt_eval_count") and stats.get("prompt_eval_duration_s"):
+        stats["prompt_tokens_per_s"] = stats["prompt_eval_count"] / stats["prompt_eval_duration_s"]
+    return stats
+
+class TokenStream:
+    """Async iterator over Ollama tokens with constant per-chunk work.
     
-        # Try models in order: best -> quick -> fallback
-        for priority_group, group_name in [(best_models, "BEST"), (quick_models, "QUICK"), (fallback_models, "FALLBACK")]:
-            for member_id in priority_group:
-                if member_id in self.team_members:
-                    member = self.team_members[member_id]
-                    required_memory = member.memory_gb + MEMORY_OVERHEAD_GB
+    Accumulation is opt-in and linear (list of parts joined once). After iteration,
+    `final` holds Ollama's done object and `error` any failure.
+    """
     
-                    if available_memory >= required_memory:
-                        logger.info(f"Selected {group_name} model: {member_id} ({member.name})")
-                        return member_id, member
-                    else:
-                        memory_deficit = required_memory - available_memory
-                        # AGGRESSIVE EDGE MODE: Allow larger deficits for BEST models only
-                        # Special priority for Vue/React tasks to get DeepCoder
-                        is_react_vue = "react" in requirements.get("prompt", "").lower() or "vue" in requirements.get("prompt", "").lower()
-                        if (group_name == "BEST" and memory_deficit < 6.0) or (is_react_vue and member_id == "deepcoder_primary" and memory_deficit < 8.0):
-                            logger.warning(f"AGGRESSIVE EDGE: Selected {member_id} with {memory_deficit:.1f}GB deficit for optimal routing")
-                            return member_id, member
-                        elif MEMORY_EDGE_MODE and memory_deficit < MEMORY_EDGE_LIMIT_GB:
-                            logger.warning(f"EDGE MODE: Selected {member_id} with {memory_deficit:.1f}GB deficit - expect 1-3 tokens/sec")
-                            return member_id, member
-                        else:
-                            logger.info(f"Skipped {member_id}: needs {required_memory:.1f}GB, have {available_memory:.1f}GB")
+    def __init__(self, client, payload, no_token_timeout=180, total_timeout=900, accumulate=False):
+        self.client = client
+        self.payload = payload
+        self.no_token_timeout = no_token_timeout
+        self.total_timeout = total_timeout
+        self.accumulate = accumulate
+        self.parts: List[str] = []
+        self.final: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.chunk_count = 0
+        self.first_token_time: Optional[float] = None
+        self.start_time = 0.0
     
-        # Emergency fallback - should never reach here
-        logger.error("No model could be selected - system may be unstable")
-        return "gemma_tiny", self.team_members["gemma_tiny"]
+    @property
+    def text(self):
+        return "".join(self.parts)
     
-    def _monitor_health(self):
-        """Monitor system health and prevent OOM crashes"""
-        mem = psutil.virtual_memory()
-        if mem.percent > 98:
-            logger.critical(f"CRITICAL MEMORY PRESSURE: {mem.percent}%")
-            if self.active_member:
-                # Emergency unload - synchronous in Phase 4B
-                self._unload_model(self.team_members[self.active_member].model_id)
-                self.active_member = None
-            return "gemma_tiny", self.team_members["gemma_tiny"]
-        return None
+    @property
+    def stats(self):
+        """Ollama's reported timings and token counts once the stream has finished"""
+        return ollama_stats(self.final)
     
-    async def route_request(self, prompt, context=None):
-        start_time = time.time()
-        context = context or {}
+    def __aiter__(self):
+        return self._iterate()
     
+    async def _iterate(self):
+        model_id = self.payload["model"]
+        self.start_time = time.time()
+        breaker = self.client.breaker
+        if not breaker.allow():
+            logger.warning(f"⛔ {model_id}: circuit open for {self.client.base_url}, failing fast")
+            self.error = breaker.rejection()["error"]
+            return
         try:
-            # Health monitoring - emergency fallback
-            health_issue = self._monitor_health()
-            if health_issue:
-                member_id, member = health_issue
-                logger.info(f"EMERGENCY MODE: Using {member.name} due to memory pressure")
+            logger.info(f"🌊 STREAMING Request: {model_id} (no-token timeout: {self.no_token_timeout}s)")
+            # sock_read enforces the no-token timeout between chunks, total the absolute limit
+            response = await self.client._post(
+                "/api/generate",
+                self.payload,
+                aiohttp.ClientTimeout(total=self.total_timeout, sock_connect=30, sock_read=self.no_token_timeout)
+            )
+            async with response:
+                if response.status != 200:
+                    if response.status >= 500:
+                        breaker.record_failure()
+                    text = await response.text()
+                    logger.error(f"HTTP error: {response.status} - {text}")
+                    self.error = f"HTTP {response.status}: {text}"
+                    return
+                breaker.record_success()
+                
+                parts = self.parts if self.accumulate else None
+                count = 0
+                async for line in response.content:
+                    if len(line) <= 1:
+                        continue
+                    count += 1
+                    token, chunk = parse_stream_line(line.rstrip())
+                    if token:
+                        if self.first_token_time is None:
+                            self.first_token_time = time.time() - self.start_time
+                        if parts is not None:
+                            parts.append(token)
+                        yield token
+                    if count % 500 == 0:
+                        logger.info(f"📦 {count} chunks ({time.time() - self.start_time:.1f}s elapsed)")
+                    if chunk is not None:
+                        if "error" in chunk:
+                            self.error = chunk["error"]
+                            self.chunk_count = count
+                            return
+                        if chunk.get("done"):
+                            self.final = chunk
+                            self.chunk_count = count
+                            return
+                self.chunk_count = count
+            
+            self.error = "Stream ended unexpectedly"
+            logger.warning(f"⚠️ Stream ended unexpectedly: {time.time() - self.start_time:.1f}s")
+        except asyncio.TimeoutError as e:
+            breaker.record_failure()
+            elapsed = time.time() - self.start_time
+            logger.warning(f"⏰ STREAMING TIMEOUT after {elapsed:.1f}s")
+            self.error = f"Streaming timeout after {elapsed:.1f}s: {e}"
+        except aiohttp.ClientError as e:
+            breaker.record_failure()
+            logger.error(f"Streaming error after {time.time() - self.start_time:.1f}s: {e}")
+            self.error = f"Streaming error: {e}"
+
+@dataclass
+class GenerationAttempt:
+    """One streamed generation for a request - the original or its hedge"""
+    member_id: str
+    member: TeamMember
+    backend: Any
+    stream: TokenStream
+    iterator: Any = None
+    first_token: Any = None  # Task resolving to the first token (StopAsyncIteration if none came)
+    holds_lock: bool = False  # A hedge or draft on another backend holds that backend's lock until finish
+    
+    def start(self):
+        self.iterator = self.stream.__aiter__()
+        self.first_token = asyncio.ensure_future(self.iterator.__anext__())
+        return self
+    
+    async def finish(self):
+        """Close the stream and hand back the backend lock a hedge took"""
+        await self.iterator.aclose()
+        if self.holds_lock:
+            self.holds_lock = False
+            self.backend.release()
+    
+    async def cancel(self):
+        """Stop the attempt; closing the generator drops the connection so Ollama abandons it"""
+        self.first_token.cancel()
+        try:
+            await self.first_token
+        except (asyncio.CancelledError, Exception):
+            pass  # Including StopAsyncIteration when it already finished
+        await self.finish()
+
+@dataclass
+class ResidentModel:
+    member_id: str
+    model_id: str
+    memory_gb: float
+    loaded_at: float
+    last_used: float
+    hits: int = 0
+    num_ctx: int = DEFAULT_NUM_CTX
+
+class ModelResidencyManager:
+    """Tracks loaded team members and picks eviction victims within a memory budget"""
+    
+    def __init__(self, budget_gb=MODEL_RESIDENCY_BUDGET_GB, idle_ttl_s=MODEL_IDLE_TTL_S, recency_half_life_s=600.0):
+        self.budget_gb = budget_gb
+        self.idle_ttl_s = idle_ttl_s
+        self.recency_half_life_s = recency_half_life_s
+        self.resident: Dict[str, ResidentModel] = {}
+        self.planned = frozenset()  # Members the co-residency plan wants kept loaded
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def is_resident(self, member_id):
+        return member_id in self.resident
+    
+    def resident_memory_gb(self, exclude=None):
+        return sum(r.memory_gb for mid, r in self.resident.items() if mid != exclude)
+    
+    def mark_loaded(self, member_id, member, memory_gb=None, num_ctx=DEFAULT_NUM_CTX):
+        now = time.time()
+        self.resident[member_id] = ResidentModel(
+            member_id=member_id,
+            model_id=member.model_id,
+            memory_gb=member.memory_gb if memory_gb is None else memory_gb,
+            loaded_at=now,
+            last_used=now,
+            num_ctx=num_ctx
+        )
+    
+    def mark_unloaded(self, member_id):
+        self.resident.pop(member_id, None)
+    
+    def touch(self, member_id):
+        entry = self.resident.get(member_id)
+        if entry:
+            entry.last_used = time.time()
+            entry.hits += 1
+    
+    def record_lookup(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+    
+    def eviction_score(self, entry, now=None):
+        """LRU/LFU blend per GB held - lowest score is evicted first"""
+        now = now or time.time()
+        recency = 0.5 ** ((now - entry.last_used) / self.recency_half_life_s)
+        return (1 + entry.hits) * recency / max(entry.memory_gb, 0.1)
+    
+    def expired(self, now=None):
+        """Members idle longer than the keep-alive window (Ollama will have dropped them)"""
+        now = now or time.time()
+        return [mid for mid, r in self.resident.items() if now - r.last_used > self.idle_ttl_s]
+    
+    def plan_evictions(self, member_id, member, available_gb, footprint_gb=None):
+        """Return member_ids to unload so that member fits; empty when it already fits.
+        
+        footprint_gb is a measured resident size; without one the static memory_gb plus overhead is assumed.
+        """
+        if member_id in self.resident:
+            return []
+        
+        required_gb = member.memory_gb + MEMORY_OVERHEAD_GB if footprint_gb is None else footprint_gb
+        budget_gb = member.memory_gb if footprint_gb is None else footprint_gb
+        deficit = max(
+            required_gb - available_gb,  # Physical memory right now
+            self.resident_memory_gb() + budget_gb - self.budget_gb  # Configured residency budget
+        )
+        if deficit <= 0:
+            return []
+        
+        now = time.time()
+        victims = []
+        # Members outside the co-residency plan go first
+        victims_order = sorted(
+            self.resident.values(),
+            key=lambda r: (r.member_id in self.planned, self.eviction_score(r, now))
+        )
+        for entry in victims_order:
+            if deficit <= 0:
+                break
+            victims.append(entry.member_id)
+            deficit -= entry.memory_gb
+        return victims
+    
+    def snapshot(self):
+        now = time.time()
+        return {
+            "budget_gb": self.budget_gb,
+            "resident_memory_gb": round(self.resident_memory_gb(), 2),
+            "resident": {
+                mid: {
+                    "model_id": r.model_id,
+                    "memory_gb": r.memory_gb,
+                    "num_ctx": r.num_ctx,
+                    "idle_s": round(now - r.last_used, 1),
+                    "hits": r.hits
+                }
+                for mid, r in self.resident.items()
+            },
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+class OllamaBackend:
+    """One Ollama instance: its client, loaded-model set and memory budget.
+    
+    budget_gb None means the instance runs on this host, so the router's sampled memory applies.
+    """
+    
+    def __init__(self, base_url, budget_gb=None, name=None):
+        self.base_url = base_url
+        self.name = name or urlparse(base_url).netloc or base_url
+        self.budget_gb = budget_gb
+        self.client = AsyncOptimizedHTTPClient(base_url)
+        self.residency = ModelResidencyManager(
+            budget_gb=MODEL_RESIDENCY_BUDGET_GB if budget_gb is None else budget_gb
+        )
+        self.lock = asyncio.Lock()  # One generation drives this instance's residency at a time
+        self.in_flight = 0  # Dispatched requests running or waiting on the lock
+        self.dispatched = 0
+    
+    @property
+    def healthy(self):
+        return self.client.breaker.available()
+    
+    async def try_acquire(self):
+        """Take the lock only if it is free now - never queue behind another request"""
+        if self.lock.locked():
+            return False
+        await self.lock.acquire()  # Uncontended, so this returns without suspending
+        self.in_flight += 1
+        self.dispatched += 1
+        return True
+    
+    def release(self):
+        self.in_flight -= 1
+        self.lock.release()
+    
+    def free_gb(self, host_available_gb):
+        """Memory a load can use without evicting anything"""
+        if self.budget_gb is None:
+            return host_available_gb
+        return max(0.0, self.budget_gb - self.residency.resident_memory_gb())
+    
+    def snapshot(self, host_available_gb):
+        return {
+            "base_url": self.base_url,
+            "budget_gb": self.budget_gb,
+            "free_gb": round(self.free_gb(host_available_gb), 2),
+            "in_flight": self.in_flight,
+            "dispatched": self.dispatched,
+            "resident": sorted(self.residency.resident),
+            "circuit": self.client.breaker.snapshot()
+        }
+
+class BackendPool:
+    """Ollama instances with locality-aware placement.
+    
+    A request goes to an instance that already holds the member at an adequate context, else to
+    the least-loaded instance where it fits, else to the one that frees the most by evicting.
+    Instances with an open circuit are passed over while any other is healthy.
+    """
+    
+    def __init__(self, backends):
+        if not backends:
+            raise ValueError("backend pool needs at least one Ollama instance")
+        host_memory = [b.name for b in backends if b.budget_gb is None]
+        if len(host_memory) > 1:
+            # Each would see all free host memory and its own residency budget while generating concurrently
+            raise ValueError(
+                f"backends {', '.join(host_memory)} would all draw on this host's memory - "
+                f"give each its share as url=GB"
+            )
+        self.backends = list(backends)
+        self.resident_hits = 0
+        self.placements = 0
+    
+    @classmethod
+    def from_spec(cls, spec=OLLAMA_BACKENDS):
+        backends = []
+        for entry in spec.split(","):
+            entry = entry.strip()
+            if not entry:
+                continue
+            url, sep, budget = entry.rpartition("=")
+            if sep:
+                backends.append(OllamaBackend(url.rstrip("/"), float(budget)))
+            else:
+                backends.append(OllamaBackend(budget.rstrip("/")))
+        return cls(backends)
+    
+    @property
+    def primary(self):
+        return self.backends[0]
+    
+    def holding(self, member_id, num_ctx=0):
+        """Backends where member_id is loaded with at least num_ctx"""
+        return [
+            b for b in self.backends
+            if member_id in b.residency.resident and b.residency.resident[member_id].num_ctx >= num_ctx
+        ]
+    
+    def resident(self, member_id):
+        """The largest-context resident copy of member_id on any backend, or None"""
+        copies = [b.residency.resident[member_id] for b in self.backends if member_id in b.residency.resident]
+        return max(copies, key=lambda r: r.num_ctx, default=None)
+    
+    def is_resident(self, member_id):
+        return any(member_id in b.residency.resident for b in self.backends)
+    
+    def capacity_gb(self, host_available_gb):
+        """(free, reclaimable) GB of the backend with the most room once its warm models are evicted"""
+        best = max(
+            self.backends,
+            key=lambda b: b.free_gb(host_available_gb) + b.residency.resident_memory_gb()
+        )
+        return best.free_gb(host_available_gb), best.residency.resident_memory_gb()
+    
+    def choose(self, member_id, footprint_gb, host_available_gb, num_ctx=DEFAULT_NUM_CTX):
+        candidates = [b for b in self.backends if b.healthy] or self.backends
+        holding = [b for b in self.holding(member_id, num_ctx) if b in candidates]
+        if holding:
+            return min(holding, key=lambda b: b.in_flight)
+        fitting = [b for b in candidates if b.free_gb(host_available_gb) >= footprint_gb]
+        if fitting:
+            return min(fitting, key=lambda b: (b.in_flight, -b.free_gb(host_available_gb)))
+        return max(
+            candidates,
+            key=lambda b: (b.free_gb(host_available_gb) + b.residency.resident_memory_gb(), -b.in_flight)
+        )
+    
+    def snapshot(self, host_available_gb):
+        return {
+            "backends": {b.name: b.snapshot(host_available_gb) for b in self.backends},
+            "resident_hits": self.resident_hits,
+            "placements": self.placements
+        }
+    
+    async def close(self):
+        for backend in self.backends:
+            await backend.client.close()
+
+class CoResidencyPlanner:
+    """Chooses the set of members to keep loaded together - a 0/1 knapsack over memory.
+    
+    Each member's value is its decayed traffic share times the load time a warm hit saves.
+    """
+    
+    def __init__(self, half_life_requests=50, resolution_gb=0.1, min_share=CO_RESIDENCY_MIN_SHARE, drift=CO_RESIDENCY_DRIFT):
+        self.decay = 0.5 ** (1 / half_life_requests)
+        self.resolution_gb = resolution_gb
+        self.min_share = min_share
+        self.drift = drift
+        self.traffic: Dict[str, float] = {}
+        self.plan = frozenset()
+        self.plan_budget_gb = 0.0
+        self.replans = 0
+        self._plan_shares: Dict[str, float] = {}
+        self._plan_pressure_bucket = None
+    
+    def observe(self, member_id):
+        for key in self.traffic:
+            self.traffic[key] *= self.decay
+        self.traffic[member_id] = self.traffic.get(member_id, 0.0) + 1.0
+    
+    def shares(self):
+        total = sum(self.traffic.values())
+        return {key: value / total for key, value in self.traffic.items()} if total else {}
+    
+    def needs_replan(self, memory_percent):
+        """Memory pressure moved to another 5% band, or the traffic mix drifted"""
+        if int(memory_percent // 5) != self._plan_pressure_bucket:
+            return True
+        shares = self.shares()
+        keys = set(shares) | set(self._plan_shares)
+        drift = sum(abs(shares.get(k, 0.0) - self._plan_shares.get(k, 0.0)) for k in keys)
+        return drift > self.drift
+    
+    def solve(self, candidates, budget_gb):
+        """candidates: {member_id: (memory_gb, value)} -> frozenset maximising value within budget_gb"""
+        capacity = int(budget_gb / self.resolution_gb)
+        if capacity <= 0:
+            return frozenset()
+        
+        items = [
+            (member_id, max(1, int(round(memory_gb / self.resolution_gb))), value)
+            for member_id, (memory_gb, value) in candidates.items()
+            if value > 0
+        ]
+        best = [0.0] * (capacity + 1)
+        chosen = [frozenset()] * (capacity + 1)
+        for member_id, weight, value in items:
+            for c in range(capacity, weight - 1, -1):
+                candidate_value = best[c - weight] + value
+                if candidate_value > best[c]:
+                    best[c] = candidate_value
+                    chosen[c] = chosen[c - weight] | {member_id}
+        return chosen[capacity]
+    
+    def replan(self, team_members, load_cost_fn, budget_gb, memory_percent, footprint_fn=None):
+        shares = self.shares()
+        footprint_fn = footprint_fn or (lambda member_id: team_members[member_id].memory_gb + MEMORY_OVERHEAD_GB)
+        candidates = {
+            member_id: (footprint_fn(member_id), share * load_cost_fn(member_id))
+            for member_id, share in shares.items()
+            if share >= self.min_share and member_id in team_members
+        }
+        self.plan = self.solve(candidates, budget_gb)
+        self.plan_budget_gb = budget_gb
+        self.replans += 1
+        self._plan_shares = shares
+        self._plan_pressure_bucket = int(memory_percent // 5)
+        return self.plan
+    
+    def snapshot(self):
+        return {
+            "plan": sorted(self.plan),
+            "plan_budget_gb": round(self.plan_budget_gb, 2),
+            "traffic_shares": {k: round(v, 3) for k, v in sorted(self.shares().items())},
+            "replans": self.replans
+        }
+
+class TransitionPredictor:
+    """Predicts the next member from member-to-member transitions blended with hour-of-day usage"""
+    
+    def __init__(self, transition_weight=0.6):
+        self.transition_weight = transition_weight
+        self.transitions: Dict[str, Dict[str, int]] = {}
+        self.hourly: Dict[int, Dict[str, int]] = {}
+        self.last_member = None
+        self.pending_prediction = None
+        self.preloaded = None
+        self.hits = 0
+        self.misses = 0
+        self.preloads = 0
+        self.preload_hits = 0
+    
+    def record(self, member_id, when=None):
+        """Score the outstanding prediction, then learn from the observed member"""
+        when = when or datetime.now()
+        if self.pending_prediction is not None:
+            if self.pending_prediction == member_id:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.pending_prediction = None
+        if self.preloaded is not None:
+            if self.preloaded == member_id:
+                self.preload_hits += 1
+            self.preloaded = None
+        
+        if self.last_member is not None:
+            row = self.transitions.setdefault(self.last_member, {})
+            row[member_id] = row.get(member_id, 0) + 1
+        hour = self.hourly.setdefault(when.hour, {})
+        hour[member_id] = hour.get(member_id, 0) + 1
+        self.last_member = member_id
+    
+    @staticmethod
+    def _normalise(counts):
+        total = sum(counts.values())
+        return {key: value / total for key, value in counts.items()} if total else {}
+    
+    def predict(self, when=None):
+        """Return (member_id, probability) for the next request, or (None, 0.0) without history"""
+        when = when or datetime.now()
+        by_transition = self._normalise(self.transitions.get(self.last_member, {}))
+        by_hour = self._normalise(self.hourly.get(when.hour, {}))
+        if not by_transition and not by_hour:
+            return None, 0.0
+        
+        weight = self.transition_weight if by_transition and by_hour else (1.0 if by_transition else 0.0)
+        combined = {}
+        for member_id, p in by_transition.items():
+            combined[member_id] = combined.get(member_id, 0.0) + weight * p
+        for member_id, p in by_hour.items():
+            combined[member_id] = combined.get(member_id, 0.0) + (1 - weight) * p
+        
+        member_id = max(combined, key=combined.get)
+        self.pending_prediction = member_id
+        return member_id, combined[member_id]
+    
+    def snapshot(self):
+        scored = self.hits + self.misses
+        return {
+            "last_member": self.last_member,
+            "pending_prediction": self.pending_prediction,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / scored, 3) if scored else None,
+            "preloads": self.preloads,
+            "preload_hits": self.preload_hits
+        }
+
+@dataclass(frozen=True)
+class MemorySample:
+    timestamp: float
+    available_gb: float
+    percent: float
+    swap_used_gb: float
+    swap_percent: float
+
+class MemorySampler:
+    """Fixed-rate memory/swap samples in a ring buffer; readers never block on psutil"""
+    
+    def __init__(self, interval_s=MEMORY_SAMPLE_INTERVAL_S, size=MEMORY_SAMPLE_BUFFER):
+        self.interval_s = interval_s
+        self.samples = deque(maxlen=size)
+    
+    def sample(self):
+        """Take a sample now and append it to the buffer"""
+        mem = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        sample = MemorySample(
+            timestamp=time.time(),
+            available_gb=mem.available / (1024 ** 3),
+            percent=mem.percent,
+            swap_used_gb=swap.used / (1024 ** 3),
+            swap_percent=swap.percent
+        )
+        self.samples.append(sample)
+        return sample
+    
+    def latest(self):
+        """Most recent sample, or a fresh one if the sampler has not run recently"""
+        if self.samples and time.time() - self.samples[-1].timestamp <= MEMORY_SAMPLE_MAX_AGE_S:
+            return self.samples[-1]
+        return self.sample()
+    
+    def trend_gb_per_s(self, window_s=MEMORY_TREND_WINDOW_S):
+        """Least-squares slope of available memory over the window; negative means memory is being consumed"""
+        if len(self.samples) < 2:
+            return 0.0
+        cutoff = self.samples[-1].timestamp - window_s
+        points = [(s.timestamp, s.available_gb) for s in reversed(self.samples) if s.timestamp >= cutoff]
+        if len(points) < 2:
+            return 0.0
+        mean_t = sum(t for t, _ in points) / len(points)
+        mean_gb = sum(gb for _, gb in points) / len(points)
+        variance = sum((t - mean_t) ** 2 for t, _ in points)
+        if variance == 0:
+            return 0.0
+        return sum((t - mean_t) * (gb - mean_gb) for t, gb in points) / variance
+    
+    def series(self, seconds=None):
+        cutoff = time.time() - seconds if seconds else 0
+        return [s.__dict__ for s in self.samples if s.timestamp >= cutoff]
+    
+    def snapshot(self):
+        latest = self.samples[-1] if self.samples else None
+        return {
+            "interval_s": self.interval_s,
+            "buffered": len(self.samples),
+            "capacity": self.samples.maxlen,
+            "latest": latest.__dict__ if latest else None,
+            "trend_gb_per_s": round(self.trend_gb_per_s(), 4)
+        }
+
+class StreamBroadcast:
+    """Fans one event stream out to many subscribers; late subscribers get a replay"""
+    
+    def __init__(self, source):
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._pump(source))
+    
+    async def _pump(self, source):
+        try:
+            async for event in source:
+                self.events.append(event)
+                self._changed.set()
+        finally:
+            self.done = True
+            self._changed.set()
+    
+    async def subscribe(self):
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(self.events):
+                    yield self.events[index]
+                    index += 1
+                if self.done:
+                    return
+                self._changed.clear()
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self.task.cancel()  # Everyone left - stop generating
+
+class SingleFlight:
+    """Shares one in-flight generation between identical concurrent requests"""
+    
+    def __init__(self):
+        self.calls: Dict[str, asyncio.Task] = {}
+        self.streams: Dict[str, StreamBroadcast] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.stream_leaders = 0
+        self.stream_coalesced = 0
+    
+    @staticmethod
+    def key(member_id, prompt, options):
+        raw = json.dumps([member_id, prompt, options], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    async def do(self, key, fn):
+        """Run fn() once per key; concurrent callers share its result. Returns (result, shared)."""
+        task = self.calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.create_task(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self.calls.pop(key, None) if self.calls.get(key) is done else None)
+        # shield: a disconnecting caller must not cancel the generation other callers wait on
+        return await asyncio.shield(task), shared
+    
+    async def stream(self, key, source_fn):
+        """Yield (event, shared) from one producer per key"""
+        broadcast = self.streams.get(key)
+        shared = broadcast is not None
+        if shared:
+            self.stream_coalesced += 1
+        else:
+            self.stream_leaders += 1
+            broadcast = StreamBroadcast(source_fn())
+            self.streams[key] = broadcast
+            broadcast.task.add_done_callback(
+                lambda _: self.streams.pop(key, None) if self.streams.get(key) is broadcast else None
+            )
+        async for event in broadcast.subscribe():
+            yield event, shared
+    
+    def snapshot(self):
+        return {
+            "in_flight": len(self.calls),
+            "in_flight_streams": len(self.streams),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "stream_leaders": self.stream_leaders,
+            "stream_coalesced": self.stream_coalesced
+        }
+
+class ResponseCache:
+    """Exact-match response cache: size-bounded LRU in memory over a SQLite tier that survives restarts.
+    
+    The memory tier stays on the event loop; all SQLite work runs in order on one worker thread,
+    so a slow disk never stalls the loop.
+    """
+    
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl_s=RESPONSE_CACHE_TTL_S,
+                 disk_max_entries=RESPONSE_CACHE_DISK_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.disk_max_entries = disk_max_entries
+        self.memory: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self.memory_bytes = 0
+        self._db = None
+        self._worker = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expired = 0
+    
+    @staticmethod
+    def normalize_prompt(prompt):
+        """Ignore line-ending and trailing-whitespace differences, keep indentation"""
+        lines = prompt.replace("\r\n", "\n").split("\n")
+        return "\n".join(line.rstrip() for line in lines).strip()
+    
+    @classmethod
+    def key(cls, model_id, prompt, options):
+        raw = json.dumps([model_id, cls.normalize_prompt(prompt), options], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def _connect(self):
+        if self._db is None and self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)  # Used from the worker thread
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+    
+    def _remember(self, key, created_at, payload):
+        size = len(payload["response"].encode("utf-8"))
+        if key in self.memory:
+            self.memory_bytes -= self.memory.pop(key)[1]
+        self.memory[key] = (created_at, size, payload)
+        self.memory_bytes += size
+        while self.memory and (len(self.memory) > self.max_entries or self.memory_bytes > self.max_bytes):
+            _, (_, evicted_size, _) = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted_size
+            self.evictions += 1
+    
+    def _memory_get(self, key, now):
+        entry = self.memory.get(key)
+        if entry:
+            created_at, size, payload = entry
+            if now - created_at <= self.ttl_s:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return payload
+            self.memory.pop(key)
+            self.memory_bytes -= size
+            self.expired += 1
+        return None
+    
+    def _disk_get(self, key, now):
+        """(payload, created_at, expired) from SQLite; touches only the database"""
+        db = self._connect()
+        if db is None:
+            return None, None, False
+        row = db.execute("SELECT payload, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None, None, False
+        if now - row[1] <= self.ttl_s:
+            db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            db.commit()
+            return json.loads(row[0]), row[1], False
+        db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        db.commit()
+        return None, None, True
+    
+    def _disk_result(self, key, payload, created_at, expired):
+        if payload is not None:
+            self._remember(key, created_at, payload)  # Promote to the memory tier
+            self.hits += 1
+            self.disk_hits += 1
+            return payload, "disk"
+        if expired:
+            self.expired += 1
+        self.misses += 1
+        return None, None
+    
+    def _disk_put(self, key, payload, now):
+        db = self._connect()
+        if db is None:
+            return
+        db.execute(
+            "INSERT OR REPLACE INTO responses (key, payload, created_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(payload), now, now)
+        )
+        db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+        db.commit()
+    
+    def _run_on_worker(self, fn, *args):
+        if self._worker is None:
+            self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+        return asyncio.get_running_loop().run_in_executor(self._worker, fn, *args)
+    
+    async def get_async(self, key):
+        """Return (payload, tier) or (None, None); memory hits return without leaving the loop"""
+        now = time.time()
+        payload = self._memory_get(key, now)
+        if payload is not None:
+            return payload, "memory"
+        if not self.path:
+            return self._disk_result(key, None, None, False)
+        return self._disk_result(key, *await self._run_on_worker(self._disk_get, key, now))
+    
+    def put_deferred(self, key, response, metadata):
+        """Store in the memory tier now and queue the SQLite write on the worker (call from the event loop)"""
+        now = time.time()
+        payload = {"response": response, "metadata": metadata}
+        self._remember(key, now, payload)
+        if self.path:
+            self._run_on_worker(self._disk_put, key, payload, now)
+        self.stores += 1
+    
+    def close(self):
+        """Finish queued writes, then close the database"""
+        if self._worker is not None:
+            self._worker.shutdown(wait=True)
+            self._worker = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+    
+    def snapshot(self):
+        lookups = self.hits + self.misses
+        return {
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory_bytes,
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "disk_path": self.path or None
+        }
+
+class MemberPerformanceTracker:
+    """Rolling per-member observations (load time, generation time, footprint) with EWMA estimates.
+    
+    Persisted to path (JSON, atomic replace) at most every MEMBER_STATS_SAVE_INTERVAL_S and on close.
+    """
+    
+    def __init__(self, window=200, alpha=0.3, path=MEMBER_STATS_PATH):
+        self.window = window
+        self.alpha = alpha
+        self.path = path
+        self.samples: Dict[str, Dict[str, deque]] = {}
+        self.ewma: Dict[str, Dict[str, float]] = {}
+        self._dirty = False
+        self._saved_at = 0.0
+        self._load()
+    
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable member stats {self.path}: {e}")
+            return
+        for member_id, metrics in data.items():
+            for metric, entry in metrics.items():
+                self.samples.setdefault(member_id, {})[metric] = deque(entry["samples"], maxlen=self.window)
+                self.ewma.setdefault(member_id, {})[metric] = entry["ewma"]
+        logger.info(f"📈 Loaded learned stats for {len(data)} members from {self.path}")
+    
+    def save(self, force=True):
+        """Write learned stats; with force=False only when dirty and the save interval has passed"""
+        if not self.path or not self._dirty:
+            return
+        if not force and time.time() - self._saved_at < MEMBER_STATS_SAVE_INTERVAL_S:
+            return
+        data = {
+            member_id: {
+                metric: {"ewma": value, "samples": list(self.samples[member_id][metric])}
+                for metric, value in estimates.items()
+            }
+            for member_id, estimates in self.ewma.items()
+        }
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save member stats to {self.path}: {e}")
+            return
+        self._dirty = False
+        self._saved_at = time.time()
+    
+    def record(self, member_id, metric, value):
+        series = self.samples.setdefault(member_id, {}).setdefault(metric, deque(maxlen=self.window))
+        series.append(value)
+        estimates = self.ewma.setdefault(member_id, {})
+        previous = estimates.get(metric)
+        estimates[metric] = value if previous is None else self.alpha * value + (1 - self.alpha) * previous
+        self._dirty = True
+        self.save(force=False)
+    
+    def estimate(self, member_id, metric, default=None):
+        return self.ewma.get(member_id, {}).get(metric, default)
+    
+    def count(self, member_id, metric):
+        return len(self.samples.get(member_id, {}).get(metric, ()))
+    
+    def percentile(self, member_id, metric, q, default=None):
+        """q-th percentile (0-100) of the retained samples"""
+        series = self.samples.get(member_id, {}).get(metric)
+        if not series:
+            return default
+        ordered = sorted(series)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+    
+    def snapshot(self):
+        return {
+            member_id: {
+                metric: {"ewma": round(value, 3), "samples": self.count(member_id, metric)}
+                for metric, value in estimates.items()
+            }
+            for member_id, estimates in self.ewma.items()
+        }
+
+class LatencyHistogram:
+    """Fixed-bucket histogram: constant memory, Prometheus-compatible cumulative buckets"""
+    
+    def __init__(self, bounds=LATENCY_BUCKETS_S):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+    
+    def record(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (0-1)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return self.bounds[-1]
+    
+    def cumulative(self):
+        """(le, cumulative count) pairs ending with +Inf"""
+        total = 0
+        for bound, count in zip((*self.bounds, float("inf")), self.counts):
+            total += count
+            yield bound, total
+
+class LatencyMetrics:
+    """Per-request phase timings in histograms keyed by (phase, member, domain)"""
+    
+    def __init__(self, bounds=LATENCY_BUCKETS_S):
+        self.bounds = bounds
+        self.histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+        self.requests = 0
+    
+    def record(self, member_id, domain, timings):
+        self.requests += 1
+        for phase, seconds in timings.items():
+            if seconds is None:
+                continue
+            key = (phase, member_id, domain or "default")
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram(self.bounds)
+            histogram.record(max(0.0, seconds))
+    
+    def snapshot(self):
+        summary = {}
+        for (phase, member_id, domain), histogram in sorted(self.histograms.items()):
+            summary.setdefault(phase, {})[f"{member_id}:{domain}"] = {
+                "count": histogram.count,
+                "mean_s": round(histogram.sum / histogram.count, 3),
+                "p50_s": histogram.quantile(0.5),
+                "p95_s": histogram.quantile(0.95)
+            }
+        return {"requests": self.requests, "phases": summary}
+    
+    def prometheus(self, name="ai_router_phase_seconds"):
+        """Text exposition lines for every histogram"""
+        lines = [
+            f"# HELP {name} Per-request latency by phase, member and domain",
+            f"# TYPE {name} histogram"
+        ]
+        for (phase, member_id, domain), histogram in sorted(self.histograms.items()):
+            labels = f'phase="{phase}",member="{member_id}",domain="{domain}"'
+            for bound, total in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {total}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return lines
+
+@dataclass
+class QueuedRequest:
+    seq: int
+    prompt: str
+    context: Dict[str, Any]
+    requirements: Dict[str, Any]
+    member_id: str
+    enqueued_at: float
+    future: asyncio.Future
+    priority_class: int = PRIORITY_CLASSES["normal"]
+    stream: bool = False
+    dispatched_at: float = 0.0
+    expected_cost_s: float = 0.0
+
+class AffinityRequestQueue:
+    """Priority/shortest-expected-job scheduler over requests grouped by selected member.
+    
+    Loaded members have no load cost, so their queued work naturally drains before a swap.
+    """
+    
+    def __init__(self, max_wait_s=QUEUE_MAX_WAIT_S, aging_s=PRIORITY_AGING_S):
+        self.max_wait_s = max_wait_s
+        self.aging_s = aging_s
+        self.pending: List[QueuedRequest] = []
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self.served = 0
+        self.swaps = 0
+        self.forced_by_wait = 0
+        self.total_wait_s = 0.0
+        self.max_observed_wait_s = 0.0
+    
+    def __len__(self):
+        return len(self.pending)
+    
+    def put(self, prompt, context, requirements, member_id, stream=False):
+        self._seq += 1
+        item = QueuedRequest(
+            seq=self._seq,
+            prompt=prompt,
+            context=context,
+            requirements=requirements,
+            member_id=member_id,
+            enqueued_at=time.time(),
+            future=asyncio.get_running_loop().create_future(),
+            stream=stream,
+            priority_class=PRIORITY_CLASSES.get(str(context.get("priority", "normal")).lower(), PRIORITY_CLASSES["normal"])
+        )
+        self.pending.append(item)
+        self._wakeup.set()
+        return item
+    
+    def effective_class(self, item, now):
+        """Priority class after aging - one class promotion per aging_s waited"""
+        return item.priority_class - int((now - item.enqueued_at) // self.aging_s)
+    
+    def select_next(self, cost_fn, now=None):
+        """Pick the next request: starving requests first, then (aged priority class, expected cost, arrival).
+        
+        cost_fn(item) returns the expected service time in seconds, including any model load.
+        """
+        now = now or time.time()
+        self.pending = [item for item in self.pending if not item.future.done()]  # Drop cancelled callers
+        if not self.pending:
+            return None
+        
+        oldest = min(self.pending, key=lambda item: item.seq)
+        if now - oldest.enqueued_at >= self.max_wait_s:
+            chosen = oldest
+            chosen.expected_cost_s = cost_fn(chosen)
+            self.forced_by_wait += 1
+        else:
+            for item in self.pending:
+                item.expected_cost_s = cost_fn(item)
+            chosen = min(
+                self.pending,
+                key=lambda item: (self.effective_class(item, now), item.expected_cost_s, item.seq)
+            )
+        
+        self.pending.remove(chosen)
+        chosen.dispatched_at = now
+        wait = now - chosen.enqueued_at
+        self.served += 1
+        self.total_wait_s += wait
+        self.max_observed_wait_s = max(self.max_observed_wait_s, wait)
+        return chosen
+    
+    async def get(self, cost_fn):
+        """Wait for work and return the next request according to select_next"""
+        while True:
+            item = self.select_next(cost_fn)
+            if item:
+                return item
+            self._wakeup.clear()
+            await self._wakeup.wait()
+    
+    def snapshot(self):
+        return {
+            "depth": len(self.pending),
+            "pending_by_member": {
+                member_id: sum(1 for item in self.pending if item.member_id == member_id)
+                for member_id in {item.member_id for item in self.pending}
+            },
+            "pending_by_priority": {
+                name: sum(1 for item in self.pending if item.priority_class == rank)
+                for name, rank in PRIORITY_CLASSES.items()
+            },
+            "served": self.served,
+            "swaps": self.swaps,
+            "forced_by_max_wait": self.forced_by_wait,
+            "avg_wait_s": round(self.total_wait_s / self.served, 3) if self.served else 0.0,
+            "max_wait_s": round(self.max_observed_wait_s, 3)
+        }
+
+class AdmissionController:
+    """Deadline check for queued work from the estimated wait ahead of it and its own service time"""
+    
+    def __init__(self, default_deadline_s=ADMISSION_DEADLINE_S, enabled=ADMISSION_CONTROL):
+        self.default_deadline_s = default_deadline_s
+        self.enabled = enabled
+        self.admitted = 0
+        self.rejected = 0
+        self.rejected_by_member: Dict[str, int] = {}
+        self.last_estimated_wait_s = 0.0
+    
+    def evaluate(self, wait_s, service_s, deadline_s=None):
+        """Return None to admit, else Retry-After seconds (when the backlog ahead will have drained enough).
+        
+        An empty backlog always admits: waiting cannot make a request that is slow on its own any faster.
+        """
+        deadline_s = deadline_s or self.default_deadline_s
+        if not self.enabled or wait_s <= 0 or wait_s + service_s <= deadline_s:
+            return None
+        return max(1, math.ceil(min(wait_s, wait_s + service_s - deadline_s)))
+    
+    def record(self, member_id, wait_s, admitted):
+        self.last_estimated_wait_s = wait_s
+        if admitted:
+            self.admitted += 1
+        else:
+            self.rejected += 1
+            self.rejected_by_member[member_id] = self.rejected_by_member.get(member_id, 0) + 1
+    
+    def snapshot(self):
+        return {
+            "enabled": self.enabled,
+            "default_deadline_s": self.default_deadline_s,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "rejected_by_member": dict(self.rejected_by_member),
+            "last_estimated_wait_s": round(self.last_estimated_wait_s, 2)
+        }
+
+class KeywordClassifier:
+    """Table-driven keyword flags, built once and evaluated with a single lowercase pass per prompt.
+    
+    Each probe is a C-level substring search on the lowered text; on CPython this beats a compiled
+    alternation regex by an order of magnitude on large prompts (see benchmarks/keyword_classifier_benchmark.py).
+    """
+    
+    def __init__(self, keywords=TASK_KEYWORDS):
+        self.table = tuple((flag, tuple(k.lower() for k in words)) for flag, words in keywords.items())
+    
+    def classify(self, prompt):
+        """Return the flags (in table order) whose keywords occur in prompt"""
+        text = prompt.lower()
+        flags = []
+        for flag, words in self.table:
+            for word in words:
+                if word in text:
+                    flags.append(flag)
+                    break
+        return tuple(flags)
+
+class AITeamRouter:
+    def __init__(self):
+        self.active_member = None
+        self.registry = TeamRegistry()
+        self.memory_sampler = MemorySampler()
+        self.request_history = deque(maxlen=REQUEST_HISTORY_SIZE)
+        self.classifier = KeywordClassifier()
+        self.performance_metrics = {}
+        self.emergency_mode = False
+        self.min_system_memory_gb = 2.0
+        self.backends = BackendPool.from_spec()
+        self.request_queue = AffinityRequestQueue()
+        self.admission = AdmissionController()
+        self.latency = LatencyMetrics()
+        self._in_service: Dict[int, Tuple[float, float]] = {}  # Queue seq -> (dispatched_at, expected_cost_s)
+        self.member_stats = MemberPerformanceTracker()
+        self.coresidency = CoResidencyPlanner()
+        self.predictor = TransitionPredictor()
+        self.single_flight = SingleFlight()
+        self.response_cache = ResponseCache()
+        self.preload_idle_s = PRELOAD_IDLE_S
+        self._last_request_at = time.time()
+        self._preload_task = None
+        self._team_config_task = None
+        self._memory_sampler_task = None
+        self._queue_worker = None
+        self._queue_tasks = set()
+        self._plan_preload_task = None
+        self._speculative_loads = {}  # backend -> (task, member_id) of a preload a real request may cancel
+        self._team_table = self.registry.table  # Table the queue and residency plan were built against
+        self.hedges = {"fired": 0, "won": 0}
+        
+        logger.info(f"Router initialized with {len(self.team_members)} members on {len(self.backends.backends)} backend(s)")
+        logger.info("🚀 Phase 4B: Using AsyncOptimizedHTTPClient with proven HTTP fixes")
+    
+    @property
+    def team_members(self):
+        """Members of the current routing table (read-only; edit the team config file instead)"""
+        return self.registry.table.members
+    
+    @property
+    def residency(self):
+        """The primary backend's residency; the co-residency plan and preloads apply there"""
+        return self.backends.primary.residency
+    
+    @property
+    def ollama_client(self):
+        """Async client of the primary backend (keeps the event loop free while Ollama generates)"""
+        return self.backends.primary.client
+    
+    @ollama_client.setter
+    def ollama_client(self, client):
+        self.backends.primary.client = client
+    
+    @staticmethod
+    def _kv_cache_gb(member, num_ctx):
+        return member.kv_cache_mb_per_1k_tokens * num_ctx / 1000 / 1024
+    
+    def _footprint_gb(self, member_id, member=None, num_ctx=DEFAULT_NUM_CTX):
+        """Memory a load of member_id at num_ctx needs.
+        
+        Footprints (measured EWMA, else static memory_gb plus overhead) are normalised to
+        DEFAULT_NUM_CTX; a larger context adds its extra KV-cache.
+        """
+        member = member or self.team_members[member_id]
+        learned = self.member_stats.estimate(member_id, "footprint_gb")
+        if learned is None:
+            learned = self.member_stats.estimate(member_id, "release_gb")
+        base_gb = learned if learned is not None else member.memory_gb + MEMORY_OVERHEAD_GB
+        return base_gb + self._kv_cache_gb(member, num_ctx) - self._kv_cache_gb(member, DEFAULT_NUM_CTX)
+    
+    def _learned_footprint_gb(self, member_id, num_ctx=DEFAULT_NUM_CTX):
+        """Footprint for plan_evictions: None keeps its static rule unless a measurement or a larger context applies"""
+        measured = self.member_stats.count(member_id, "footprint_gb") or self.member_stats.count(member_id, "release_gb")
+        if measured or num_ctx > DEFAULT_NUM_CTX:
+            return self._footprint_gb(member_id, num_ctx=num_ctx)
+        return None
+    
+    async def _measure_footprint(self, member_id, member, available_before_gb, num_ctx=DEFAULT_NUM_CTX, backend=None):
+        """Record the resident size of a fresh load: Ollama's /api/ps size, else the drop in available memory.
+        
+        Returns the size as loaded; the recorded sample is normalised to DEFAULT_NUM_CTX.
+        """
+        backend = backend or self.backends.primary
+        sizes = await backend.client.running_sizes()
+        if sizes and sizes.get(member.model_id):
+            footprint_gb = sizes[member.model_id] / (1024 ** 3)
+        elif backend.budget_gb is not None:
+            return None  # Another host's load does not show in our memory
+        else:
+            footprint_gb = available_before_gb - self.memory_sampler.sample().available_gb
+            if footprint_gb < MIN_FOOTPRINT_DELTA_GB:
+                return None
+        kv_extra_gb = self._kv_cache_gb(member, num_ctx) - self._kv_cache_gb(member, DEFAULT_NUM_CTX)
+        self.member_stats.record(member_id, "footprint_gb", max(footprint_gb - kv_extra_gb, MIN_FOOTPRINT_DELTA_GB))
+        logger.info(f"📏 FOOTPRINT: {member.name} {footprint_gb:.2f}GB at num_ctx {num_ctx} (static {member.memory_gb}GB)")
+        return footprint_gb
+    
+    def _context_tokens_needed(self, prompt, context=None):
+        """Estimated prompt tokens plus room for the answer (the num_predict sent to Ollama, if any)"""
+        output_tokens = self._output_limit(context or {}) or NUM_CTX_OUTPUT_RESERVE
+        return int(len(prompt) / CHARS_PER_TOKEN * NUM_CTX_HEADROOM) + output_tokens
+    
+    def _select_num_ctx(self, member_id, member, prompt, context=None):
+        """Smallest adequate context step, capped at the member's limit.
+        
+        A resident model already loaded with enough context is reused as-is, since a
+        different num_ctx makes Ollama reload it. Returns (num_ctx, truncated).
+        """
+        needed = self._context_tokens_needed(prompt, context)
+        resident = self.backends.resident(member_id)
+        if resident and resident.num_ctx >= needed:
+            return resident.num_ctx, False
+        if needed > member.context_tokens:
+            return member.context_tokens, True
+        num_ctx = next((step for step in NUM_CTX_STEPS if step >= needed), member.context_tokens)
+        return min(num_ctx, member.context_tokens), False
+    
+    def _get_available_memory_gb(self) -> float:
+        """M3-specific calculation with pressure-based adjustment"""
+        mem = self.memory_sampler.latest()
+    
+        # Base available memory minus overhead
+        available = mem.available_gb - MEMORY_OVERHEAD_GB
+        
+        # A falling trend (model loading, runaway process) will claim memory before our load lands
+        trend = self.memory_sampler.trend_gb_per_s()
+        if trend < 0:
+            available += trend * MEMORY_TREND_HORIZON_S
+    
+        # M3 Pro pressure-based adjustments (balanced for better routing)
+        if IS_M3_PRO:
+            if mem.percent > 90:
+                available *= 0.8  # 20% reduction (critical only)
+                logger.warning(f"High memory pressure {mem.percent}% - reducing available to {available:.1f}GB")
+            elif mem.percent > 85:
+                available *= 0.9  # 10% reduction (high pressure)
+                logger.info(f"Memory pressure {mem.percent}% - reducing available to {available:.1f}GB")
+            elif mem.percent > 75:
+                available *= 0.95  # 5% reduction (moderate)
+        else:
+            # Non-M3 systems - simpler pressure handling
+            if mem.percent > 80:
+                available *= 0.8
+    
+        # Ensure we don't return negative values
+        return max(0.1, available)
+    
+    async def _unload_model(self, model_id, member_id=None, backend=None):
+        """Unload a model and return as soon as Ollama and the OS confirm it is gone"""
+        backend = backend or self.backends.primary
+        try:
+            unload_start_time = time.time()
+            logger.info(f"Unloading: {model_id} on {backend.name}")
+            mem_before = self.memory_sampler.sample().available_gb
+            
+            result = await backend.client.unload(model_id)
+            
+            if not result["success"]:
+                logger.warning(f"Unload request failed: {result.get('error', 'unknown')}")
+                return False
+            
+            # Signal 1: Ollama no longer lists the model in /api/ps
+            gone = await self._wait_for_model_gone(model_id, UNLOAD_MAX_WAIT_S, backend.client)
+            if gone is False:
+                logger.warning(f"⚠️ SLOW UNLOAD: {model_id} still listed after {UNLOAD_MAX_WAIT_S}s - forcing context reset")
+                await self._force_context_reset(model_id, backend.client)
+                gone = await self._wait_for_model_gone(model_id, UNLOAD_FORCE_WAIT_S, backend.client)
+            
+            # Signal 2: available memory stops rising once the runner's pages are returned
+            if backend.budget_gb is None:
+                released_gb, settle_time = await self._wait_for_memory_settled(mem_before, UNLOAD_MAX_WAIT_S)
+            else:
+                released_gb, settle_time = 0.0, 0.0  # Another host's memory is not visible here
+            total_unload_time = time.time() - unload_start_time
+            if member_id and gone is not False:
+                self.member_stats.record(member_id, "unload_time", total_unload_time)
+                if released_gb >= MIN_FOOTPRINT_DELTA_GB:
+                    self.member_stats.record(member_id, "release_gb", released_gb)
+            
+            logger.info(
+                f"📊 TIMING DATA: {model_id} unloaded in {total_unload_time:.2f}s "
+                f"(released {released_gb:.2f}GB, memory settled after {settle_time:.2f}s, ps_confirmed={gone})"
+            )
+            
+            if gone is None:
+                # /api/ps unavailable - fall back to the memory signal alone
+                return released_gb >= 0.2
+            return gone
+                
+        except Exception as e:
+            logger.error(f"Unload error: {e}")
+            return False
+    
+    async def _wait_for_model_gone(self, model_id, timeout, client=None):
+        """Poll /api/ps with backoff until model_id disappears.
+        
+        Returns True when confirmed gone, False on timeout, None if /api/ps is unavailable.
+        """
+        client = client or self.ollama_client
+        deadline = time.time() + timeout
+        interval = UNLOAD_POLL_INTERVAL_S
+        while True:
+            running = await client.list_running()
+            if running is None:
+                return None
+            if model_id not in running:
+                return True
+            if time.time() >= deadline:
+                return False
+            await asyncio.sleep(interval)
+            interval = min(interval * 1.5, 1.0)
+    
+    async def _wait_for_memory_settled(self, mem_before, timeout):
+        """Wait until available memory stops rising (slope flattens).
+        
+        Returns (released_gb, seconds_waited).
+        """
+        start = time.time()
+        # Settling needs a denser series than the background rate; these samples land in the buffer too
+        previous = self.memory_sampler.sample().available_gb
+        flat_samples = 0
+        while time.time() - start < timeout:
+            await asyncio.sleep(UNLOAD_POLL_INTERVAL_S)
+            current = self.memory_sampler.sample().available_gb
+            if current - previous < MEMORY_SETTLE_EPSILON_GB:
+                flat_samples += 1
+                if flat_samples >= 2:
+                    break
+            else:
+                flat_samples = 0
+            previous = current
+        released_gb = self.memory_sampler.sample().available_gb - mem_before
+        return released_gb, time.time() - start
+    
+    async def _force_context_reset(self, model_id, client=None):
+        """Force full context reset for stubborn models"""
+        client = client or self.ollama_client
+        try:
+            result = await client.generate(
+                model_id=model_id,
+                prompt="",
+                timeout=10,
+                options={
+                    "num_ctx": 1,
+                    "num_gpu": 0,
+                    "num_threads": 1
+                }
+            )
+            
+            if result["success"]:
+                logger.info("🔄 Force context reset completed")
+            else:
+                logger.warning(f"Force context reset failed: {result.get('error', 'unknown')}")
+        except Exception as e:
+            logger.warning(f"Force context reset failed: {e}")
+    
+    def _analyze_task(self, prompt, context):
+        flags = self.classifier.classify(prompt)
+        return {
+            "complexity": self._complexity_from_flags(flags, len(prompt)),
+            "domain": self._domain_from_flags(flags),
+            "needs_vision": "visual" in flags,
+            "needs_uncensored": "uncensored" in flags,
+            "needs_large_context": len(prompt) > 3000,
+            "needs_338_languages": "php" in flags,
+            "tool_requirements": {},
+            "priority": context.get("priority", "normal"),
+            "selection": context.get("selection", SELECTION_MODE),
+            "keywords": flags,
+            "prompt": prompt  # Pass prompt for better model selection
+        }
+    
+    def _estimate_complexity(self, prompt):
+        return self._complexity_from_flags(self.classifier.classify(prompt), len(prompt))
+    
+    def _identify_domain(self, prompt, context):
+        return self._domain_from_flags(self.classifier.classify(prompt))
+    
+    @staticmethod
+    def _complexity_from_flags(flags, prompt_length):
+        score = 3
+        if "simple" in flags:
+            score -= 1
+        if "complex" in flags:
+            score += 2
+        if prompt_length > 1000:
+            score += 1
+        return max(1, min(5, score))
+    
+    @staticmethod
+    def _domain_from_flags(flags):
+        if "vue_react" in flags or "php" in flags:
+            return "coding"
+        if "enterprise" in flags:
+            return "enterprise"
+        if "data" in flags:
+            return "data"
+        if "visual" in flags:
+            return "visual"
+        return "coding"
+    
+    def select_team_member(self, requirements):
+        keywords = requirements.get("keywords")
+        if keywords is None:
+            keywords = self.classifier.classify(requirements.get("prompt", ""))
+        is_react_vue = "vue_react" in keywords
+        # Size against the backend with the most room; warm models there can be evicted on demand
+        available_memory, reclaimable_memory = self.backends.capacity_gb(self._get_available_memory_gb())
+        logger.info(f"Selecting with {available_memory:.2f}GB available (+{reclaimable_memory:.2f}GB reclaimable)")
+        available_memory += reclaimable_memory
+    
+        # Quality hierarchy: Best model slow > Quick model > Fallback
+        # Priority 1: Try to find the BEST model for the task (even if slow)
+        # Priority 2: Fall back to quick models if needed
+        # Priority 3: Emergency fallback to tiny model
+        # Read the table once so a concurrent reload cannot mix two team versions
+        table = self.registry.table
+        if requirements.get("needs_338_languages") and "php" not in keywords:
+            keywords = (*keywords, "php")
+        route_groups = table.groups_for(requirements["domain"], keywords)
+    
+        # Try models in order: best -> quick -> fallback; latency mode collects every admissible one
+        latency_mode = requirements.get("selection") == "latency"
+        candidates = {}
+        for group_name, priority_group in route_groups:
+            for member_id in priority_group:
+                if member_id in table.members and member_id not in candidates:
+                    member = table.members[member_id]
+                    num_ctx, truncated = self._select_num_ctx(member_id, member, requirements.get("prompt", ""))
+                    if truncated and member_id != table.emergency_fallback:
+                        logger.info(f"Skipped {member_id}: {member.context_tokens}-token context cannot hold the prompt")
+                        continue
+                    resident = self.backends.resident(member_id)
+                    if resident and resident.num_ctx >= num_ctx:
+                        if not latency_mode:
+                            logger.info(f"Selected {group_name} model: {member_id} ({member.name}) - already loaded")
+                            return member_id, member
+                        candidates[member_id] = (group_name, member, num_ctx)
+                        continue
+                    
+                    # A resident model reloading at a larger context is already counted as reclaimable
+                    required_memory = self._footprint_gb(member_id, member, num_ctx)
+    
+                    if available_memory >= required_memory:
+                        admitted = f"Selected {group_name} model: {member_id} ({member.name})"
+                    else:
+                        memory_deficit = required_memory - available_memory
+                        # AGGRESSIVE EDGE MODE: Allow larger deficits for BEST models only
+                        # Special priority for Vue/React tasks to get DeepCoder
+                        if (group_name == "BEST" and memory_deficit < 6.0) or (is_react_vue and member_id == "deepcoder_primary" and memory_deficit < 8.0):
+                            admitted = f"AGGRESSIVE EDGE: Selected {member_id} with {memory_deficit:.1f}GB deficit for optimal routing"
+                        elif MEMORY_EDGE_MODE and memory_deficit < MEMORY_EDGE_LIMIT_GB:
+                            admitted = f"EDGE MODE: Selected {member_id} with {memory_deficit:.1f}GB deficit - expect 1-3 tokens/sec"
+                        else:
+                            admitted = None
+                            logger.info(f"Skipped {member_id}: needs {required_memory:.1f}GB, have {available_memory:.1f}GB")
+                    if admitted:
+                        if not latency_mode:
+                            log = logger.info if admitted.startswith("Selected") else logger.warning
+                            log(admitted)
+                            return member_id, member
+                        candidates[member_id] = (group_name, member, num_ctx)
+        
+        if candidates:
+            return self._select_by_latency(requirements, table, candidates)
+    
+        # Emergency fallback - should never reach here
+        logger.error("No model could be selected - system may be unstable")
+        return table.emergency_fallback, table.members[table.emergency_fallback]
+    
+    def _latency_breakdown(self, member_id, member, num_ctx, requirements):
+        """Estimated seconds to unload victims, load, evaluate the prompt and generate"""
+        resident = self.backends.resident(member_id)
+        unload_s = load_s = 0.0
+        if not (resident and resident.num_ctx >= num_ctx):
+            if resident:
+                victims = [member_id]  # Context growth: Ollama drops the runner before reloading
             else:
-                requirements = self._analyze_task(prompt, context)
-                member_id, member = self.select_team_member(requirements)
+                host_gb = self._get_available_memory_gb()
+                backend = self.backends.choose(member_id, self._footprint_gb(member_id, member, num_ctx), host_gb, num_ctx)
+                victims = backend.residency.plan_evictions(
+                    member_id, member, backend.free_gb(host_gb), self._learned_footprint_gb(member_id, num_ctx)
+                )
+            unload_s = sum(self.member_stats.estimate(v, "unload_time", DEFAULT_UNLOAD_S) for v in victims)
+            load_s = self._cold_load_s(member_id)
+        prompt_rate = self.member_stats.estimate(member_id, "prompt_tokens_per_s", DEFAULT_PROMPT_TOKENS_PER_S)
+        prompt_eval_s = len(requirements.get("prompt", "")) / CHARS_PER_TOKEN / max(prompt_rate, 1e-3)
+        generation_s = self._expected_generation_s(member_id, requirements)
+        return {
+            "unload_s": round(unload_s, 2),
+            "load_s": round(load_s, 2),
+            "prompt_eval_s": round(prompt_eval_s, 2),
+            "generation_s": round(generation_s, 2),
+            "latency_s": round(unload_s + load_s + prompt_eval_s + generation_s, 2)
+        }
+    
+    def _select_by_latency(self, requirements, table, candidates):
+        """Pick the candidate minimising estimated latency minus weighted quality.
+        
+        Quality is the route group's weight times the member's rating; its worth in seconds is the
+        domain's quality weight, scaled by priority and complexity so simple low-priority work
+        favours whatever is fast right now. The breakdown is kept in requirements for the metadata.
+        """
+        domain = requirements.get("domain", "default")
+        weight_s = table.quality_weight_s.get(domain, table.quality_weight_s["default"])
+        weight_s *= PRIORITY_QUALITY_SCALE.get(requirements.get("priority", "normal"), 1.0)
+        weight_s *= requirements.get("complexity", 3) / 3
+        
+        scored = {}
+        for member_id, (group_name, member, num_ctx) in candidates.items():
+            breakdown = self._latency_breakdown(member_id, member, num_ctx, requirements)
+            quality = ROUTE_GROUP_QUALITY[group_name] * member.performance_rating / 10
+            scored[member_id] = {
+                **breakdown,
+                "group": group_name,
+                "num_ctx": num_ctx,
+                "quality": round(quality, 3),
+                "score": round(breakdown["latency_s"] - weight_s * quality, 2)
+            }
+        
+        chosen = min(scored, key=lambda member_id: scored[member_id]["score"])
+        requirements["selection_breakdown"] = {
+            "mode": "latency",
+            "chosen": chosen,
+            "quality_weight_s": round(weight_s, 1),
+            "candidates": scored
+        }
+        logger.info(
+            f"Selected by latency: {chosen} (score {scored[chosen]['score']}, "
+            f"est. {scored[chosen]['latency_s']}s) over {len(scored) - 1} other candidate(s)"
+        )
+        return chosen, candidates[chosen][1]
+    
+    async def _monitor_health(self):
+        """Monitor system health and prevent OOM crashes"""
+        mem = self.memory_sampler.latest()
+        if mem.percent > 98:
+            logger.critical(f"CRITICAL MEMORY PRESSURE: {mem.percent}%")
+            # Emergency unload of every warm model held in this host's memory
+            for backend in self.backends.backends:
+                if backend.budget_gb is None:
+                    for member_id in list(backend.residency.resident):
+                        await self.unload_member(member_id, backend)
+            self.active_member = None
+            fallback = self.registry.table.emergency_fallback
+            return fallback, self.team_members[fallback]
+        return None
+    
+    async def unload_member(self, member_id, backend=None):
+        """Unload a resident member and drop it from the backend's residency table"""
+        backend = backend or self.backends.primary
+        # A member dropped by a config reload may still be resident under its old model
+        resident = backend.residency.resident.get(member_id)
+        model_id = resident.model_id if resident else self.team_members[member_id].model_id
+        unloaded = await self._unload_model(model_id, member_id, backend)
+        backend.residency.mark_unloaded(member_id)
+        if self.active_member == member_id:
+            self.active_member = None
+        return unloaded
+    
+    async def _ensure_resident(self, member_id, member, timeout, record_lookup=True, num_ctx=DEFAULT_NUM_CTX,
+                               backend=None, timings=None):
+        """Load member on backend if needed, evicting warm models there only when it does not fit.
+        
+        Returns (warm_hit, load_time_seconds); timings, if given, receives the unload and load phases.
+        """
+        backend = backend or self.backends.primary
+        residency = backend.residency
+        timings = {} if timings is None else timings
+        timings.update(unload=0.0, load=0.0)
+        # Ollama drops models past their keep_alive - mirror that locally
+        for expired_id in residency.expired():
+            logger.info(f"⌛ {expired_id} idle past keep-alive on {backend.name}, treating as unloaded")
+            residency.mark_unloaded(expired_id)
+        
+        resident = residency.resident.get(member_id)
+        if resident and resident.num_ctx >= num_ctx:
+            if record_lookup:
+                residency.record_lookup(True)
+            logger.info(f"🔥 WARM HIT: {member.name} already loaded on {backend.name}")
+            return True, 0.0
+        
+        if record_lookup:
+            residency.record_lookup(False)
+        available_gb = backend.free_gb(self._get_available_memory_gb())
+        if resident:
+            # Ollama reloads on a larger num_ctx; the old runner's memory comes back first
+            logger.info(f"📐 CONTEXT GROWTH: reloading {member.name} from num_ctx {resident.num_ctx} to {num_ctx}")
+            available_gb += resident.memory_gb
+            residency.mark_unloaded(member_id)
+        victims = residency.plan_evictions(
+            member_id, member, available_gb, self._learned_footprint_gb(member_id, num_ctx)
+        )
+        unload_start = time.time()
+        for victim_id in victims:
+            logger.info(f"♻️ EVICTING {victim_id} on {backend.name} to make room for {member_id}")
+            await self.unload_member(victim_id, backend)
+            residency.evictions += 1
+        timings["unload"] = time.time() - unload_start
+        
+        # An empty prompt loads the model without generating, which isolates load time
+        available_before_gb = self.memory_sampler.sample().available_gb
+        load_start = time.time()
+        result = await backend.client.generate(
+            model_id=member.model_id,
+            prompt="",
+            timeout=timeout,
+            options={"num_ctx": num_ctx},
+            keep_alive=MODEL_KEEP_ALIVE
+        )
+        load_time = time.time() - load_start
+        timings["load"] = load_time
+        if result["success"]:
+            logger.info(f"📥 LOADED: {member.name} (num_ctx {num_ctx}) on {backend.name} in {load_time:.1f}s")
+            if "load_duration_s" in result.get("stats", {}):
+                # Ollama's own load time, without HTTP and queueing overhead
+                self.member_stats.record(member_id, "ollama_load_s", result["stats"]["load_duration_s"])
+            footprint_gb = await self._measure_footprint(member_id, member, available_before_gb, num_ctx, backend)
+            if footprint_gb is None:
+                footprint_gb = self._footprint_gb(member_id, member, num_ctx)
+            residency.mark_loaded(member_id, member, footprint_gb, num_ctx)
+        else:
+            logger.warning(f"Load of {member.model_id} failed: {result.get('error', 'unknown')}")
+        return False, load_time
+    
+    def _plan_request(self, prompt, context):
+        """Analyse the task and select a member - no I/O, safe to run at enqueue time"""
+        analysis_start = time.time()
+        requirements = self._analyze_task(prompt, context)
+        member_id, _ = self.select_team_member(requirements)
+        # Timing marks for the phase breakdown; kept out of the requirements echoed in metadata
+        requirements["planned_at"] = time.time()
+        requirements["analysis_s"] = requirements["planned_at"] - analysis_start
+        return requirements, member_id
+    
+    def _router_error(self, error):
+        logger.error(f"Router error: {error}")
+        return {
+            "response": "Router error occurred", 
+            "metadata": {
+                "error": str(error),
+                "http_client": "AsyncOptimizedHTTPClient",
+                "phase": "4B"
+            }
+        }
+    
+    def _response_cache_key(self, member_id, prompt, context):
+        """Cache key for deterministic requests (temperature 0 or explicit opt-in), else None"""
+        opt_in = context.get("cache")
+        if opt_in is False:
+            return None
+        if not opt_in and context.get("temperature", 0.7) != 0:
+            return None
+        return ResponseCache.key(self.team_members[member_id].model_id, prompt, self._generation_options(context))
+    
+    async def _cached_response(self, cache_key, start_time):
+        if cache_key is None:
+            return None
+        payload, tier = await self.response_cache.get_async(cache_key)
+        if payload is None:
+            return None
+        metadata = {
+            **payload["metadata"],
+            "cache_hit": True,
+            "cache_tier": tier,
+            "generation_elapsed_time": payload["metadata"].get("elapsed_time"),
+            "elapsed_time": time.time() - start_time
+        }
+        logger.info(f"⚡ CACHE HIT ({tier}) for {metadata.get('member_id')} in {metadata['elapsed_time'] * 1000:.1f}ms")
+        return {"response": payload["response"], "metadata": metadata}
+    
+    def _store_response(self, cache_key, result):
+        metadata = result.get("metadata", {})
+        if cache_key is None or "error" in metadata or metadata.get("cache_hit"):
+            return
+        cached_metadata = {k: v for k, v in metadata.items() if k not in ("queue_wait", "coalesced")}
+        self.response_cache.put_deferred(cache_key, result["response"], cached_metadata)
+    
+    def _choose_backend(self, member_id, prompt, context):
+        """Backend holding member_id at an adequate context, else the least-loaded one it fits"""
+        member = self.team_members[member_id]
+        num_ctx, _ = self._select_num_ctx(member_id, member, prompt, context)
+        if self.backends.holding(member_id, num_ctx):
+            self.backends.resident_hits += 1
+        else:
+            self.backends.placements += 1
+        return self.backends.choose(
+            member_id, self._footprint_gb(member_id, member, num_ctx), self._get_available_memory_gb(), num_ctx
+        )
+    
+    @asynccontextmanager
+    async def _on_backend(self, member_id, prompt, context):
+        """Dispatch to a backend and hold its lock; in_flight counts the wait as load"""
+        backend = self._choose_backend(member_id, prompt, context)
+        self._preempt_speculative_load(backend, member_id)
+        backend.in_flight += 1
+        backend.dispatched += 1
+        try:
+            async with backend.lock:
+                yield backend
+        finally:
+            backend.in_flight -= 1
+    
+    async def route_request(self, prompt, context=None, plan=None):
+        """Route and execute immediately, bypassing the affinity queue.
+        
+        plan is a caller's {"requirements", "member_id"} from _plan_request, reused instead of planning again.
+        """
+        start_time = time.time()
+        context = context or {}
+        if plan:
+            requirements, member_id = plan["requirements"], plan["member_id"]
+        else:
+            try:
+                requirements, member_id = self._plan_request(prompt, context)
+            except Exception as e:
+                return self._router_error(e)
+        
+        cache_key = self._response_cache_key(member_id, prompt, context)
+        cached = await self._cached_response(cache_key, start_time)
+        if cached:
+            return cached
+        
+        async with self._on_backend(member_id, prompt, context) as backend:
+            result = await self._execute_request(prompt, context, requirements, member_id, start_time, backend)
+        self._store_response(cache_key, result)
+        return result
+    
+    async def submit_request(self, prompt, context=None):
+        """Queue a request so work for the loaded model is drained before a swap"""
+        start_time = time.time()
+        context = context or {}
+        try:
+            requirements, member_id = self._plan_request(prompt, context)
+        except Exception as e:
+            return self._router_error(e)
+        
+        cache_key = self._response_cache_key(member_id, prompt, context)
+        cached = await self._cached_response(cache_key, start_time)
+        if cached:
+            return cached
+        
+        key = SingleFlight.key(member_id, prompt, self._generation_options(context))
+        coalescing = context.get("coalesce", True) and key in self.single_flight.calls
+        if not coalescing:
+            rejection = self._admit(member_id, requirements, context)
+            if rejection:
+                return rejection
+        
+        if not context.get("coalesce", True):
+            result = await self._enqueue_and_wait(prompt, context, requirements, member_id)
+            self._store_response(cache_key, result)
+            return result
+        
+        # Single-flight: identical in-flight requests share one generation
+        result, shared = await self.single_flight.do(
+            key, lambda: self._enqueue_and_wait(prompt, context, requirements, member_id)
+        )
+        if shared:
+            logger.info(f"🔗 COALESCED with in-flight request for {member_id}")
+            result = {**result, "metadata": {**result.get("metadata", {}), "coalesced": True}}
+        else:
+            self._store_response(cache_key, result)
+        return result
+    
+    def _estimated_wait_s(self, priority_class):
+        """Seconds before a new request of priority_class would start.
+        
+        Learned service times of the queued work at or above its priority, plus what remains of the
+        work being served, spread over the backends. A cold member's load is counted once.
+        """
+        now = time.time()
+        loads = {}
+        work_s = 0.0
+        for item in self.request_queue.pending:
+            if item.priority_class <= priority_class:
+                work_s += self._expected_generation_s(item.member_id, item.requirements)
+                loads[item.member_id] = self._expected_load_s(item.member_id)
+        work_s += sum(loads.values())
+        for dispatched_at, expected_cost_s in self._in_service.values():
+            work_s += max(0.0, expected_cost_s - (now - dispatched_at))
+        return work_s / len(self.backends.backends)
+    
+    def _admission(self, member_id, requirements, context):
+        """(retry_after_s or None, wait_s, service_s, deadline_s) for queuing this request now"""
+        priority = str(context.get("priority", "normal")).lower()
+        wait_s = self._estimated_wait_s(PRIORITY_CLASSES.get(priority, PRIORITY_CLASSES["normal"]))
+        service_s = self._expected_load_s(member_id) + self._expected_generation_s(member_id, requirements)
+        deadline_s = context.get("deadline_s") or self.admission.default_deadline_s
+        return self.admission.evaluate(wait_s, service_s, deadline_s), wait_s, service_s, deadline_s
+    
+    def _admit(self, member_id, requirements, context, decision=None):
+        """Admission control for queued work: None to admit, else a rejection result with retry_after_s.
+        
+        decision is an earlier _admission() result to record instead of evaluating again.
+        """
+        retry_after_s, wait_s, service_s, deadline_s = decision or self._admission(member_id, requirements, context)
+        self.admission.record(member_id, wait_s, retry_after_s is None)
+        if retry_after_s is None:
+            return None
+        logger.warning(
+            f"🚦 REJECTED {member_id}: est. wait {wait_s:.0f}s + service {service_s:.0f}s "
+            f"exceeds {deadline_s:.0f}s deadline - retry after {retry_after_s}s"
+        )
+        return {
+            "response": "Router overloaded - retry later",
+            "metadata": {
+                "error": "overloaded",
+                "rejected": True,
+                "member_id": member_id,
+                "retry_after_s": retry_after_s,
+                "estimated_wait_s": round(wait_s, 1),
+                "estimated_service_s": round(service_s, 1),
+                "deadline_s": deadline_s,
+                "queue_depth": len(self.request_queue)
+            }
+        }
+    
+    async def admission_check(self, prompt, context=None):
+        """Plan a streaming request and decide its admission before the response starts.
+        
+        Returns (rejection or None, plan). Pass plan to stream_request so it neither plans, looks up the
+        cache nor decides again; only rejections are counted here, an admitted stream when stream_request
+        queues it. Cache hits are never rejected - they do not queue.
+        """
+        start_time = time.time()
+        context = context or {}
+        try:
+            requirements, member_id = self._plan_request(prompt, context)
+        except Exception:
+            return None, None  # stream_request reports the planning error itself
+        plan = {"requirements": requirements, "member_id": member_id, "admission": None}
+        plan["cached"] = await self._cached_response(self._response_cache_key(member_id, prompt, context), start_time)
+        if plan["cached"]:
+            return None, plan
+        key = SingleFlight.key(member_id, prompt, self._generation_options(context))
+        if context.get("coalesce", True) and key in self.single_flight.streams:
+            return None, plan
+        plan["admission"] = self._admission(member_id, requirements, context)
+        if plan["admission"][0] is None:
+            return None, plan
+        return self._admit(member_id, requirements, context, plan["admission"]), plan
+    
+    async def _enqueue_and_wait(self, prompt, context, requirements, member_id):
+        self._ensure_queue_worker()
+        item = self.request_queue.put(prompt, context, requirements, member_id)
+        logger.info(f"📥 QUEUED #{item.seq} for {member_id} (depth {len(self.request_queue)})")
+        return await item.future
+    
+    async def stream_request(self, prompt, context=None, plan=None):
+        """Queue a streaming request; yields token events, then a final event with routing metadata.
+        
+        plan is admission_check()'s plan for this request, reused instead of planning again.
+        """
+        start_time = time.time()
+        context = context or {}
+        if plan:
+            requirements, member_id = plan["requirements"], plan["member_id"]
+        else:
+            try:
+                requirements, member_id = self._plan_request(prompt, context)
+            except Exception as e:
+                yield {"type": "error", **self._router_error(e)}
+                return
+        
+        cache_key = self._response_cache_key(member_id, prompt, context)
+        if plan and "cached" in plan:
+            cached = plan["cached"]  # admission_check already looked
+        else:
+            cached = await self._cached_response(cache_key, start_time)
+        if cached:
+            yield {"type": "token", "content": cached["response"]}
+            yield {"type": "done", "metadata": cached["metadata"]}
+            return
+        
+        key = SingleFlight.key(member_id, prompt, self._generation_options(context))
+        if not (context.get("coalesce", True) and key in self.single_flight.streams):
+            rejection = self._admit(member_id, requirements, context, plan and plan["admission"])
+            if rejection:
+                yield {"type": "error", **rejection}
+                return
+        
+        if not context.get("coalesce", True):
+            events = self._stream_queued(prompt, context, requirements, member_id)
+            shared_stream = None
+        else:
+            # Followers attach to the leader's token stream, replaying what they missed
+            shared_stream = self.single_flight.stream(
+                key, lambda: self._stream_queued(prompt, context, requirements, member_id)
+            )
+            events = None
+        
+        parts = [] if cache_key else None
+        async for event, shared in (self._unshared(events) if events else shared_stream):
+            if event["type"] == "token" and parts is not None:
+                parts.append(event["content"])
+            if event["type"] == "done":
+                if shared:
+                    event = {**event, "metadata": {**event["metadata"], "coalesced": True}}
+                elif parts is not None:
+                    self._store_response(cache_key, {"response": "".join(parts), "metadata": event["metadata"]})
+            yield event
+    
+    @staticmethod
+    async def _unshared(events):
+        async for event in events:
+            yield event, False
+    
+    async def _stream_queued(self, prompt, context, requirements, member_id):
+        self._ensure_queue_worker()
+        item = self.request_queue.put(prompt, context, requirements, member_id, stream=True)
+        logger.info(f"📥 QUEUED STREAM #{item.seq} for {member_id} (depth {len(self.request_queue)})")
+        try:
+            release, backend = await item.future
+        except asyncio.CancelledError:
+            if item.future.done() and not item.future.cancelled() and item.future.exception() is None:
+                item.future.result()[0].set()  # Dispatched just as the caller went away
+            raise
+        except Exception as e:
+            yield {"type": "error", **self._router_error(e)}
+            return
+        
+        # The queue worker holds the backend's lock until release is set; a reload may have re-planned the item
+        execution = self._execute_stream(prompt, context, item.requirements, item.member_id, item.enqueued_at, backend)
+        try:
+            async for event in execution:
+                if event["type"] == "done":
+                    event["metadata"]["queue_wait"] = item.dispatched_at - item.enqueued_at
+                    event["metadata"]["expected_cost_s"] = round(item.expected_cost_s, 2)
+                yield event
+        finally:
+            # On disconnect, finish the generation's own cleanup (loads, drafts) while the lock is still held
+            await execution.aclose()
+            release.set()
+    
+    def _ensure_queue_worker(self):
+        if self._queue_worker is None or self._queue_worker.done():
+            self._queue_worker = asyncio.create_task(self._run_queue())
+    
+    def _member_memory_gb(self, member_id):
+        """Static size of member_id; a member dropped by a reload is costed like the largest current one"""
+        member = self.team_members.get(member_id)
+        if member is not None:
+            return member.memory_gb
+        return max((m.memory_gb for m in self.team_members.values()), default=0.0)
+    
+    def _cold_load_s(self, member_id):
+        return self.member_stats.estimate(member_id, "load_time", DEFAULT_LOAD_S_PER_GB * self._member_memory_gb(member_id))
+    
+    def _expected_load_s(self, member_id):
+        if self.backends.is_resident(member_id):
+            return 0.0
+        return self._cold_load_s(member_id)
+    
+    def _maybe_replan_residency(self):
+        """Recompute the co-residency plan when memory pressure or the traffic mix changes"""
+        mem = self.memory_sampler.latest()
+        if not self.coresidency.needs_replan(mem.percent):
+            return
+        budget_gb = min(
+            self.residency.budget_gb,
+            self.backends.primary.free_gb(self._get_available_memory_gb()) + self.residency.resident_memory_gb()
+        )
+        plan = self.coresidency.replan(self.team_members, self._cold_load_s, budget_gb, mem.percent, self._footprint_gb)
+        self.residency.planned = plan
+        logger.info(f"🧩 CO-RESIDENCY PLAN ({budget_gb:.1f}GB): {sorted(plan)}")
+    
+    def start_background_tasks(self):
+        """Start loop-bound workers; call from a running event loop"""
+        if self._preload_task is None or self._preload_task.done():
+            self._preload_task = asyncio.create_task(self._run_idle_preloader())
+        if self._team_config_task is None or self._team_config_task.done():
+            self._team_config_task = asyncio.create_task(self._watch_team_config())
+        if self._memory_sampler_task is None or self._memory_sampler_task.done():
+            self._memory_sampler_task = asyncio.create_task(self._run_memory_sampler())
+    
+    async def _run_memory_sampler(self):
+        while True:
+            try:
+                self.memory_sampler.sample()
+            except Exception as e:
+                logger.warning(f"Memory sample failed: {e}")
+            await asyncio.sleep(self.memory_sampler.interval_s)
+    
+    async def _watch_team_config(self):
+        while True:
+            await asyncio.sleep(TEAM_CONFIG_POLL_S)
+            if self.registry.reload_if_changed():
+                self._reconcile_team()
+    
+    async def _run_idle_preloader(self):
+        while True:
+            await asyncio.sleep(PRELOAD_CHECK_INTERVAL_S)
+            try:
+                await self._preload_predicted()
+            except Exception as e:
+                logger.warning(f"Predictive preload failed: {e}")
     
-                if self.active_member and self.active_member != member_id:
-                    self._unload_model(self.team_members[self.active_member].model_id)
+    async def _preload_predicted(self):
+        """Warm the predicted next member with a keep-alive load while the router is idle"""
+        if self.request_queue.pending or any(b.lock.locked() for b in self.backends.backends):
+            return None
+        if time.time() - self._last_request_at < self.preload_idle_s:
+            return None
+        
+        member_id, confidence = self.predictor.predict()
+        if member_id is None or confidence < PRELOAD_MIN_CONFIDENCE:
+            return None
+        if self.predictor.preloaded == member_id:
+            return None  # Already warmed during this idle period
+        
+        member = self.team_members.get(member_id)
+        if member is None:
+            return None  # Learned before a reload removed it
+        backend = self._choose_backend(member_id, "", {})
+        if backend.lock.locked() or self._evicts_for_guess(backend, member_id, member):
+            return None
+        # Own task, so a real request can cancel the load without stopping the idle loop
+        load = asyncio.create_task(self._speculative_load(backend, member_id, member))
+        await asyncio.wait([load])
+        if load.cancelled():
+            return None
+        warm, _ = load.result()
+        if not warm:
+            logger.info(f"🔮 PREDICTIVE PRELOAD: {member.name} (p={confidence:.2f})")
+            self.predictor.preloads += 1
+        self.predictor.preloaded = member_id
+        return member_id
+    
+    def _schedule_residency_plan(self):
+        """Start the plan preload in its own task once the queue has drained"""
+        if self.request_queue.pending:
+            return
+        if self._plan_preload_task is None or self._plan_preload_task.done():
+            self._plan_preload_task = asyncio.create_task(self._apply_residency_plan())
+    
+    def _evicts_for_guess(self, backend, member_id, member):
+        """True when preloading member_id on backend would evict a resident model"""
+        free_gb = backend.free_gb(self._get_available_memory_gb())
+        return bool(backend.residency.plan_evictions(member_id, member, free_gb, self._learned_footprint_gb(member_id)))
+    
+    async def _speculative_load(self, backend, member_id, member):
+        """Load a member nobody has asked for yet; _preempt_speculative_load cancels it for real work"""
+        async with backend.lock:  # Callers checked it is free, so taken without waiting
+            self._speculative_loads[backend] = (asyncio.current_task(), member_id)
+            try:
+                timeout = self._timeouts_for(member_id, member, "", {})["load_s"]
+                return await self._ensure_resident(member_id, member, timeout=timeout, record_lookup=False, backend=backend)
+            finally:
+                self._speculative_loads.pop(backend, None)
+    
+    def _preempt_speculative_load(self, backend, member_id):
+        """A real request for another member cancels the preload on its backend instead of waiting behind it"""
+        task, loading = self._speculative_loads.get(backend, (None, None))
+        if task is None or task.done() or loading == member_id:
+            return
+        logger.info(f"🔮 PRELOAD of {loading} cancelled: request for {member_id} arrived")
+        task.cancel()
+    
+    async def _apply_residency_plan(self):
+        """Preload planned members that fit on the primary backend without evicting anything.
+        
+        Only while the queue is empty and the primary is idle; requests for other members cancel it.
+        """
+        primary = self.backends.primary
+        self._reconcile_team()
+        for member_id in sorted(self.residency.planned - set(self.residency.resident)):
+            if self.request_queue.pending or primary.lock.locked():
+                return  # Real work arrived - stop preloading
+            member = self.team_members.get(member_id)
+            if member is None or self._evicts_for_guess(primary, member_id, member):
+                continue
+            logger.info(f"🧩 PRELOAD (plan): {member.name}")
+            await self._speculative_load(primary, member_id, member)
+    
+    def _expected_generation_s(self, member_id, requirements):
+        baseline = self.member_stats.estimate(
+            member_id, "generation_time", DEFAULT_GENERATION_S_PER_GB * self._member_memory_gb(member_id)
+        )
+        return baseline * requirements.get("complexity", 3) / 3
+    
+    def _expected_cost_s(self, item):
+        """Predicted load time (zero when warm) plus predicted generation time"""
+        return self._expected_load_s(item.member_id) + self._expected_generation_s(item.member_id, item.requirements)
+    
+    def _queue_cost_s(self, item):
+        """_expected_cost_s for scheduling; an item that cannot be costed is dispatched last and fails there"""
+        try:
+            return self._expected_cost_s(item)
+        except Exception as e:
+            logger.error(f"Cannot cost queued #{item.seq} for {item.member_id}: {e}")
+            return float("inf")
+    
+    async def _run_queue(self):
+        """Single consumer: dispatch queued requests, at most one generation per backend at a time"""
+        slots = asyncio.Semaphore(len(self.backends.backends))
+        while True:
+            await slots.acquire()
+            try:
+                self._reconcile_team()
+                item = await self.request_queue.get(self._queue_cost_s)
+            except Exception as e:
+                # Not caused by one item (those are costed last and failed when served): never strand callers
+                logger.error(f"Queue dispatch failed, failing {len(self.request_queue)} queued request(s): {e}")
+                for pending in self.request_queue.pending:
+                    self._fail_queued(pending, e)
+                self.request_queue.pending.clear()
+                slots.release()
+                raise
+            except BaseException:
+                slots.release()
+                raise
+            task = asyncio.create_task(self._run_queued_item(item))
+            self._queue_tasks.add(task)
+            task.add_done_callback(self._queue_tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+    
+    async def _run_queued_item(self, item):
+        queue_wait = item.dispatched_at - item.enqueued_at
+        if not self.backends.is_resident(item.member_id):
+            self.request_queue.swaps += 1
+        self._in_service[item.seq] = (item.dispatched_at, item.expected_cost_s)
+        try:
+            await self._serve_queued_item(item, queue_wait)
+        except Exception as e:
+            self._fail_queued(item, e)
+        finally:
+            self._in_service.pop(item.seq, None)
+        
+        if not self.request_queue.pending:
+            self._schedule_residency_plan()
+    
+    def _fail_queued(self, item, error):
+        """Complete a queued request with error: a router error result, or raised into a waiting stream"""
+        if item.future.done():
+            return
+        if item.stream:
+            item.future.set_exception(error)
+        else:
+            item.future.set_result(self._router_error(error))
+    
+    def _reconcile_team(self):
+        """After a team config reload, re-plan queued work and drop planned residency for removed members"""
+        table = self.registry.table
+        if table is self._team_table:
+            return
+        self._team_table = table
+        members = table.members
+        self.residency.planned = frozenset(m for m in self.residency.planned if m in members)
+        self.coresidency.plan = frozenset(m for m in self.coresidency.plan if m in members)
+        for item in list(self.request_queue.pending):
+            if item.member_id in members:
+                continue
+            try:
+                item.requirements, member_id = self._plan_request(item.prompt, item.context)
+            except Exception as e:
+                logger.error(f"Re-planning queued #{item.seq} failed: {e}")
+                self.request_queue.pending.remove(item)
+                self._fail_queued(item, e)
+                continue
+            logger.info(f"🔁 RE-PLANNED queued #{item.seq}: {item.member_id} left the team, now {member_id}")
+            item.member_id = member_id
+    
+    async def _serve_queued_item(self, item, queue_wait):
+        if item.stream:
+            # Hand the backend to the streaming caller until it finishes
+            release = asyncio.Event()
+            async with self._on_backend(item.member_id, item.prompt, item.context) as backend:
+                if item.future.done():
+                    return
+                item.future.set_result((release, backend))
+                await release.wait()
+        else:
+            try:
+                async with self._on_backend(item.member_id, item.prompt, item.context) as backend:
+                    result = await self._execute_request(
+                        item.prompt, item.context, item.requirements, item.member_id, item.enqueued_at, backend
+                    )
+            except Exception as e:
+                result = self._router_error(e)
+            
+            metadata = result.setdefault("metadata", {})
+            metadata["queue_wait"] = queue_wait
+            metadata["expected_cost_s"] = round(item.expected_cost_s, 2)
+            if not item.future.done():
+                item.future.set_result(result)
+    
+    def _static_timeout_s(self, member):
+        """PHASE 4B: timeout by model size (Phase 4A proven values) - used until a member has history"""
+        if member.memory_gb >= 8.0:  # Large models (DeepCoder, Qwen, DeepSeek)
+            return 300  # 5 minutes - Phase 4A proven successful
+        elif member.memory_gb >= 4.0:  # Medium models
+            return 240  # 4 minutes for medium models
+        return 180  # 3 minutes for small models
+    
+    def _timeouts_for(self, member_id, member, prompt, context):
+        """Load, generation and no-token timeouts from the member's observed distributions.
+        
+        Pessimistic inputs (p95 load time, p5 throughput) times TIMEOUT_SLACK, scaled by the
+        estimated prompt and output length; static size tiers fill in until samples exist.
+        """
+        stats = self.member_stats
+        learned = lambda metric: stats.count(member_id, metric) >= ADAPTIVE_TIMEOUT_MIN_SAMPLES
+        static_s = self._static_timeout_s(member)
+        clamp = lambda value, low, high: round(max(low, min(high, value)), 1)
+        
+        load_s = static_s
+        if learned("load_time"):
+            load_s = clamp(stats.percentile(member_id, "load_time", 95) * TIMEOUT_SLACK, TIMEOUT_FLOOR_S, TIMEOUT_CEILING_S)
+        
+        prompt_tokens = len(prompt) / CHARS_PER_TOKEN
+        prompt_rate = DEFAULT_PROMPT_TOKENS_PER_S
+        if learned("prompt_tokens_per_s"):
+            prompt_rate = stats.percentile(member_id, "prompt_tokens_per_s", 5)
+        prompt_s = prompt_tokens / max(prompt_rate, 1e-3)
+        
+        output_tokens = self._output_limit(context)
+        if not output_tokens:
+            output_tokens = DEFAULT_OUTPUT_TOKENS
+            if learned("output_tokens"):
+                output_tokens = stats.percentile(member_id, "output_tokens", 95)
+        
+        if learned("tokens_per_s"):
+            token_rate = stats.percentile(member_id, "tokens_per_s", 5)
+            generation_s = clamp((prompt_s + output_tokens / max(token_rate, 1e-3)) * TIMEOUT_SLACK, TIMEOUT_FLOOR_S, TIMEOUT_CEILING_S)
+            no_token_s = clamp(prompt_s * TIMEOUT_SLACK + NO_TOKEN_FLOOR_S, NO_TOKEN_FLOOR_S, NO_TOKEN_CEILING_S)
+            source = "learned"
+        else:
+            generation_s = max(static_s, clamp(prompt_s * TIMEOUT_SLACK, 0, TIMEOUT_CEILING_S))
+            no_token_s = NO_TOKEN_CEILING_S
+            source = "static"
+        
+        return {
+            "load_s": load_s,
+            "generation_s": generation_s,
+            "no_token_s": no_token_s,
+            "estimated_prompt_tokens": int(prompt_tokens),
+            "estimated_output_tokens": int(output_tokens),
+            "source": source
+        }
+    
+    async def _prepare_member(self, member_id, prompt, context, backend=None, timings=None):
+        """Apply the health check, pick the timeouts and context size, and make the member resident on backend.
+        
+        Returns (member_id, member, timeouts, warm_hit, load_time, num_ctx).
+        """
+        member = self.team_members[member_id]
+        
+        # Health monitoring - emergency fallback
+        health_issue = await self._monitor_health()
+        if health_issue:
+            member_id, member = health_issue
+            logger.info(f"EMERGENCY MODE: Using {member.name} due to memory pressure")
+        
+        timeouts = self._timeouts_for(member_id, member, prompt, context)
+        logger.info(
+            f"Using {timeouts['source']} timeouts for {member.name}: load {timeouts['load_s']}s, "
+            f"generation {timeouts['generation_s']}s, no-token {timeouts['no_token_s']}s"
+        )
+        
+        num_ctx, truncated = self._select_num_ctx(member_id, member, prompt, context)
+        if truncated:
+            logger.warning(f"✂️ Prompt exceeds {member.name}'s {member.context_tokens}-token context and will be truncated")
+        
+        # Warm residency: only unload what the selected member needs to fit
+        warm_hit, load_time = await self._ensure_resident(
+            member_id, member, timeouts["load_s"], num_ctx=num_ctx, backend=backend, timings=timings
+        )
+        self.active_member = member_id
+        return member_id, member, timeouts, warm_hit, load_time, num_ctx
+    
+    def _record_throughput(self, member_id, prompt, output_tokens, generation_time, first_token_s=None, stats=None):
+        """Learn tokens/sec, prompt processing rate and output length for adaptive timeouts.
 
-            self.active_member = member_id
+        Ollama's reported counts and durations (stats) are used when present; the character
+        and wall-clock estimates are the fallback.
+        """
+        stats = stats or {}
+        output_tokens = stats.get("eval_count", output_tokens)
+        if output_tokens <= 0 or generation_time <= 0:
+            return
+        self.member_stats.record(member_id, "output_tokens", output_tokens)
+        if first_token_s is not None:
+            self.member_stats.record(member_id, "first_token_s", first_token_s)
+        elif "total_duration_s" in stats:
+            # Buffered: no token is seen, but Ollama's time before decoding is the same wait (feeds hedging)
+            self.member_stats.record(member_id, "first_token_s", stats["total_duration_s"] - stats.get("eval_duration_s", 0.0))
+        if "tokens_per_s" in stats:
+            self.member_stats.record(member_id, "tokens_per_s", stats["tokens_per_s"])
+            if "prompt_tokens_per_s" in stats:
+                self.member_stats.record(member_id, "prompt_tokens_per_s", stats["prompt_tokens_per_s"])
+        elif first_token_s is not None and 0 < first_token_s < generation_time:
+            # Streaming separates prompt evaluation (time to first token) from decoding
+            self.member_stats.record(member_id, "prompt_tokens_per_s", len(prompt) / CHARS_PER_TOKEN / first_token_s)
+            self.member_stats.record(member_id, "tokens_per_s", output_tokens / (generation_time - first_token_s))
+        else:
+            self.member_stats.record(member_id, "tokens_per_s", output_tokens / generation_time)
+    
+    def _hedge_delay_s(self, member_id, context):
+        """Seconds without a first token before hedging; None when hedging is off or not yet learned"""
+        if not context.get("hedge", HEDGE_REQUESTS):
+            return None
+        if self.member_stats.count(member_id, "first_token_s") < ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY_S, self.member_stats.percentile(member_id, "first_token_s", HEDGE_PERCENTILE))
+    
+    def _hedge_target(self, member_id, member, backend, prompt, context, requirements):
+        """Where a backup attempt can start without loading anything.
+        
+        The same member resident on another idle, healthy backend comes first, then, in route-group
+        order, a member lighter than the original that is resident somewhere.
+        Returns (member_id, member, backend, num_ctx) or None.
+        """
+        needed = self._context_tokens_needed(prompt, context)
+        others = [b for b in self.backends.backends if b is not backend and b.healthy and not b.lock.locked()]
+        fits = lambda candidate_id, b: (
+            candidate_id in b.residency.resident and b.residency.resident[candidate_id].num_ctx >= needed
+        )
+        for other in others:
+            if fits(member_id, other):
+                return member_id, member, other, other.residency.resident[member_id].num_ctx
+        
+        table = self.registry.table
+        for _, group in table.groups_for(requirements.get("domain", "default"), requirements.get("keywords", ())):
+            for candidate_id in group:
+                candidate = table.members.get(candidate_id)
+                if candidate is None or candidate.memory_gb >= member.memory_gb:
+                    continue
+                for b in (*others, backend):
+                    if fits(candidate_id, b):
+                        return candidate_id, candidate, b, b.residency.resident[candidate_id].num_ctx
+        return None
+    
+    def _start_attempt(self, member_id, member, backend, prompt, context, timeouts, num_ctx, accumulate=False, max_tokens=None):
+        options = self._generation_options(context, num_ctx)
+        if max_tokens:
+            options["num_predict"] = min(options.get("num_predict", max_tokens), max_tokens)
+        stream = backend.client.stream_tokens(
+            model_id=member.model_id,
+            prompt=prompt,
+            options=options,
+            keep_alive=MODEL_KEEP_ALIVE,
+            no_token_timeout=timeouts["no_token_s"],
+            total_timeout=timeouts["generation_s"] if timeouts["source"] == "learned" else 900,
+            accumulate=accumulate
+        )
+        return GenerationAttempt(member_id, member, backend, stream).start()
+    
+    async def _open_stream(self, member_id, member, backend, prompt, context, requirements, timeouts, num_ctx, accumulate=False):
+        """Start the generation stream and wait for its first token.
+        
+        With hedging on, a request still silent after the member's learned first-token percentile
+        races a backup attempt; the first to emit a token wins and the other is cancelled.
+        Returns (attempt, first_token or None, hedge info or None).
+        """
+        attempts = [self._start_attempt(member_id, member, backend, prompt, context, timeouts, num_ctx, accumulate)]
+        try:
+            hedge_after_s = self._hedge_delay_s(member_id, context)
+            hedge = None
+            if hedge_after_s is not None:
+                hedge = {"after_s": round(hedge_after_s, 2), "fired": False}
+                done, _ = await asyncio.wait({attempts[0].first_token}, timeout=hedge_after_s)
+                target = None if done else self._hedge_target(member_id, member, backend, prompt, context, requirements)
+                # Another backend's lock keeps its residency stable under the hedge; skip the hedge if it is busy
+                holds_lock = bool(target) and target[2] is not backend
+                if holds_lock and not await target[2].try_acquire():
+                    target = None
+                if target:
+                    hedge_id, hedge_member, hedge_backend, hedge_ctx = target
+                    logger.warning(
+                        f"🪂 HEDGE: no token from {member.name} after {hedge_after_s:.1f}s - "
+                        f"racing {hedge_member.name} on {hedge_backend.name}"
+                    )
+                    hedge_timeouts = self._timeouts_for(hedge_id, hedge_member, prompt, context)
+                    attempt = self._start_attempt(
+                        hedge_id, hedge_member, hedge_backend, prompt, context, hedge_timeouts, hedge_ctx, accumulate
+                    )
+                    attempt.holds_lock = holds_lock
+                    attempts.append(attempt)
+                    hedge.update(fired=True, member_id=hedge_id, backend=hedge_backend.name)
+                    self.hedges["fired"] += 1
             
-            # PHASE 4B: Intelligent timeout based on model size (Phase 4A proven values)
-            model_timeout = 60  # Base timeout
-            if member.memory_gb >= 8.0:  # Large models (DeepCoder, Qwen, DeepSeek)
-                model_timeout = 300  # 5 minutes - Phase 4A proven successful
-            elif member.memory_gb >= 4.0:  # Medium models
-                model_timeout = 240  # 4 minutes for medium models
+            winner, first_token = None, None
+            pending = {attempt.first_token: attempt for attempt in attempts}
+            while pending and first_token is None:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    attempt = pending.pop(task)
+                    try:
+                        first_token = task.result()
+                        winner = attempt
+                        break
+                    except StopAsyncIteration:
+                        winner = winner or attempt  # Ended without a token; its stream.error says why
+        except BaseException:
+            for attempt in attempts:
+                await attempt.cancel()
+            raise
+        
+        for attempt in attempts:
+            if attempt is not winner:
+                await attempt.cancel()
+        if hedge and hedge["fired"]:
+            hedge["winner"] = "hedge" if winner is attempts[1] else "original"
+            if winner is attempts[1]:
+                self.hedges["won"] += 1
+        return winner, first_token, hedge
+    
+    def _adopt_winner(self, attempt, hedge, member_id, member, backend, warm_hit, load_time):
+        """Bookkeeping moves to a winning hedge, which always ran on an already resident model"""
+        if not (hedge and hedge.get("winner") == "hedge"):
+            return member_id, member, backend, warm_hit, load_time
+        if not warm_hit:
+            self.member_stats.record(member_id, "load_time", load_time)  # The original's load still happened
+        return attempt.member_id, attempt.member, attempt.backend, True, 0.0
+    
+    def _draft_target(self, member_id, member, backend, prompt, context):
+        """A resident draft member the coming load will not evict, for a member that is not warm.
+        
+        Returns (member_id, member, backend, num_ctx) or None.
+        """
+        if not context.get("draft", SPECULATIVE_DRAFT) or member_id in DRAFT_MEMBERS:
+            return None
+        num_ctx, _ = self._select_num_ctx(member_id, member, prompt, context)
+        resident = backend.residency.resident.get(member_id)
+        if resident and resident.num_ctx >= num_ctx:
+            return None  # Warm: the answer starts as fast as a draft would
+        victims = None
+        for draft_id in DRAFT_MEMBERS:
+            draft_member = self.team_members.get(draft_id)
+            if draft_member is None:
+                continue
+            for b in self.backends.backends:
+                entry = b.residency.resident.get(draft_id)
+                if entry is None or not b.healthy:
+                    continue
+                if b is backend:
+                    if victims is None:
+                        victims = backend.residency.plan_evictions(
+                            member_id, member, backend.free_gb(self._get_available_memory_gb()),
+                            self._learned_footprint_gb(member_id, num_ctx)
+                        )
+                    if draft_id in victims:
+                        continue
+                return draft_id, draft_member, b, entry.num_ctx
+        return None
+    
+    async def _stream_draft(self, target, backend, prompt, context, ready, info):
+        """Yield draft events from target until it finishes or the task ready completes.
+        
+        A draft still running when the real member is ready is cut, so the answer replaces it;
+        one that finished first is followed by the answer. info collects the draft's metadata.
+        A draft on another backend than the request's holds that backend's lock, and is skipped
+        (no events) when the lock is busy.
+        """
+        draft_id, draft_member, draft_backend, draft_ctx = target
+        holds_lock = draft_backend is not backend
+        if holds_lock and not await draft_backend.try_acquire():
+            return  # A request there could evict or reload the draft model mid-stream
+        logger.info(f"✏️ DRAFT: {draft_member.name} on {draft_backend.name} while the selected member loads")
+        timeouts = self._timeouts_for(draft_id, draft_member, prompt, context)
+        attempt = self._start_attempt(
+            draft_id, draft_member, draft_backend, prompt, context, timeouts, draft_ctx, max_tokens=DRAFT_MAX_TOKENS
+        )
+        attempt.holds_lock = holds_lock
+        start = time.time()
+        info.update(member_id=draft_id, member=draft_member.name, backend=draft_backend.name, tokens=0, complete=False)
+        try:
+            yield {"type": "draft_start", "member_id": draft_id, "member": draft_member.name}
+            while True:
+                next_token = attempt.first_token
+                done, _ = await asyncio.wait({next_token, ready}, return_when=asyncio.FIRST_COMPLETED)
+                if next_token not in done:
+                    break  # The selected member is ready - its answer replaces the draft
+                try:
+                    token = next_token.result()
+                except StopAsyncIteration:
+                    info["complete"] = attempt.stream.error is None
+                    break
+                info["tokens"] += 1
+                if info["tokens"] == 1:
+                    info["time_to_first_token"] = time.time() - start
+                yield {"type": "draft", "content": token}
+                attempt.first_token = asyncio.ensure_future(attempt.iterator.__anext__())
+        finally:
+            if info["complete"]:
+                await attempt.finish()
             else:
-                model_timeout = 180  # 3 minutes for small models
-            
-            logger.info(f"Using {model_timeout}s timeout for {member.memory_gb}GB model")
+                await attempt.cancel()
+        info["elapsed_time"] = time.time() - start
+        info["replaced"] = not info["complete"]
+        yield {"type": "draft_done", "metadata": dict(info)}
+    
+    @staticmethod
+    def _output_limit(context):
+        """The request's output token cap (num_predict, or max_tokens as an alias), else None"""
+        limit = context.get("num_predict") or context.get("max_tokens")
+        return int(limit) if limit else None
+    
+    def _generation_options(self, context, num_ctx=DEFAULT_NUM_CTX):
+        """Ollama options; the output cap is sent so the timeouts sized from it hold"""
+        options = {
+            "temperature": context.get("temperature", 0.7),
+            "num_ctx": num_ctx
+        }
+        output_limit = self._output_limit(context)
+        if output_limit:
+            options["num_predict"] = output_limit
+        return options
+    
+    def _record_completion(self, member_id, member, requirements, context, warm_hit, load_time, generation_time, elapsed,
+                           backend=None, timings=None):
+        """Update residency, learned statistics, phase histograms and history after a successful generation.
+        
+        Returns the response metadata.
+        """
+        backend = backend or self.backends.primary
+        if not warm_hit:
+            self.member_stats.record(member_id, "load_time", load_time)
+        # Normalise to complexity 3 so estimates transfer across requests
+        complexity = requirements.get("complexity", 3) if requirements else 3
+        self.member_stats.record(member_id, "generation_time", generation_time * 3 / complexity)
+        backend.residency.touch(member_id)
+        if not backend.residency.is_resident(member_id):
+            # Explicit load failed but generation loaded it anyway
+            backend.residency.mark_loaded(member_id, member)
+        self.coresidency.observe(member_id)
+        self._maybe_replan_residency()
+        
+        self.request_history.append({
+            "timestamp": time.time(),
+            "member_id": member_id,
+            "domain": requirements.get("domain") if requirements else None,
+            "priority": context.get("priority", "normal"),
+            "elapsed_time": elapsed
+        })
+        self.predictor.record(member_id)
+        self.predictor.predict()
+        
+        timings = {**(timings or {}), "total": elapsed}
+        self.latency.record(member_id, requirements.get("domain") if requirements else None, timings)
+        
+        return {
+            "model": member.model_id,
+            "member": member.name,
+            "member_id": member_id,
+            "elapsed_time": elapsed,
+            "warm_hit": warm_hit,
+            "load_time": load_time,
+            "requirements": {
+                k: v for k, v in requirements.items() if k not in ("selection_breakdown", "planned_at", "analysis_s")
+            } if requirements else requirements,
+            "selection": (requirements or {}).get("selection_breakdown", {"mode": "tiers"}),
+            "backend": backend.name,
+            "timings": {phase: round(seconds, 4) for phase, seconds in timings.items() if seconds is not None},
+            "http_client": "AsyncOptimizedHTTPClient",
+            "phase": "4B"
+        }
+    
+    def _start_timings(self, requirements):
+        """Queue wait (planning to execution, including the backend lock) and analysis phases"""
+        requirements = requirements or {}
+        planned_at = requirements.get("planned_at")
+        return {
+            "queue_wait": time.time() - planned_at if planned_at else None,
+            "analysis": requirements.get("analysis_s")
+        }
+    
+    @staticmethod
+    def _rounded_stats(stats):
+        """Ollama's reported timings for response metadata"""
+        return {key: round(value, 4) if isinstance(value, float) else value for key, value in stats.items()}
+    
+    @staticmethod
+    def _stream_timings(timings, stream, generation_time):
+        """Prompt eval (as reported by Ollama), time to first token and decoding from a finished stream"""
+        timings["prompt_eval"] = stream.stats.get("prompt_eval_duration_s")
+        if stream.first_token_time is not None:
+            timings["first_token"] = stream.first_token_time
+            timings["generation"] = max(0.0, generation_time - stream.first_token_time)
+        else:
+            timings["generation"] = generation_time
+    
+    async def _execute_request(self, prompt, context, requirements, member_id, start_time, backend=None):
+        backend = backend or self.backends.primary
+        self._last_request_at = time.time()
+        timings = self._start_timings(requirements)
+        try:
+            member_id, member, timeouts, warm_hit, load_time, num_ctx = await self._prepare_member(
+                member_id, prompt, context, backend, timings
+            )
             
-            # PHASE 4B: Use OptimizedHTTPClient instead of aiohttp
-            result = self.ollama_client.generate(
-                model_id=member.model_id,
-                prompt=prompt,
-                timeout=model_timeout,
-                options={
-                    "temperature": context.get("temperature", 0.7),
-                    "num_ctx": 2048  # Phase 4A proven value - was 32768 (too large!)
+            hedge = None
+            if self._hedge_delay_s(member_id, context) is None:
+                result = await backend.client.generate(
+                    model_id=member.model_id,
+                    prompt=prompt,
+                    timeout=timeouts["generation_s"],
+                    options=self._generation_options(context, num_ctx),
+                    keep_alive=MODEL_KEEP_ALIVE
+                )
+                output_tokens, first_token_s = len(result.get("response", "")) / CHARS_PER_TOKEN, None
+                stats = result.get("stats", {})
+                timings["prompt_eval"] = stats.get("prompt_eval_duration_s")
+                timings["generation"] = stats.get("eval_duration_s", result.get("response_time"))
+            else:
+                # Hedging needs the first-token signal, so the generation is streamed and collected
+                generation_start = time.time()
+                attempt, _, hedge = await self._open_stream(
+                    member_id, member, backend, prompt, context, requirements, timeouts, num_ctx, accumulate=True
+                )
+                try:
+                    async for _ in attempt.iterator:
+                        pass
+                finally:
+                    await attempt.finish()
+                stream = attempt.stream
+                result = {
+                    "success": stream.error is None,
+                    "response": stream.text,
+                    "error": stream.error,
+                    "response_time": time.time() - generation_start
                 }
-            )
+                output_tokens, first_token_s, stats = stream.chunk_count - 1, stream.first_token_time, stream.stats
+                self._stream_timings(timings, stream, result["response_time"])
+                member_id, member, backend, warm_hit, load_time = self._adopt_winner(
+                    attempt, hedge, member_id, member, backend, warm_hit, load_time
+                )
             
             if result["success"]:
                 elapsed = time.time() - start_time
-                
-                # CRITICAL FIX: Unload model after each request to free memory for next request
-                logger.info(f"🧹 REQUEST COMPLETE: Unloading {member.model_id} to free memory for next request")
-                self._unload_model(member.model_id)
-                self.active_member = None
-                
+                self._record_throughput(member_id, prompt, output_tokens, result["response_time"], first_token_s, stats)
+                metadata = self._record_completion(
+                    member_id, member, requirements, context, warm_hit, load_time, result["response_time"], elapsed,
+                    backend, timings
+                )
+                metadata["timeouts"] = timeouts
+                metadata["num_ctx"] = num_ctx
+                metadata["context_truncated"] = self._context_tokens_needed(prompt, context) > num_ctx
+                metadata["ollama"] = self._rounded_stats(stats)
+                if hedge:
+                    metadata["hedge"] = hedge
                 return {
                     "response": result["response"],
-                    "metadata": {
-                        "model": member.model_id,
-                        "member": member.name,
-                        "elapsed_time": elapsed,
-                        "requirements": requirements,
-                        "http_client": "OptimizedHTTPClient",
-                        "phase": "4B"
-                    }
+                    "metadata": metadata
                 }
             else:
                 logger.error(f"Generation failed: {result.get('error', 'unknown')}")
@@ -643,41 +3578,170 @@ class AITeamRouter:
                         "error": result.get('error', 'unknown'),
                         "model": member.model_id,
                         "member": member.name,
-                        "http_client": "OptimizedHTTPClient",
+                        "backend": backend.name,
+                        "http_client": "AsyncOptimizedHTTPClient",
                         "phase": "4B"
                     }
                 }
         except Exception as e:
-            logger.error(f"Router error: {e}")
-            return {
-                "response": "Router error occurred", 
-                "metadata": {
-                    "error": str(e),
-                    "http_client": "OptimizedHTTPClient",
-                    "phase": "4B"
+            return self._router_error(e)
+    
+    async def _execute_stream(self, prompt, context, requirements, member_id, start_time, backend=None):
+        """Async generator of stream events for one generation"""
+        backend = backend or self.backends.primary
+        self._last_request_at = time.time()
+        timings = self._start_timings(requirements)
+        try:
+            draft_target = self._draft_target(member_id, self.team_members[member_id], backend, prompt, context)
+            draft = None
+            if draft_target:
+                # The load runs as a task so the draft streams while it is in progress
+                ready = asyncio.ensure_future(self._prepare_member(member_id, prompt, context, backend, timings))
+                draft = {}
+                drafting = self._stream_draft(draft_target, backend, prompt, context, ready, draft)
+                try:
+                    async for event in drafting:
+                        yield event
+                    member_id, member, timeouts, warm_hit, load_time, num_ctx = await ready
+                finally:
+                    # A client gone mid-draft must not leave the load running outside the backend lock
+                    await drafting.aclose()
+                    if not ready.done():
+                        ready.cancel()
+                        await asyncio.gather(ready, return_exceptions=True)
+            else:
+                member_id, member, timeouts, warm_hit, load_time, num_ctx = await self._prepare_member(
+                    member_id, prompt, context, backend, timings
+                )
+            
+            generation_start = time.time()
+            attempt, first_token, hedge = await self._open_stream(
+                member_id, member, backend, prompt, context, requirements, timeouts, num_ctx
+            )
+            member_id, member, backend, warm_hit, load_time = self._adopt_winner(
+                attempt, hedge, member_id, member, backend, warm_hit, load_time
+            )
+            stream = attempt.stream
+            first_token_time = None
+            try:
+                if first_token is not None:
+                    first_token_time = time.time() - start_time
+                    yield {"type": "token", "content": first_token}
+                    async for token in attempt.iterator:
+                        yield {"type": "token", "content": token}
+            finally:
+                await attempt.finish()
+            
+            if stream.error:
+                logger.error(f"Streaming generation failed: {stream.error}")
+                yield {
+                    "type": "error",
+                    "error": stream.error,
+                    "metadata": {"model": member.model_id, "member": member.name, "member_id": member_id, "backend": backend.name}
                 }
-            }
+                return
+            
+            elapsed = time.time() - start_time
+            generation_time = time.time() - generation_start
+            token_chunks = stream.chunk_count - 1  # The final done object carries no token
+            stats = stream.stats
+            self._record_throughput(member_id, prompt, token_chunks, generation_time, stream.first_token_time, stats)
+            self._stream_timings(timings, stream, generation_time)
+            metadata = self._record_completion(
+                member_id, member, requirements, context, warm_hit, load_time, generation_time, elapsed, backend, timings
+            )
+            metadata["timeouts"] = timeouts
+            metadata["num_ctx"] = num_ctx
+            metadata["context_truncated"] = self._context_tokens_needed(prompt, context) > num_ctx
+            metadata["time_to_first_token"] = first_token_time
+            metadata["chunks"] = stream.chunk_count
+            metadata["ollama"] = self._rounded_stats(stats)
+            if hedge:
+                metadata["hedge"] = hedge
+            if draft:
+                metadata["draft"] = draft
+            yield {"type": "done", "metadata": metadata}
+        except Exception as e:
+            yield {"type": "error", **self._router_error(e)}
     
     def get_status(self):
-        mem = psutil.virtual_memory()
+        mem = self.memory_sampler.latest()
+        available_gb = self._get_available_memory_gb()
         return {
             "active_member": self.active_member,
             "team_size": len(self.team_members),
             "system": {
                 "platform": "M3 Pro" if IS_M3_PRO else "Standard",
                 "total_memory_gb": TOTAL_MEMORY_GB,
-                "available_memory_gb": self._get_available_memory_gb(),
+                "available_memory_gb": available_gb,
                 "memory_pressure": mem.percent
             },
+            "residency": self.residency.snapshot(),
+            "backends": self.backends.snapshot(available_gb),
+            "queue": self.request_queue.snapshot(),
+            "admission": {
+                **self.admission.snapshot(),
+                "estimated_wait_s": round(self._estimated_wait_s(PRIORITY_CLASSES["normal"]), 2)
+            },
+            "member_stats": self.member_stats.snapshot(),
+            "adaptive_timeouts": {
+                member_id: self._timeouts_for(member_id, member, "", {})
+                for member_id, member in self.team_members.items()
+                if member_id in self.member_stats.ewma
+            },
+            "coresidency": self.coresidency.snapshot(),
+            "predictor": self.predictor.snapshot(),
+            "single_flight": self.single_flight.snapshot(),
+            "hedges": dict(self.hedges),
+            "latency": self.latency.snapshot(),
+            "response_cache": self.response_cache.snapshot(),
+            "team_registry": self.registry.snapshot(),
+            "memory_sampler": self.memory_sampler.snapshot(),
             "phase": "4B",
-            "http_client": "OptimizedHTTPClient",
+            "http_client": "AsyncOptimizedHTTPClient",
             "version": "1.0.0-phase4b"
         }
     
-    def close(self):
+    def prometheus_metrics(self):
+        """Prometheus text exposition: phase histograms plus queue, admission, hedging and backend gauges"""
+        lines = self.latency.prometheus()
+        
+        def metric(name, kind, help_text, samples):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        
+        backends = self.backends.backends
+        metric("ai_router_requests_total", "counter", "Completed generations",
+               [({}, self.latency.requests)])
+        metric("ai_router_queue_depth", "gauge", "Requests waiting in the affinity queue",
+               [({}, len(self.request_queue))])
+        metric("ai_router_estimated_wait_seconds", "gauge", "Estimated queue wait for a normal-priority request",
+               [({}, round(self._estimated_wait_s(PRIORITY_CLASSES["normal"]), 3))])
+        metric("ai_router_admission_total", "counter", "Admission control decisions",
+               [({"decision": "admitted"}, self.admission.admitted), ({"decision": "rejected"}, self.admission.rejected)])
+        metric("ai_router_hedges_total", "counter", "Hedged attempts started and won",
+               [({"outcome": "fired"}, self.hedges["fired"]), ({"outcome": "won"}, self.hedges["won"])])
+        metric("ai_router_available_memory_gb", "gauge", "Memory available for model loads on this host",
+               [({}, round(self._get_available_memory_gb(), 3))])
+        metric("ai_router_backend_in_flight", "gauge", "Requests dispatched to a backend and not finished",
+               [({"backend": b.name}, b.in_flight) for b in backends])
+        metric("ai_router_backend_resident_models", "gauge", "Members loaded on a backend",
+               [({"backend": b.name}, len(b.residency.resident)) for b in backends])
+        metric("ai_router_backend_circuit_open", "gauge", "1 while a backend's circuit breaker is failing fast",
+               [({"backend": b.name}, int(b.client.breaker.state == "open")) for b in backends])
+        return "\n".join(lines) + "\n"
+    
+    async def close(self):
         """Clean shutdown"""
-        if hasattr(self, 'ollama_client'):
-            self.ollama_client.close()
+        for task in (self._queue_worker, self._preload_task, self._team_config_task, self._memory_sampler_task,
+                     self._plan_preload_task, *self._queue_tasks):
+            if task and not task.done():
+                task.cancel()
+        await asyncio.to_thread(self.response_cache.close)  # Drains queued cache writes
+        self.member_stats.save()
+        await self.backends.close()
         logger.info("Router shutdown complete")
 
 # FastAPI app
@@ -688,11 +3752,45 @@ class ChatRequest(BaseModel):
     prompt: str
     context: Dict = {}
 
+def rejected_response(result):
+    """429 with Retry-After for a request refused by admission control"""
+    return JSONResponse(
+        status_code=429,
+        content=result,
+        headers={"Retry-After": str(result["metadata"]["retry_after_s"])}
+    )
+
 @app.post("/api/chat")
 async def chat(request: ChatRequest):
-    result = await router.route_request(request.prompt, request.context)
+    result = await router.submit_request(request.prompt, request.context)
+    if result.get("metadata", {}).get("rejected"):
+        return rejected_response(result)
     return JSONResponse(content=result)
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, format: str = "ndjson"):
+    """Stream tokens as Ollama emits them - NDJSON by default, SSE with ?format=sse"""
+    rejection, plan = await router.admission_check(request.prompt, request.context)
+    if rejection:
+        return rejected_response(rejection)
+    
+    async def ndjson_events():
+        async for event in router.stream_request(request.prompt, request.context, plan):
+            yield json.dumps(event) + "\n"
+    
+    async def sse_events():
+        async for event in router.stream_request(request.prompt, request.context, plan):
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    if format == "sse":
+        return StreamingResponse(sse_events(), media_type="text/event-stream")
+    return StreamingResponse(ndjson_events(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition format"""
+    return PlainTextResponse(router.prometheus_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/team/status")
 async def get_status():
     return JSONResponse(content=router.get_status())
@@ -713,13 +3811,21 @@ async def get_members():
         }
     return JSONResponse(content=members)
 
+@app.get("/api/memory/samples")
+async def get_memory_samples(seconds: Optional[float] = None):
+    """Raw memory/swap series from the background sampler, for debugging spikes"""
+    return JSONResponse(content={
+        **router.memory_sampler.snapshot(),
+        "samples": router.memory_sampler.series(seconds)
+    })
+
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy", 
         "timestamp": datetime.now().isoformat(),
         "phase": "4B",
-        "http_client": "OptimizedHTTPClient"
+        "http_client": "AsyncOptimizedHTTPClient"
     }
 
 @app.get("/")
@@ -729,19 +3835,25 @@ async def root():
         "version": "1.0.0-phase4b",
         "models": len(router.team_members),
         "phase": "4B - Production with HTTP Fixes",
-        "http_client": "OptimizedHTTPClient",
+        "http_client": "AsyncOptimizedHTTPClient",
         "endpoints": {
             "chat": "POST /api/chat",
+            "chat_stream": "POST /api/chat/stream",
             "status": "GET /api/team/status",
             "members": "GET /api/team/members",
+            "memory_samples": "GET /api/memory/samples",
             "health": "GET /health"
         }
     }
 
+@app.on_event("startup")
+async def startup_event():
+    router.start_background_tasks()
+
 # Cleanup on shutdown
 @app.on_event("shutdown")
 async def shutdown_event():
-    router.close()
+    await router.close()
 
 if __name__ == "__main__":
     logger.info(f"🚀 Starting AI Team Router Phase 4B on port 11435...")
@@ -752,4 +3864,4 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("Router shutdown requested")
     finally:
-        router.close()
+        asyncio.run(router.close())
@@ -4,9 +4,12 @@ Chroma Vector Database Integration for AI Team Router
 Provides persistent memory and context management
 """
 
+import asyncio
 import os
 import json
 import hashlib
+import time
+from collections import deque
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
@@ -19,6 +22,19 @@ except ImportError:
     CHROMA_AVAILABLE = False
     print("⚠️  Chroma not installed. Run: pip install chromadb")
 
+# Semantic cache: max cosine distance for a stored answer to be reused, per router domain
+SEMANTIC_CACHE_THRESHOLDS = {
+    "coding": 0.05,
+    "enterprise": 0.05,
+    "data": 0.08,
+    "visual": 0.0,
+    "default": 0.1,
+    **json.loads(os.getenv("SEMANTIC_CACHE_THRESHOLDS", "{}"))
+}
+SEMANTIC_CACHE_DISTANCE_BUCKETS = [0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0]
+SEMANTIC_CACHE_REVIEW_SIZE = 200
+SEMANTIC_CACHE_REVIEW_LOG = os.getenv("SEMANTIC_CACHE_REVIEW_LOG")  # Optional JSONL copy of the review log
+
 class ChromaMemory:
     """Vector database for AI Team Router memory and context"""
     
@@ -45,26 +61,28 @@ class ChromaMemory:
             "code_snippets": self._get_or_create_collection("code_snippets"),
             "documentation": self._get_or_create_collection("documentation"),
             "excel_patterns": self._get_or_create_collection("excel_patterns"),
-            "model_performance": self._get_or_create_collection("model_performance")
+            "model_performance": self._get_or_create_collection("model_performance"),
+            "response_cache": self._get_or_create_collection("response_cache", {"hnsw:space": "cosine"})
         }
         
         print(f"✅ Chroma initialized at {persist_directory}")
     
-    def _get_or_create_collection(self, name: str) -> Any:
+    def _get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> Any:
         """Get or create a collection"""
         try:
             return self.client.get_collection(name)
         except:
             return self.client.create_collection(
                 name=name,
-                metadata={"created": datetime.now().isoformat()}
+                metadata={"created": datetime.now().isoformat(), **(metadata or {})}
             )
     
     def store_conversation(self, prompt: str, response: str, metadata: Dict[str, Any]):
         """Store a conversation in vector database"""
         conversation_id = self._generate_id(prompt)
+        metadata = self._flatten_metadata(metadata)
         
-        self.collections["conversations"].add(
+        self.collections["conversations"].upsert(
             documents=[f"Prompt: {prompt}\nResponse: {response}"],
             metadatas=[{
                 **metadata,
@@ -75,6 +93,20 @@ class ChromaMemory:
             ids=[conversation_id]
         )
         
+        # Prompt-only embedding so semantic cache distances compare questions, not answers
+        if metadata.get("member_id"):
+            self.collections["response_cache"].upsert(
+                documents=[prompt],
+                metadatas=[{
+                    "member_id": metadata["member_id"],
+                    "model": metadata.get("model", ""),
+                    "domain": metadata.get("domain", "default"),
+                    "response": response,
+                    "timestamp": datetime.now().isoformat()
+                }],
+                ids=[conversation_id]
+            )
+        
         # Also store model performance
         if "model" in metadata:
             self.store_model_performance(
@@ -137,6 +169,20 @@ class ChromaMemory:
         
         return self._format_results(results)
     
+    def search_cached_responses(self, query: str, domain: Optional[str] = None, n_results: int = 3) -> List[Dict]:
+        """Search stored prompts for semantic cache candidates (cosine distance)"""
+        collection = self.collections["response_cache"]
+        if collection.count() == 0:
+            return []
+        
+        results = collection.query(
+            query_texts=[query],
+            where={"domain": domain} if domain else None,
+            n_results=min(n_results, collection.count())
+        )
+        
+        return self._format_results(results)
+    
     def search_code_snippets(self, query: str, language: Optional[str] = None, n_results: int = 5) -> List[Dict]:
         """Search for relevant code snippets"""
         where_clause = {"language": language} if language else None
@@ -200,6 +246,20 @@ class ChromaMemory:
         
         return stats
     
+    def _flatten_metadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Chroma metadata values must be scalars; nested router metadata is kept as JSON"""
+        flat = {}
+        for key, value in metadata.items():
+            if value is None:
+                continue
+            if isinstance(value, (str, int, float, bool)):
+                flat[key] = value
+            else:
+                flat[key] = json.dumps(value, default=str)
+        if "domain" not in flat and isinstance(metadata.get("requirements"), dict):
+            flat["domain"] = metadata["requirements"].get("domain", "default")
+        return flat
+    
     def _generate_id(self, content: str) -> str:
         """Generate unique ID for content"""
         return hashlib.md5(content.encode()).hexdigest()
@@ -233,22 +293,177 @@ class ChromaMemory:
         return stats
 
 
+class SemanticCache:
+    """Reuse stored answers for near-duplicate prompts, with per-domain thresholds and a review log"""
+    
+    def __init__(self, memory, thresholds: Optional[Dict[str, float]] = None,
+                 review_log_path: Optional[str] = SEMANTIC_CACHE_REVIEW_LOG):
+        self.memory = memory
+        self.thresholds = {**SEMANTIC_CACHE_THRESHOLDS, **(thresholds or {})}
+        self.review_log = deque(maxlen=SEMANTIC_CACHE_REVIEW_SIZE)
+        self.review_log_path = review_log_path
+        self.domain_stats = {}
+        self._next_review_id = 1
+    
+    def threshold(self, domain: str) -> float:
+        return self.thresholds.get(domain, self.thresholds["default"])
+    
+    def _stats(self, domain: str) -> Dict[str, Any]:
+        if domain not in self.domain_stats:
+            self.domain_stats[domain] = {
+                "lookups": 0,
+                "hits": 0,
+                "misses": 0,
+                "rejected_member": 0,
+                "false_hits": 0,
+                "distances": [0] * (len(SEMANTIC_CACHE_DISTANCE_BUCKETS) + 1)
+            }
+        return self.domain_stats[domain]
+    
+    def _record_distance(self, stats: Dict[str, Any], distance: float):
+        for i, edge in enumerate(SEMANTIC_CACHE_DISTANCE_BUCKETS):
+            if distance <= edge:
+                stats["distances"][i] += 1
+                return
+        stats["distances"][-1] += 1
+    
+    def lookup(self, prompt: str, domain: str, target_member: str, team_members: Dict[str, Any]) -> Optional[Dict]:
+        """Return the closest stored answer within the domain threshold from an equal-or-better member"""
+        stats = self._stats(domain)
+        stats["lookups"] += 1
+        threshold = self.threshold(domain)
+        target_rating = team_members[target_member].performance_rating
+        
+        candidates = self.memory.search_cached_responses(prompt, domain=domain)
+        if candidates:
+            self._record_distance(stats, candidates[0]["distance"])
+        
+        for candidate in candidates:
+            if candidate["distance"] > threshold:
+                break
+            stored = team_members.get(candidate["metadata"].get("member_id"))
+            if stored is None or stored.performance_rating < target_rating:
+                stats["rejected_member"] += 1
+                continue
+            stats["hits"] += 1
+            return {**candidate, "review_id": self._log_hit(prompt, domain, threshold, target_member, candidate)}
+        
+        stats["misses"] += 1
+        return None
+    
+    def _log_hit(self, prompt: str, domain: str, threshold: float, target_member: str, candidate: Dict) -> int:
+        review_id = self._next_review_id
+        self._next_review_id += 1
+        entry = {
+            "review_id": review_id,
+            "timestamp": datetime.now().isoformat(),
+            "domain": domain,
+            "distance": round(candidate["distance"], 4),
+            "threshold": threshold,
+            "prompt": prompt,
+            "cached_prompt": candidate["document"],
+            "cached_member": candidate["metadata"].get("member_id"),
+            "target_member": target_member,
+            "false_hit": False
+        }
+        self.review_log.append(entry)
+        if self.review_log_path:
+            os.makedirs(os.path.dirname(self.review_log_path) or ".", exist_ok=True)
+            with open(self.review_log_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        return review_id
+    
+    def mark_false_hit(self, review_id: int) -> bool:
+        """Flag a served hit as wrong so the domain's false-hit rate reflects it"""
+        for entry in self.review_log:
+            if entry["review_id"] == review_id and not entry["false_hit"]:
+                entry["false_hit"] = True
+                self._stats(entry["domain"])["false_hits"] += 1
+                return True
+        return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        labels = [f"<={edge}" for edge in SEMANTIC_CACHE_DISTANCE_BUCKETS] + [f">{SEMANTIC_CACHE_DISTANCE_BUCKETS[-1]}"]
+        domains = {}
+        for domain, stats in self.domain_stats.items():
+            domains[domain] = {
+                **{k: v for k, v in stats.items() if k != "distances"},
+                "threshold": self.threshold(domain),
+                "hit_rate": round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else None,
+                "false_hit_rate": round(stats["false_hits"] / stats["hits"], 3) if stats["hits"] else None,
+                "distance_distribution": dict(zip(labels, stats["distances"]))
+            }
+        lookups = sum(s["lookups"] for s in self.domain_stats.values())
+        hits = sum(s["hits"] for s in self.domain_stats.values())
+        return {
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "domains": domains,
+            "recent_hits": list(self.review_log)[-20:]
+        }
+
+
 class ChromaIntegration:
     """Integration layer between AI Team Router and Chroma"""
     
-    def __init__(self, router, chroma_dir: str = "./chroma_db"):
+    def __init__(self, router, chroma_dir: str = "./chroma_db", semantic_cache: bool = False,
+                 cache_thresholds: Optional[Dict[str, float]] = None):
         """Initialize Chroma integration with router"""
         self.router = router
         self.memory = ChromaMemory(chroma_dir)
         self.context_window = 5  # Number of similar conversations to include
+        self.semantic_cache_enabled = semantic_cache
+        self.semantic_cache = SemanticCache(self.memory, cache_thresholds)
         print("✅ Chroma integration initialized")
     
+    async def _semantic_cache_hit(self, prompt: str, context: Dict, plan: Dict[str, Any],
+                                  start_time: float) -> Optional[Dict[str, Any]]:
+        """Answer from a stored conversation without loading a model, if one is close enough"""
+        if not context.get("semantic_cache", self.semantic_cache_enabled):
+            return None
+        member_id = plan["member_id"]
+        # Embedding and lookup are synchronous - keep them off the event loop
+        hit = await asyncio.to_thread(
+            self.semantic_cache.lookup, prompt, plan["requirements"]["domain"], member_id, self.router.team_members
+        )
+        if hit is None:
+            return None
+        
+        metadata = hit["metadata"]
+        return {
+            "response": metadata["response"],
+            "metadata": {
+                "model": metadata.get("model"),
+                "member_id": metadata.get("member_id"),
+                "selected_member_id": member_id,
+                "semantic_cache_hit": True,
+                "distance": hit["distance"],
+                "cached_prompt": hit["document"],
+                "review_id": hit["review_id"],
+                "elapsed_time": time.time() - start_time
+            }
+        }
+    
     async def enhanced_route_request(self, prompt: str, context: Dict = None) -> Dict[str, Any]:
         """Route request with Chroma context enhancement"""
+        start_time = time.time()
         context = context or {}
         
-        # Search for similar past conversations
-        similar = self.memory.search_similar_conversations(prompt, self.context_window)
+        # Planned once here and handed to the router
+        try:
+            requirements, member_id = self.router._plan_request(prompt, context)
+            plan = {"requirements": requirements, "member_id": member_id}
+        except Exception:
+            plan = None  # route_request plans again and reports the error
+        
+        cached = await self._semantic_cache_hit(prompt, context, plan, start_time) if plan else None
+        if cached:
+            cached["memory_stats"] = await asyncio.to_thread(self.memory.get_collection_stats)
+            return cached
+        
+        # Search for similar past conversations (Chroma blocks on embedding, so it runs in a worker thread)
+        similar = await asyncio.to_thread(self.memory.search_similar_conversations, prompt, self.context_window)
         
         # Add similar context if found
         if similar:
@@ -256,29 +471,30 @@ class ChromaIntegration:
             context["has_context"] = True
         
         # Check for relevant code snippets
-        code_snippets = self.memory.search_code_snippets(prompt)
+        code_snippets = await asyncio.to_thread(self.memory.search_code_snippets, prompt)
         if code_snippets:
             context["relevant_code"] = code_snippets
         
         # Check for Excel patterns if needed
         if "excel" in prompt.lower() or "vba" in prompt.lower() or "150" in prompt.lower():
-            excel_patterns = self.memory.search_excel_patterns(prompt, min_rows=100000)
+            excel_patterns = await asyncio.to_thread(self.memory.search_excel_patterns, prompt, min_rows=100000)
             if excel_patterns:
                 context["excel_patterns"] = excel_patterns
         
         # Route the request
-        result = await self.router.route_request(prompt, context)
+        result = await self.router.route_request(prompt, context, plan)
         
         # Store the conversation
-        if result.get("response"):
-            self.memory.store_conversation(
+        if result.get("response") and "error" not in result.get("metadata", {}):
+            await asyncio.to_thread(
+                self.memory.store_conversation,
                 prompt,
                 result["response"],
                 result.get("metadata", {})
             )
         
         # Add memory stats to response
-        result["memory_stats"] = self.memory.get_collection_stats()
+        result["memory_stats"] = await asyncio.to_thread(self.memory.get_collection_stats)
         
         return result
     
@@ -289,7 +505,8 @@ class ChromaIntegration:
             "model_performance": self.memory.get_model_stats(),
             "total_conversations": self.memory.collections["conversations"].count(),
             "total_code_snippets": self.memory.collections["code_snippets"].count(),
-            "total_excel_patterns": self.memory.collections["excel_patterns"].count()
+            "total_excel_patterns": self.memory.collections["excel_patterns"].count(),
+            "semantic_cache": self.semantic_cache.get_stats()
         }
 
 
@@ -319,7 +536,7 @@ if __name__ == "__main__":
         
         # Store Excel pattern
         memory.store_excel_pattern(
-            "Sub ProcessLargeDataset()\\n  Dim dataArray As Variant\\n  dataArray = Range(\\"A1:Z150000\\").Value\\nEnd Sub",
+            "Sub ProcessLargeDataset()\n  Dim dataArray As Variant\n  dataArray = Range(\"A1:Z150000\").Value\nEnd Sub",
             "Process 150k rows efficiently",
             150000
         )
@@ -19,6 +19,9 @@ from ai_team_router import AITeamRouter
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Editor requests are interactive: schedule them ahead of batch work unless the tool call says otherwise
+MCP_DEFAULT_PRIORITY = os.getenv("MCP_DEFAULT_PRIORITY", "high")
+
 class MCPServer:
     """MCP Server implementation for Enhanced AI Team Router"""
     
@@ -96,7 +99,7 @@ class MCPServer:
                     "priority": {
                         "type": "string",
                         "enum": ["low", "normal", "high"],
-                        "description": "Task priority for model selection"
+                        "description": f"Scheduling priority (default {MCP_DEFAULT_PRIORITY})"
                     },
                     "temperature": {
                         "type": "number",
@@ -143,10 +146,10 @@ class MCPServer:
         
         try:
             if tool_name == "smart_route":
-                result = await self.router.route_request(
+                result = await self.router.submit_request(
                     tool_params.get("prompt", ""),
                     {
-                        "priority": tool_params.get("priority", "normal"),
+                        "priority": tool_params.get("priority", MCP_DEFAULT_PRIORITY),
                         "temperature": tool_params.get("temperature", 0.7)
                     }
                 )
@@ -171,9 +174,9 @@ class MCPServer:
                     old_active = self.router.active_member
                     self.router.active_member = member_id
                     
-                    result = await self.router.route_request(
+                    result = await self.router.submit_request(
                         tool_params.get("prompt", ""),
-                        tool_params.get("context", {})
+                        {"priority": MCP_DEFAULT_PRIORITY, **tool_params.get("context", {})}
                     )
                     
                     return {
@@ -220,11 +223,11 @@ class MCPServer:
             elif tool_name == "optimize_memory":
                 force_unload = tool_params.get("force_unload", False)
                 
-                if force_unload and self.router.active_member:
-                    member = self.router.team_members[self.router.active_member]
-                    await self.router._unload_model(member.model_id)
-                    self.router.active_member = None
-                    message = "Force unloaded active model"
+                resident = list(self.router.residency.resident)
+                if force_unload and resident:
+                    for member_id in resident:
+                        await self.router.unload_member(member_id)
+                    message = f"Force unloaded {len(resident)} resident model(s)"
                 else:
                     message = "Memory optimization completed"
                 
@@ -253,7 +256,7 @@ class MCPServer:
         else:
             prompt = params.get("prompt", "")
             
-        result = await self.router.route_request(prompt, {"tool": "mcp_chat"})
+        result = await self.router.submit_request(prompt, {"tool": "mcp_chat", "priority": MCP_DEFAULT_PRIORITY})
         return {
             "content": result.get("response", ""),
             "metadata": result.get("metadata", {})
@@ -0,0 +1,9 @@
+"""
+Shared test configuration
+"""
+
+import os
+
+# Keep learned stats and cached responses from leaking between test runs via the working tree
+os.environ.setdefault("MEMBER_STATS_PATH", "")
+os.environ.setdefault("RESPONSE_CACHE_PATH", "")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+In-process fake Ollama server for router tests
+"""
+
+import asyncio
+import json
+
+from aiohttp import web
+
+
+class FakeOllama:
+    """Minimal /api/generate and /api/ps implementation on a random local port"""
+
+    def __init__(self, response_text="ok", delay=0.0, fail_statuses=None, chunk_delay=0.0, unload_delay=0.0):
+        self.response_text = response_text
+        self.delay = delay
+        self.unload_delay = unload_delay
+        self.chunk_delay = chunk_delay
+        self.fail_statuses = list(fail_statuses or [])
+        self.requests = []
+        self.loaded = {}
+        self.runner = None
+        self.base_url = None
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/api/generate", self._generate)
+        app.router.add_get("/api/ps", self._ps)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    async def _ps(self, request):
+        return web.json_response({
+            "models": [
+                {"name": model, "model": model, "size": size, "size_vram": 0}
+                for model, size in self.loaded.items()
+            ]
+        })
+
+    def _durations(self, payload, cold):
+        """Ollama's done-object timings (nanoseconds): 0.5s cold load, 1ms/prompt token, 10ms/output token"""
+        prompt_tokens = len(payload["prompt"].split())
+        eval_tokens = len(self.response_text.split(" ")) if payload["prompt"] else 0
+        load, prompt_eval, evaluation = (500 if cold else 1) * 10 ** 6, prompt_tokens * 10 ** 6, eval_tokens * 10 ** 7
+        return {
+            "total_duration": load + prompt_eval + evaluation,
+            "load_duration": load,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": prompt_eval,
+            "eval_count": eval_tokens,
+            "eval_duration": evaluation
+        }
+
+    async def _generate(self, request):
+        payload = await request.json()
+        self.requests.append(payload)
+
+        if self.fail_statuses:
+            return web.Response(status=self.fail_statuses.pop(0), text="busy")
+
+        model = payload["model"]
+        if payload.get("keep_alive") == 0:
+            if self.unload_delay:
+                asyncio.get_running_loop().call_later(self.unload_delay, self.loaded.pop, model, None)
+            else:
+                self.loaded.pop(model, None)
+            return web.json_response({"model": model, "response": "", "done": True, "done_reason": "unload"})
+
+        cold = model not in self.loaded
+        self.loaded[model] = int(2 * 1024 ** 3)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+        done = {"model": model, "response": "", "done": True, **self._durations(payload, cold)}
+        if not payload.get("stream"):
+            return web.json_response({**done, "response": self.response_text if payload["prompt"] else ""})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for token in self.response_text.split(" "):
+            line = json.dumps({"model": model, "response": token + " ", "done": False}, separators=(",", ":"))
+            await response.write(line.encode() + b"\n")
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+        await response.write(json.dumps(done).encode() + b"\n")
+        await response.write_eof()
+        return response
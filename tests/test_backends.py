@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test suite for the Ollama backend pool
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_team_router import AITeamRouter, BackendPool, OllamaBackend
+from tests.fake_ollama import FakeOllama
+
+class TestBackendPool:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 32.0
+        self.team = self.router.team_members
+
+    def test_spec_parsing(self):
+        """Test that "url=GB" entries get a budget and bare URLs share this host's memory"""
+        pool = BackendPool.from_spec("http://gpu1:11434=24, http://localhost:11434/")
+        assert [b.name for b in pool.backends] == ["gpu1:11434", "localhost:11434"]
+        assert pool.primary.budget_gb == 24.0
+        assert pool.backends[1].budget_gb is None
+        assert pool.backends[1].free_gb(7.5) == 7.5
+
+    def test_instances_sharing_host_memory_need_budgets(self):
+        """Test that two bare URLs are refused instead of both claiming this host's memory"""
+        with pytest.raises(ValueError, match="localhost:11435"):
+            BackendPool.from_spec("http://localhost:11434, http://localhost:11435")
+        pool = BackendPool.from_spec("http://localhost:11434=16, http://localhost:11435=16")
+        assert [b.free_gb(64.0) for b in pool.backends] == [16.0, 16.0]
+
+    def test_choose_prefers_fit_then_least_loaded(self):
+        """Test placement: a backend without room is skipped, and in-flight work breaks ties"""
+        full, spare, other = OllamaBackend("http://a", 10), OllamaBackend("http://b", 16), OllamaBackend("http://c", 16)
+        pool = BackendPool([full, spare, other])
+        full.residency.mark_loaded("deepcoder_primary", self.team["deepcoder_primary"])
+        spare.in_flight = 1
+        assert pool.choose("mistral_versatile", 4.7, 32.0) is other
+
+        other.in_flight = 2
+        assert pool.choose("mistral_versatile", 4.7, 32.0) is spare
+        # A resident copy wins regardless of load
+        assert pool.choose("deepcoder_primary", 9.3, 32.0) is full
+
+    @pytest.mark.asyncio
+    async def test_routes_to_backend_holding_model(self):
+        """Test that a request runs where its model is already resident"""
+        async with FakeOllama(response_text="a") as first, FakeOllama(response_text="b") as second:
+            self.router.backends = BackendPool([OllamaBackend(first.base_url, 24), OllamaBackend(second.base_url, 24)])
+            holder = self.router.backends.backends[1]
+            holder.residency.mark_loaded("deepcoder_primary", self.team["deepcoder_primary"])
+
+            result = await self.router.route_request("Create a Vue component")
+            await self.router.close()
+
+        assert result["response"] == "b"
+        assert result["metadata"]["backend"] == holder.name
+        assert result["metadata"]["warm_hit"] == True
+        assert first.requests == []
+        assert self.router.backends.resident_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_spreads_cold_members_across_backends(self):
+        """Test that concurrent requests for different members load on different idle backends"""
+        async with FakeOllama(delay=0.1) as first, FakeOllama(delay=0.1) as second:
+            self.router.backends = BackendPool([OllamaBackend(first.base_url, 24), OllamaBackend(second.base_url, 24)])
+            results = await asyncio.gather(
+                self.router.submit_request("Create a Vue component"),
+                self.router.submit_request("Process this Excel file")
+            )
+            status = self.router.get_status()["backends"]
+            await self.router.close()
+
+        assert {r["metadata"]["backend"] for r in results} == {b.name for b in self.router.backends.backends}
+        assert status["placements"] == 2
+        assert all(b["in_flight"] == 0 for b in status["backends"].values())
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
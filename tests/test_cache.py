@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test suite for request coalescing and response caching
+"""
+
+import asyncio
+import pytest
+import threading
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_team_router import AITeamRouter, AsyncOptimizedHTTPClient, ResponseCache, SingleFlight
+from tests.fake_ollama import FakeOllama
+
+def generations(server):
+    """Generate calls that actually produced text (excludes loads and unloads)"""
+    return [r for r in server.requests if r.get("prompt")]
+
+class TestSingleFlight:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 32.0
+    
+    def test_key_depends_on_member_prompt_and_options(self):
+        """Test that the coalescing key covers member, prompt and options"""
+        base = SingleFlight.key("gemma_tiny", "hi", {"temperature": 0.7})
+        assert base == SingleFlight.key("gemma_tiny", "hi", {"temperature": 0.7})
+        assert base != SingleFlight.key("granite_moe", "hi", {"temperature": 0.7})
+        assert base != SingleFlight.key("gemma_tiny", "hi", {"temperature": 0.0})
+    
+    @pytest.mark.asyncio
+    async def test_identical_requests_share_one_generation(self):
+        """Test that concurrent duplicates attach to the leader's result"""
+        async with FakeOllama(response_text="shared", delay=0.2) as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            results = await asyncio.gather(*(self.router.submit_request("Create a Vue component") for _ in range(3)))
+            await self.router.close()
+        
+        assert len(generations(server)) == 1
+        assert [r["response"] for r in results] == ["shared"] * 3
+        assert sum(1 for r in results if r["metadata"].get("coalesced")) == 2
+        assert self.router.single_flight.coalesced == 2
+    
+    @pytest.mark.asyncio
+    async def test_streams_share_one_generation(self):
+        """Test that a follower stream receives the leader's tokens"""
+        async with FakeOllama(response_text="a b c", chunk_delay=0.05) as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            
+            async def collect():
+                return [event async for event in self.router.stream_request("Create a Vue component")]
+            
+            first, second = await asyncio.gather(collect(), collect())
+            await self.router.close()
+        
+        assert len(generations(server)) == 1
+        assert [e.get("content") for e in first] == [e.get("content") for e in second]
+        assert second[-1]["metadata"]["coalesced"] == True
+        assert self.router.single_flight.stream_coalesced == 1
+
+class TestResponseCache:
+    def test_key_ignores_trailing_whitespace_but_not_indentation(self):
+        """Test prompt normalization for exact-match keys"""
+        key = ResponseCache.key("m", "def f():\n    pass\n", {"temperature": 0})
+        assert key == ResponseCache.key("m", "def f():  \r\n    pass", {"temperature": 0})
+        assert key != ResponseCache.key("m", "def f():\npass", {"temperature": 0})
+    
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_entries_and_bytes(self):
+        """Test that the memory tier is bounded by entry count and total size"""
+        cache = ResponseCache(path="", max_entries=2, max_bytes=10)
+        cache.put_deferred("a", "1234", {})
+        cache.put_deferred("b", "1234", {})
+        await cache.get_async("a")
+        cache.put_deferred("c", "1234", {})
+        assert list(cache.memory) == ["a", "c"]
+        cache.put_deferred("d", "12345678", {})
+        assert list(cache.memory) == ["d"]
+        assert cache.evictions == 3
+    
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self):
+        """Test that expired entries miss"""
+        cache = ResponseCache(path="", ttl_s=0)
+        cache.put_deferred("a", "x", {})
+        cache.memory["a"] = (0.0,) + cache.memory["a"][1:]
+        assert await cache.get_async("a") == (None, None)
+        assert cache.expired == 1
+    
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_restart(self, tmp_path):
+        """Test that a new instance serves entries from SQLite and promotes them"""
+        path = str(tmp_path / "cache.sqlite3")
+        first = ResponseCache(path=path)
+        first.put_deferred("a", "persisted", {"member_id": "gemma_tiny"})
+        first.close()
+        
+        second = ResponseCache(path=path)
+        payload, tier = await second.get_async("a")
+        assert payload["response"] == "persisted"
+        assert tier == "disk"
+        assert (await second.get_async("a"))[1] == "memory"
+        second.close()
+    
+    @pytest.mark.asyncio
+    async def test_async_paths_keep_sqlite_off_the_loop(self, tmp_path):
+        """Test that deferred writes and async disk reads run on the cache's worker thread"""
+        path = str(tmp_path / "cache.sqlite3")
+        cache = ResponseCache(path=path)
+        threads = []
+        disk_get, disk_put = cache._disk_get, cache._disk_put
+        cache._disk_get = lambda *args: threads.append(threading.get_ident()) or disk_get(*args)
+        cache._disk_put = lambda *args: threads.append(threading.get_ident()) or disk_put(*args)
+        
+        cache.put_deferred("a", "persisted", {"member_id": "gemma_tiny"})
+        assert "a" in cache.memory  # Served from memory before the write lands
+        cache.memory.clear()
+        payload, tier = await cache.get_async("a")  # Queued behind the write on the same thread
+        cache.close()
+        
+        assert (payload["response"], tier) == ("persisted", "disk")
+        assert len(threads) == 2 and threading.get_ident() not in threads
+        reopened = ResponseCache(path=path)
+        assert (await reopened.get_async("a"))[1] == "disk"
+        reopened.close()
+    
+    @pytest.mark.asyncio
+    async def test_router_serves_deterministic_repeat_from_cache(self, tmp_path):
+        """Test that a temperature-0 repeat skips generation; sampled requests are not cached"""
+        router = AITeamRouter()
+        router._get_available_memory_gb = lambda: 32.0
+        router.response_cache = ResponseCache(path=str(tmp_path / "cache.sqlite3"))
+        async with FakeOllama(response_text="cached") as server:
+            router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            first = await router.submit_request("Create a Vue component", {"temperature": 0})
+            second = await router.submit_request("Create a Vue component  ", {"temperature": 0})
+            events = [e async for e in router.stream_request("Create a Vue component", {"temperature": 0})]
+            await router.submit_request("Create a Vue component")
+            await router.close()
+        
+        assert len(generations(server)) == 2
+        assert second["response"] == first["response"] == "cached"
+        assert second["metadata"]["cache_hit"] == True
+        assert "cache_hit" not in first["metadata"]
+        assert events[0]["content"] == "cached"
+        assert events[-1]["metadata"]["cache_tier"] == "memory"
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Test suite for the asyncio Ollama client
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.ai_team_router as ai_team_router
+from src.ai_team_router import AITeamRouter, AsyncOptimizedHTTPClient, BackendPool, CircuitBreaker, OllamaBackend, OptimizedHTTPClient, ollama_stats
+from tests.fake_ollama import FakeOllama
+
+class TestAsyncClient:
+    @pytest.mark.asyncio
+    async def test_generate(self):
+        """Test non-streaming generation returns the Ollama response"""
+        async with FakeOllama(response_text="hello world") as server:
+            client = AsyncOptimizedHTTPClient(server.base_url)
+            result = await client.generate("gemma3:1b", "hi", timeout=5)
+            await client.close()
+        assert result["success"] == True
+        assert result["response"] == "hello world"
+    
+    @pytest.mark.asyncio
+    async def test_generate_does_not_block_loop(self):
+        """Test that other coroutines keep running during a slow generation"""
+        async with FakeOllama(delay=0.5) as server:
+            client = AsyncOptimizedHTTPClient(server.base_url)
+            ticks = []
+            
+            async def ticker():
+                for _ in range(5):
+                    ticks.append(1)
+                    await asyncio.sleep(0.05)
+            
+            await asyncio.gather(client.generate("gemma3:1b", "hi", timeout=5), ticker())
+            await client.close()
+        assert len(ticks) == 5
+    
+    @pytest.mark.asyncio
+    async def test_sent_generation_is_not_resent(self):
+        """Test that an error status after the POST reached Ollama is returned, not retried"""
+        async with FakeOllama(fail_statuses=[503]) as server:
+            client = AsyncOptimizedHTTPClient(server.base_url, backoff_factor=0.01)
+            result = await client.generate("gemma3:1b", "hi", timeout=5)
+            await client.close()
+        assert result["success"] == False
+        assert "HTTP 503" in result["error"]
+        assert len(server.requests) == 1
+    
+    @pytest.mark.asyncio
+    async def test_retry_while_connection_refused(self):
+        """Test that a request that never reached Ollama is retried with backoff"""
+        async with FakeOllama() as server:
+            base_url = server.base_url
+        client = AsyncOptimizedHTTPClient(base_url, max_retries=2, backoff_factor=0.01)
+        start = asyncio.get_running_loop().time()
+        result = await client.generate("gemma3:1b", "hi", timeout=5)
+        await client.close()
+        assert result["success"] == False
+        assert "Connection error" in result["error"]
+        assert asyncio.get_running_loop().time() - start >= 0.03  # Backoff of 0.01s + 0.02s
+    
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        """Test that a slow backend produces a timeout result"""
+        async with FakeOllama(delay=1.0) as server:
+            client = AsyncOptimizedHTTPClient(server.base_url)
+            result = await client.generate("gemma3:1b", "hi", timeout=0.2)
+            await client.close()
+        assert result["success"] == False
+        assert "Timeout" in result["error"]
+    
+    @pytest.mark.asyncio
+    async def test_streaming_and_unload(self):
+        """Test streaming assembly and keep_alive=0 unload payload"""
+        async with FakeOllama(response_text="a b c") as server:
+            client = AsyncOptimizedHTTPClient(server.base_url)
+            result = await client.generate_streaming("gemma3:1b", "hi", no_token_timeout=5)
+            unload = await client.unload("gemma3:1b")
+            await client.close()
+        assert result["success"] == True
+        assert result["response"] == "a b c "
+        assert unload["success"] == True
+        assert server.requests[-1]["keep_alive"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_results_carry_ollama_stats(self):
+        """Test that Ollama's durations and counts are parsed for streaming and non-streaming calls"""
+        async with FakeOllama(response_text="a b c") as server:
+            client = AsyncOptimizedHTTPClient(server.base_url)
+            plain = await client.generate("gemma3:1b", "hi there", timeout=5)
+            streamed = await client.generate_streaming("gemma3:1b", "hi there", no_token_timeout=5)
+            await client.close()
+        
+        assert plain["stats"]["load_duration_s"] == pytest.approx(0.5)
+        assert streamed["stats"]["load_duration_s"] == pytest.approx(0.001)
+        for stats in (plain["stats"], streamed["stats"]):
+            assert stats["eval_count"] == 3 and stats["prompt_eval_count"] == 2
+            assert stats["tokens_per_s"] == pytest.approx(100.0)
+            assert stats["prompt_tokens_per_s"] == pytest.approx(1000.0)
+        assert ollama_stats({"model": "gemma3:1b", "done": True}) == {}
+
+class TestAdaptiveTimeouts:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 32.0
+        self.member = self.router.team_members["gemma_tiny"]
+    
+    def learn(self, load_time, tokens_per_s, output_tokens, samples=5):
+        for _ in range(samples):
+            self.router.member_stats.record("gemma_tiny", "load_time", load_time)
+            self.router.member_stats.record("gemma_tiny", "tokens_per_s", tokens_per_s)
+            self.router.member_stats.record("gemma_tiny", "output_tokens", output_tokens)
+    
+    def test_static_tiers_until_enough_samples(self):
+        """Test that the size-tier timeouts apply to members without history"""
+        self.learn(2.0, 50.0, 200, samples=4)
+        timeouts = self.router._timeouts_for("gemma_tiny", self.member, "hi", {})
+        assert timeouts["source"] == "static"
+        assert timeouts["generation_s"] == 180
+    
+    def test_learned_timeouts_fail_fast_and_scale(self):
+        """Test that fast members get short timeouts that grow with prompt and output length"""
+        self.learn(2.0, 50.0, 200)
+        short = self.router._timeouts_for("gemma_tiny", self.member, "hi", {})
+        assert short["source"] == "learned"
+        assert short["load_s"] == 30.0  # Floor: 2 x p95 load time is only 4s
+        assert short["generation_s"] < 180
+        
+        long_output = self.router._timeouts_for("gemma_tiny", self.member, "hi", {"num_predict": 4000})
+        long_prompt = self.router._timeouts_for("gemma_tiny", self.member, "x" * 400_000, {})
+        assert long_output["generation_s"] > short["generation_s"]
+        assert long_prompt["generation_s"] > short["generation_s"]
+        assert long_prompt["no_token_s"] > short["no_token_s"]
+    
+    @pytest.mark.asyncio
+    async def test_output_limit_is_sent_to_ollama(self):
+        """Test that the num_predict the timeouts are sized for caps the generation and keys the cache"""
+        async with FakeOllama(response_text="a b") as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            await self.router.route_request("Simple question", {"num_predict": 50, "cache": False})
+            events = [e async for e in self.router.stream_request("Simple question", {"max_tokens": 60, "cache": False})]
+            await self.router.close()
+        
+        generations = [r["options"] for r in server.requests if r.get("prompt")]
+        assert [options["num_predict"] for options in generations] == [50, 60]
+        assert events[-1]["metadata"]["timeouts"]["estimated_output_tokens"] == 60
+        member_id = events[-1]["metadata"]["member_id"]
+        assert (self.router._response_cache_key(member_id, "hi", {"temperature": 0, "num_predict": 50})
+                != self.router._response_cache_key(member_id, "hi", {"temperature": 0}))
+    
+    @pytest.mark.asyncio
+    async def test_stream_records_throughput(self):
+        """Test that streaming completions feed the learned rates"""
+        async with FakeOllama(response_text="a b c d", chunk_delay=0.01) as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            events = [e async for e in self.router.stream_request("Simple question")]
+            await self.router.close()
+        
+        member_id = events[-1]["metadata"]["member_id"]
+        assert events[-1]["metadata"]["timeouts"]["source"] == "static"
+        assert self.router.member_stats.count(member_id, "tokens_per_s") == 1
+        assert self.router.member_stats.count(member_id, "prompt_tokens_per_s") == 1
+        assert self.router.member_stats.estimate(member_id, "output_tokens") == 4
+    
+    @pytest.mark.asyncio
+    async def test_reported_rates_replace_estimates(self):
+        """Test that eval and prompt-eval rates and load time come from Ollama's counters"""
+        async with FakeOllama(response_text="a b c d e f") as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            result = await self.router.route_request("Simple question")
+            await self.router.close()
+        
+        metadata = result["metadata"]
+        member_id = metadata["member_id"]
+        stats = self.router.member_stats
+        assert metadata["ollama"]["eval_count"] == 6
+        assert metadata["timings"]["prompt_eval"] == pytest.approx(0.002)
+        assert stats.estimate(member_id, "output_tokens") == 6  # Not len(response) / CHARS_PER_TOKEN
+        assert stats.estimate(member_id, "tokens_per_s") == pytest.approx(100.0)
+        assert stats.estimate(member_id, "prompt_tokens_per_s") == pytest.approx(1000.0)
+        assert stats.estimate(member_id, "ollama_load_s") == pytest.approx(0.5)
+
+class TestCircuitBreaker:
+    def test_opens_then_half_open_trial_decides(self):
+        """Test fail-fast after consecutive failures and a single trial after the reset window"""
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_s=0.05)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+        
+        breaker.opened_at -= 0.1
+        assert breaker.allow()
+        assert breaker.state == "half_open"
+        assert not breaker.allow()  # Only one trial at a time
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.trips == 2
+        
+        breaker.opened_at -= 0.1
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+    
+    @pytest.mark.asyncio
+    async def test_client_fails_fast_while_open(self):
+        """Test that an open circuit stops requests from reaching a failing backend"""
+        async with FakeOllama(fail_statuses=[500, 500, 500]) as server:
+            client = AsyncOptimizedHTTPClient(server.base_url, max_retries=0)
+            client.breaker.failure_threshold = 2
+            results = [await client.generate("gemma3:1b", "hi", timeout=5) for _ in range(3)]
+            stream = client.stream_tokens("gemma3:1b", "hi")
+            tokens = [token async for token in stream]
+            await client.close()
+        
+        assert [r.get("circuit_open", False) for r in results] == [False, False, True]
+        assert len(server.requests) == 2
+        assert tokens == [] and "Circuit open" in stream.error
+    
+    def test_pool_skips_open_backend(self):
+        """Test that placement passes over a backend whose circuit is open"""
+        broken, spare = OllamaBackend("http://a", 24), OllamaBackend("http://b", 24)
+        broken.client.breaker.state = "open"
+        broken.client.breaker.opened_at = 1e12
+        assert BackendPool([broken, spare]).choose("gemma_tiny", 1.0, 32.0) is spare
+    
+    def test_sync_client_does_not_retry_post(self):
+        """Test that urllib3 only retries idempotent methods, never a generation POST"""
+        client = OptimizedHTTPClient()
+        retry = client.session.get_adapter("http://localhost").max_retries
+        client.close()
+        assert "POST" not in retry.allowed_methods
+        assert "GET" in retry.allowed_methods
+
+class TestHedging:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 32.0
+        self.member = self.router.team_members["deepcoder_primary"]
+        for _ in range(5):
+            self.router.member_stats.record("deepcoder_primary", "first_token_s", 0.05)
+    
+    @pytest.mark.asyncio
+    async def test_hedge_on_other_backend_wins(self, monkeypatch):
+        """Test that a stalled backend is raced by a resident copy elsewhere and the loser is cancelled"""
+        monkeypatch.setattr(ai_team_router, "HEDGE_MIN_DELAY_S", 0.0)
+        async with FakeOllama(response_text="slow", delay=1.0) as stalled, FakeOllama(response_text="fast") as healthy:
+            self.router.backends = BackendPool([OllamaBackend(stalled.base_url, 24), OllamaBackend(healthy.base_url, 24)])
+            for backend in self.router.backends.backends:
+                backend.residency.mark_loaded("deepcoder_primary", self.member)
+            
+            start = asyncio.get_running_loop().time()
+            result = await self.router.route_request("Create a Vue component", {"hedge": True})
+            elapsed = asyncio.get_running_loop().time() - start
+            await self.router.close()
+        
+        assert result["response"] == "fast "
+        hedge = result["metadata"]["hedge"]
+        assert hedge["fired"] and hedge["winner"] == "hedge"
+        assert result["metadata"]["backend"] == self.router.backends.backends[1].name
+        assert self.router.hedges == {"fired": 1, "won": 1}
+        assert elapsed < 0.8
+    
+    @pytest.mark.asyncio
+    async def test_hedge_holds_other_backend_lock(self, monkeypatch):
+        """Test that a hedge locks its backend while it streams and skips a backend that is busy"""
+        monkeypatch.setattr(ai_team_router, "HEDGE_MIN_DELAY_S", 0.0)
+        async with FakeOllama(response_text="slow", delay=0.4) as stalled, \
+                FakeOllama(response_text="a b c d e", chunk_delay=0.05) as healthy:
+            self.router.backends = BackendPool([OllamaBackend(stalled.base_url, 24), OllamaBackend(healthy.base_url, 24)])
+            other = self.router.backends.backends[1]
+            for backend in self.router.backends.backends:
+                backend.residency.mark_loaded("deepcoder_primary", self.member)
+
+            async def probe():
+                await asyncio.sleep(0.15)
+                return other.lock.locked(), other.in_flight
+
+            result, held = await asyncio.gather(self.router.route_request("Create a Vue component", {"hedge": True}), probe())
+            assert result["metadata"]["hedge"]["winner"] == "hedge"
+            assert held == (True, 1)
+            assert not other.lock.locked() and other.in_flight == 0
+
+            async with other.lock:  # Busy with another request: no hedge there
+                result = await self.router.route_request("Create a React component", {"hedge": True})
+            await self.router.close()
+
+        assert result["response"] == "slow "
+        assert result["metadata"]["hedge"]["fired"] == False
+
+    @pytest.mark.asyncio
+    async def test_buffered_traffic_learns_hedge_delay(self):
+        """Test that /api/chat-style requests alone collect the first-token history hedging needs"""
+        router = AITeamRouter()
+        router._get_available_memory_gb = lambda: 32.0
+        async with FakeOllama(response_text="a b") as server:
+            router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            for _ in range(ai_team_router.ADAPTIVE_TIMEOUT_MIN_SAMPLES):
+                result = await router.route_request("Simple question", {"cache": False})
+            member_id = result["metadata"]["member_id"]
+            hedged = await router.route_request("Simple question", {"cache": False, "hedge": True})
+            await router.close()
+
+        assert router.member_stats.count(member_id, "first_token_s") >= ai_team_router.ADAPTIVE_TIMEOUT_MIN_SAMPLES
+        assert router._hedge_delay_s(member_id, {"hedge": True}) is not None
+        assert hedged["metadata"]["hedge"]["fired"] == False  # Single backend, nothing to race
+        assert hedged["response"] == "a b "
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_history_or_opt_in(self):
+        """Test that hedging needs both the opt-in and a learned first-token percentile"""
+        assert self.router._hedge_delay_s("deepcoder_primary", {}) is None
+        assert self.router._hedge_delay_s("gemma_tiny", {"hedge": True}) is None
+        assert self.router._hedge_delay_s("deepcoder_primary", {"hedge": True}) >= 0.05
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test suite for the MCP server's use of the request queue
+"""
+
+import pytest
+import sys
+import os
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "src"))  # mcp_server imports the router as a top-level module
+
+from src.mcp_server import MCPServer, MCP_DEFAULT_PRIORITY
+from ai_team_router import AsyncOptimizedHTTPClient
+from tests.fake_ollama import FakeOllama
+
+class TestMCPServer:
+    def setup_method(self):
+        self.server = MCPServer()
+        self.router = self.server.router
+        self.router._get_available_memory_gb = lambda: 32.0
+        self.queued = []
+        put = self.router.request_queue.put
+
+        def recording_put(prompt, context, *args, **kwargs):
+            self.queued.append(context.get("priority"))
+            return put(prompt, context, *args, **kwargs)
+
+        self.router.request_queue.put = recording_put
+
+    @pytest.mark.asyncio
+    async def test_tool_calls_are_queued_with_mcp_priority(self):
+        """Test that editor traffic goes through the queue at the MCP priority unless the call sets one"""
+        async with FakeOllama(response_text="ok") as ollama:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(ollama.base_url)
+            routed = await self.server.handle_call_tool({"name": "smart_route", "arguments": {"prompt": "Create a Vue component"}})
+            asked = await self.server.handle_call_tool({"name": "ask_gemma_tiny", "arguments": {"prompt": "Simple question"}})
+            chat = await self.server.handle_chat({"messages": [{"content": "Simple question about PHP"}]})
+            low = await self.server.handle_call_tool({"name": "smart_route", "arguments": {"prompt": "Summarise", "priority": "low"}})
+            await self.router.close()
+
+        assert MCP_DEFAULT_PRIORITY == "high"
+        assert self.queued == ["high", "high", "high", "low"]
+        assert routed["content"][0]["text"] == asked["content"][0]["text"] == chat["content"] == low["content"][0]["text"] == "ok"
+        assert self.router.admission.admitted == 4
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,12 +3,16 @@
 Test suite for memory management
 """
 
+import time
+import httpx
 import pytest
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.ai_team_router import AITeamRouter
+import src.ai_team_router as ai_team_router
+from src.ai_team_router import AITeamRouter, AsyncOptimizedHTTPClient, MemorySample, MemorySampler
+from tests.fake_ollama import FakeOllama
 
 class TestMemory:
     def setup_method(self):
@@ -61,6 +65,64 @@ class TestMemory:
         
         member_id, member = self.router.select_team_member(requirements)
         assert member_id == "gemma_tiny"  # Emergency fallback
+    
+    @pytest.mark.asyncio
+    async def test_unload_returns_when_model_leaves_ps(self):
+        """Test that unload completes on the /api/ps signal instead of fixed sleeps"""
+        async with FakeOllama(unload_delay=0.3) as server:
+            server.loaded["mistral:latest"] = 4 * 1024 ** 3
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            
+            start = time.time()
+            unloaded = await self.router._unload_model("mistral:latest")
+            elapsed = time.time() - start
+            await self.router.close()
+        
+        assert unloaded == True
+        assert 0.3 <= elapsed < 3.0
+        assert "mistral:latest" not in server.loaded
+
+def sample_at(timestamp, available_gb):
+    return MemorySample(timestamp=timestamp, available_gb=available_gb, percent=50.0, swap_used_gb=0.0, swap_percent=0.0)
+
+class TestMemorySampler:
+    def test_ring_buffer_is_bounded(self):
+        """Test that the buffer keeps only the newest samples"""
+        sampler = MemorySampler(size=3)
+        for _ in range(5):
+            sampler.sample()
+        assert len(sampler.samples) == 3
+    
+    def test_stale_buffer_samples_on_demand(self):
+        """Test that latest() refreshes when the background sampler is not running"""
+        sampler = MemorySampler()
+        sampler.samples.append(sample_at(time.time() - 60, 1.0))
+        latest = sampler.latest()
+        assert latest.timestamp > time.time() - 1
+        assert len(sampler.samples) == 2
+    
+    def test_trend_discounts_available_memory(self):
+        """Test that a falling trend lowers the memory routing sees"""
+        router = AITeamRouter()
+        now = time.time()
+        for i in range(5):
+            router.memory_sampler.samples.append(sample_at(now - 4 + i, 20.0 - i))
+        assert router.memory_sampler.trend_gb_per_s() == pytest.approx(-1.0)
+        
+        flat = AITeamRouter()
+        flat.memory_sampler.samples.append(sample_at(now, 16.0))
+        assert router._get_available_memory_gb() < flat._get_available_memory_gb()
+    
+    @pytest.mark.asyncio
+    async def test_samples_endpoint(self):
+        """Test that the raw series is served for debugging"""
+        ai_team_router.router.memory_sampler.sample()
+        transport = httpx.ASGITransport(app=ai_team_router.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://router") as client:
+            response = await client.get("/api/memory/samples", params={"seconds": 60})
+        body = response.json()
+        assert body["buffered"] >= 1
+        assert {"timestamp", "available_gb", "percent", "swap_used_gb", "swap_percent"} <= set(body["samples"][-1])
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test suite for per-request phase timings and the /metrics endpoint
+"""
+
+import pytest
+import httpx
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.ai_team_router as ai_team_router
+from src.ai_team_router import AITeamRouter, AsyncOptimizedHTTPClient, LatencyHistogram, LATENCY_BUCKETS_S
+from tests.fake_ollama import FakeOllama
+
+class TestLatencyHistogram:
+    def test_constant_memory_and_quantiles(self):
+        """Test that buckets are fixed and quantiles land on the right bucket bound"""
+        histogram = LatencyHistogram()
+        for i in range(10_000):
+            histogram.record(0.05 if i % 10 else 30.0)
+        assert len(histogram.counts) == len(LATENCY_BUCKETS_S) + 1
+        assert 0.05 <= histogram.quantile(0.5) < 0.08
+        assert 30.0 <= histogram.quantile(0.95) < 45.0
+        assert histogram.sum == pytest.approx(9000 * 0.05 + 1000 * 30.0)
+        assert list(histogram.cumulative())[-1] == (float("inf"), 10_000)
+
+class TestPhaseTimings:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 32.0
+
+    @pytest.mark.asyncio
+    async def test_stream_reports_every_phase(self):
+        """Test that a cold streamed request is broken into phases and recorded per member and domain"""
+        async with FakeOllama(response_text="a b c", chunk_delay=0.01) as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            events = [e async for e in self.router.stream_request("Create a Vue component")]
+            await self.router.close()
+
+        timings = events[-1]["metadata"]["timings"]
+        assert {"queue_wait", "analysis", "unload", "load", "first_token", "generation", "total"} <= set(timings)
+        assert timings["total"] >= timings["load"] + timings["generation"]
+        assert "planned_at" not in events[-1]["metadata"]["requirements"]
+        summary = self.router.get_status()["latency"]
+        assert summary["phases"]["load"]["deepcoder_primary:coding"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint_text_format(self):
+        """Test that /metrics serves histograms and gauges in Prometheus text format"""
+        async with FakeOllama(response_text="hi") as server:
+            ai_team_router.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            transport = httpx.ASGITransport(app=ai_team_router.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://router") as client:
+                await client.post("/api/chat", json={"prompt": "Simple question", "context": {"cache": False}})
+                response = await client.get("/metrics")
+            await ai_team_router.router.close()
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert "# TYPE ai_router_phase_seconds histogram" in text
+        assert 'ai_router_phase_seconds_bucket{phase="total",' in text
+        assert 'le="+Inf"}' in text
+        assert "ai_router_queue_depth 0" in text
+        assert 'ai_router_admission_total{decision="rejected"}' in text
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test suite for the declarative team registry
+"""
+
+import asyncio
+import json
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_team_router import AITeamRouter, AsyncOptimizedHTTPClient, TeamRegistry, TEAM_CONFIG_PATH
+from tests.fake_ollama import FakeOllama
+
+def write_config(path, config):
+    with open(path, "w") as f:
+        json.dump(config, f)
+    # Bump mtime explicitly so back-to-back writes are always seen as a change
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+class TestTeamRegistry:
+    def setup_method(self):
+        with open(TEAM_CONFIG_PATH) as f:
+            self.config = json.load(f)
+
+    def test_shipped_config_routes(self):
+        """Test that flag variants take precedence over the plain domain route"""
+        table = TeamRegistry().table
+        assert len(table.members) == 11
+        assert table.groups_for("coding", ("vue_react",))[0] == ("BEST", ("deepcoder_primary",))
+        assert table.groups_for("coding", ("php",))[0] == ("BEST", ("deepseek_legacy",))
+        assert table.groups_for("coding", ())[0] == ("BEST", ("deepcoder_primary", "deepseek_legacy"))
+        assert table.groups_for("unknown", ()) == table.groups_for("default", ())
+
+    def test_table_is_read_only(self):
+        """Test that the precomputed table cannot be mutated in place"""
+        table = TeamRegistry().table
+        with pytest.raises(TypeError):
+            table.members["extra"] = table.members["gemma_tiny"]
+
+    def test_reload_swaps_table_on_change(self, tmp_path):
+        """Test that an edited file replaces the table and the router sees the new routes"""
+        path = str(tmp_path / "team.json")
+        write_config(path, self.config)
+        router = AITeamRouter()
+        router.registry = TeamRegistry(path)
+        router._get_available_memory_gb = lambda: 32.0
+        assert router._plan_request("Process this Excel file", {})[1] == "qwen_analyst"
+
+        self.config["routes"]["enterprise"]["best"] = ["granite_enterprise"]
+        write_config(path, self.config)
+        assert router.registry.reload_if_changed()
+        assert not router.registry.reload_if_changed()
+        assert router.registry.table.version == 2
+        assert router._plan_request("Process this Excel file", {})[1] == "granite_enterprise"
+
+    def test_invalid_file_keeps_current_table(self, tmp_path):
+        """Test that unknown members or broken JSON are rejected without a swap"""
+        path = str(tmp_path / "team.json")
+        write_config(path, self.config)
+        registry = TeamRegistry(path)
+        table = registry.table
+
+        self.config["routes"]["data"]["best"] = ["no_such_member"]
+        write_config(path, self.config)
+        assert not registry.reload_if_changed()
+        assert registry.table is table
+        assert "no_such_member" in registry.last_error
+
+        with open(path, "w") as f:
+            f.write("{not json")
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2_000_000_000))
+        assert not registry.reload_if_changed()
+        assert registry.reload_errors == 2
+
+    @pytest.mark.asyncio
+    async def test_reload_replans_queued_work_for_removed_member(self, tmp_path):
+        """Test that queued requests and planned residency for a dropped member survive a reload"""
+        path = str(tmp_path / "team.json")
+        write_config(path, self.config)
+        router = AITeamRouter()
+        router.registry = TeamRegistry(path)
+        router._team_table = router.registry.table
+        router._get_available_memory_gb = lambda: 32.0
+        router.residency.planned = frozenset({"qwen_analyst", "gemma_tiny"})
+
+        async with FakeOllama(response_text="done", delay=0.2) as server:
+            router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            busy = asyncio.ensure_future(router.submit_request("Create a Vue component"))
+            await asyncio.sleep(0.05)  # The only backend is now busy
+            queued = asyncio.ensure_future(router.submit_request("Process this Excel file"))
+            await asyncio.sleep(0.05)
+            assert router.request_queue.pending[0].member_id == "qwen_analyst"
+
+            del self.config["members"]["qwen_analyst"]
+            for spec in self.config["routes"].values():
+                for group, member_ids in spec.items():
+                    spec[group] = [m for m in member_ids if m != "qwen_analyst"]
+            write_config(path, self.config)
+            assert router.registry.reload_if_changed()
+            status = router.get_status()  # Costing the stale item must not raise
+
+            results = await asyncio.wait_for(asyncio.gather(busy, queued), timeout=5)
+            await router.close()
+
+        assert status["queue"]["depth"] == 1
+        assert "error" not in results[1]["metadata"]
+        assert results[1]["metadata"]["member_id"] in router.team_members
+        assert router.residency.planned <= {"gemma_tiny"}
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Test suite for warm-model residency
+"""
+
+import asyncio
+from datetime import datetime
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_team_router import AITeamRouter, AsyncOptimizedHTTPClient, ModelResidencyManager, CoResidencyPlanner, TransitionPredictor, MemberPerformanceTracker
+from src.ai_team_router import keep_alive_seconds, MODEL_KEEP_ALIVE, MODEL_IDLE_TTL_S
+from tests.fake_ollama import FakeOllama
+
+class TestResidency:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.team = self.router.team_members
+    
+    def test_no_eviction_when_member_fits(self):
+        """Test that warm models stay loaded while the next member fits"""
+        residency = ModelResidencyManager(budget_gb=64)
+        residency.mark_loaded("gemma_tiny", self.team["gemma_tiny"])
+        victims = residency.plan_evictions("granite_moe", self.team["granite_moe"], available_gb=10.0)
+        assert victims == []
+    
+    def test_evicts_cold_large_model_first(self):
+        """Test that eviction prefers rarely used models and frees just enough memory"""
+        residency = ModelResidencyManager(budget_gb=64)
+        residency.mark_loaded("deepcoder_primary", self.team["deepcoder_primary"])
+        residency.mark_loaded("gemma_tiny", self.team["gemma_tiny"])
+        for _ in range(5):
+            residency.touch("gemma_tiny")
+        
+        victims = residency.plan_evictions("qwen_analyst", self.team["qwen_analyst"], available_gb=2.0)
+        assert victims == ["deepcoder_primary"]
+    
+    def test_budget_limits_residency(self):
+        """Test that the residency budget forces eviction even with free RAM"""
+        residency = ModelResidencyManager(budget_gb=10)
+        residency.mark_loaded("deepcoder_primary", self.team["deepcoder_primary"])
+        victims = residency.plan_evictions("mistral_versatile", self.team["mistral_versatile"], available_gb=50.0)
+        assert victims == ["deepcoder_primary"]
+    
+    def test_knapsack_prefers_several_small_members(self):
+        """Test that the planner packs the small members that together save the most load time"""
+        planner = CoResidencyPlanner()
+        candidates = {
+            "gemma_tiny": (0.8, 1.0),
+            "granite_moe": (2.0, 2.0),
+            "granite_vision": (2.4, 2.0),
+            "mistral_versatile": (4.4, 3.0)
+        }
+        plan = planner.solve(candidates, budget_gb=5.5)
+        assert plan == {"gemma_tiny", "granite_moe", "granite_vision"}
+    
+    def test_replan_on_traffic_drift(self):
+        """Test that the plan is recomputed when the traffic mix changes"""
+        planner = CoResidencyPlanner(half_life_requests=5)
+        for _ in range(10):
+            planner.observe("gemma_tiny")
+        planner.replan(self.team, lambda member_id: 2.0, budget_gb=6.0, memory_percent=50)
+        assert planner.plan == {"gemma_tiny"}
+        assert planner.needs_replan(memory_percent=51) == False
+        
+        for _ in range(10):
+            planner.observe("granite_vision")
+        assert planner.needs_replan(memory_percent=51) == True
+        assert planner.needs_replan(memory_percent=70) == True
+    
+    def test_eviction_spares_planned_members(self):
+        """Test that members in the co-residency plan are evicted last"""
+        residency = ModelResidencyManager(budget_gb=64)
+        residency.mark_loaded("gemma_tiny", self.team["gemma_tiny"])
+        residency.mark_loaded("granite_moe", self.team["granite_moe"])
+        for _ in range(5):
+            residency.touch("gemma_tiny")  # Would otherwise be kept over granite_moe
+        residency.planned = frozenset({"granite_moe"})
+        
+        victims = residency.plan_evictions("mistral_versatile", self.team["mistral_versatile"], available_gb=4.0)
+        assert victims == ["gemma_tiny"]
+    
+    @pytest.mark.asyncio
+    async def test_back_to_back_requests_hit_warm_model(self):
+        """Test that a repeated member is served without unloading or reloading"""
+        async with FakeOllama(response_text="done") as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            self.router._get_available_memory_gb = lambda: 32.0
+            
+            first = await self.router.route_request("Create a Vue component")
+            second = await self.router.route_request("Create a React component")
+            await self.router.close()
+        
+        assert first["metadata"]["warm_hit"] == False
+        assert second["metadata"]["warm_hit"] == True
+        assert not any(r.get("keep_alive") == 0 for r in server.requests)
+        assert self.router.residency.is_resident("deepcoder_primary")
+
+    def test_idle_ttl_follows_keep_alive(self):
+        """Test that Ollama keep_alive durations convert to the residency idle TTL"""
+        assert keep_alive_seconds("30m") == 1800
+        assert keep_alive_seconds("1h30m") == 5400
+        assert keep_alive_seconds("300") == 300
+        assert keep_alive_seconds(-1) == float("inf")
+        assert MODEL_IDLE_TTL_S == keep_alive_seconds(MODEL_KEEP_ALIVE)
+        with pytest.raises(ValueError):
+            keep_alive_seconds("30 minutes")
+
+    def test_predictor_learns_transitions_and_scores(self):
+        """Test transition-based prediction and hit/miss accounting"""
+        predictor = TransitionPredictor()
+        morning = datetime(2026, 3, 2, 8, 0)
+        for member_id in ["gemma_tiny", "qwen_analyst"] * 3:
+            predictor.record(member_id, morning)
+        
+        predictor.last_member = "gemma_tiny"
+        member_id, confidence = predictor.predict(morning)
+        assert member_id == "qwen_analyst"
+        assert confidence > 0.5
+        
+        predictor.record("qwen_analyst", morning)
+        predictor.predict(morning)
+        predictor.record("deepcoder_primary", morning)
+        assert predictor.hits == 1
+        assert predictor.misses == 1
+    
+    def test_predictor_uses_hour_of_day(self):
+        """Test that hour-of-day usage predicts the first request of a session"""
+        predictor = TransitionPredictor()
+        predictor.record("qwen_analyst", datetime(2026, 3, 2, 8, 15))
+        predictor.record("deepcoder_primary", datetime(2026, 3, 2, 14, 0))
+        predictor.last_member = None  # New session
+        
+        assert predictor.predict(datetime(2026, 3, 3, 8, 5))[0] == "qwen_analyst"
+    
+    @pytest.mark.asyncio
+    async def test_idle_preload_warms_predicted_member(self):
+        """Test that an idle router preloads the predicted member"""
+        async with FakeOllama() as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            self.router._get_available_memory_gb = lambda: 32.0
+            self.router.preload_idle_s = 0
+            for member_id in ["gemma_tiny", "qwen_analyst", "gemma_tiny", "qwen_analyst", "gemma_tiny"]:
+                self.router.predictor.record(member_id)
+            
+            preloaded = await self.router._preload_predicted()
+            await self.router.close()
+        
+        assert preloaded == "qwen_analyst"
+        assert "qwen2.5:14b" in server.loaded
+        assert self.router.predictor.preloads == 1
+
+    @pytest.mark.asyncio
+    async def test_plan_preload_yields_to_request_for_other_member(self):
+        """Test that the plan preload runs off the queue and is cancelled by a request for another member"""
+        async with FakeOllama(response_text="done", delay=0.3) as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            self.router._get_available_memory_gb = lambda: 32.0
+            self.router.residency.planned = frozenset({"qwen_analyst"})
+            
+            self.router._schedule_residency_plan()
+            preload = self.router._plan_preload_task
+            await asyncio.sleep(0.05)
+            assert self.router._speculative_loads[self.router.backends.primary][1] == "qwen_analyst"
+            result = await self.router.submit_request("Create a Vue component", {"cache": False})
+            await self.router.close()
+        
+        assert result["metadata"]["member_id"] == "deepcoder_primary"
+        assert preload.cancelled()
+        assert not self.router.residency.is_resident("qwen_analyst")
+        assert self.router.residency.is_resident("deepcoder_primary")
+
+    @pytest.mark.asyncio
+    async def test_idle_preload_yields_to_request_for_other_member(self):
+        """Test that a request for another member cancels the predictive preload instead of queuing behind it"""
+        async with FakeOllama(response_text="done", delay=0.5) as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            self.router._get_available_memory_gb = lambda: 32.0
+            self.router.preload_idle_s = 0
+            for member_id in ["gemma_tiny", "qwen_analyst", "gemma_tiny", "qwen_analyst", "gemma_tiny"]:
+                self.router.predictor.record(member_id)
+            
+            preload = asyncio.create_task(self.router._preload_predicted())
+            await asyncio.sleep(0.05)
+            started = asyncio.get_running_loop().time()
+            result = await self.router.submit_request("Create a Vue component", {"cache": False})
+            elapsed = asyncio.get_running_loop().time() - started
+            preloaded = await preload
+            await self.router.close()
+        
+        assert result["metadata"]["member_id"] == "deepcoder_primary"
+        assert elapsed < 1.4  # Its own load and generation, not the preload's remaining 0.45s on top
+        assert preloaded is None
+        assert self.router.predictor.preloads == 0
+        assert not self.router.residency.is_resident("qwen_analyst")
+    
+    @pytest.mark.asyncio
+    async def test_idle_preload_never_evicts(self):
+        """Test that a guess does not displace a warm model"""
+        async with FakeOllama() as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            self.router._get_available_memory_gb = lambda: 12.0
+            self.router.preload_idle_s = 0
+            self.router.residency.mark_loaded("deepcoder_primary", self.team["deepcoder_primary"])
+            for member_id in ["gemma_tiny", "qwen_analyst", "gemma_tiny", "qwen_analyst", "gemma_tiny"]:
+                self.router.predictor.record(member_id)
+            
+            preloaded = await self.router._preload_predicted()
+            await self.router.close()
+        
+        assert preloaded is None
+        assert server.requests == []
+        assert self.router.residency.is_resident("deepcoder_primary")
+
+class TestLearnedFootprint:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 32.0
+    
+    @pytest.mark.asyncio
+    async def test_load_measures_footprint_from_ps(self):
+        """Test that a cold load records Ollama's reported size and residency uses it"""
+        async with FakeOllama() as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            member = self.router.team_members["deepcoder_primary"]
+            await self.router._ensure_resident("deepcoder_primary", member, timeout=30)
+            await self.router.close()
+        
+        assert self.router.member_stats.estimate("deepcoder_primary", "footprint_gb") == pytest.approx(2.0)
+        assert self.router.residency.resident["deepcoder_primary"].memory_gb == pytest.approx(2.0)
+        assert self.router._footprint_gb("deepcoder_primary") == pytest.approx(2.0)
+    
+    def test_learned_footprint_drives_admission(self):
+        """Test that a measured footprint replaces the static estimate in selection"""
+        self.router._get_available_memory_gb = lambda: 3.0
+        requirements = self.router._analyze_task("Create a Vue component", {})
+        self.router.member_stats.record("deepcoder_primary", "footprint_gb", 2.5)
+        member_id, _ = self.router.select_team_member(requirements)
+        assert member_id == "deepcoder_primary"
+        assert self.router._learned_footprint_gb("qwen_analyst") is None
+    
+    def test_eviction_uses_footprint(self):
+        """Test that plan_evictions honours a measured footprint"""
+        residency = ModelResidencyManager(budget_gb=64)
+        team = self.router.team_members
+        residency.mark_loaded("gemma_tiny", team["gemma_tiny"])
+        assert residency.plan_evictions("qwen_analyst", team["qwen_analyst"], available_gb=4.0) == ["gemma_tiny"]
+        assert residency.plan_evictions("qwen_analyst", team["qwen_analyst"], available_gb=4.0, footprint_gb=3.5) == []
+    
+    def test_stats_persist_across_instances(self, tmp_path):
+        """Test that learned EWMAs and samples are saved and reloaded"""
+        path = str(tmp_path / "member_stats.json")
+        stats = MemberPerformanceTracker(path=path)
+        stats.record("granite_moe", "footprint_gb", 2.2)
+        stats.record("granite_moe", "footprint_gb", 2.6)
+        stats.save()
+        
+        reloaded = MemberPerformanceTracker(path=path)
+        assert reloaded.estimate("granite_moe", "footprint_gb") == pytest.approx(stats.estimate("granite_moe", "footprint_gb"))
+        assert reloaded.count("granite_moe", "footprint_gb") == 2
+
+class TestContextSizing:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 64.0
+        self.team = self.router.team_members
+    
+    def test_smallest_adequate_step(self):
+        """Test that short prompts keep the small context and long ones get a larger step"""
+        member = self.team["deepcoder_primary"]
+        assert self.router._select_num_ctx("deepcoder_primary", member, "hi") == (2048, False)
+        assert self.router._select_num_ctx("deepcoder_primary", member, "x" * 30_000) == (16384, False)
+        assert self.router._select_num_ctx("gemma_tiny", self.team["gemma_tiny"], "x" * 100_000) == (8192, True)
+    
+    def test_long_prompt_routes_to_large_context_member(self):
+        """Test that members whose context cannot hold the prompt are skipped"""
+        requirements = self.router._analyze_task("Refactor this module\n" + "x" * 200_000, {})
+        member_id, _ = self.router.select_team_member(requirements)
+        assert member_id == "deepseek_legacy"
+    
+    def test_kv_cache_added_to_footprint(self):
+        """Test that a larger context raises the admission footprint by its KV-cache"""
+        base = self.router._footprint_gb("deepseek_legacy")
+        large = self.router._footprint_gb("deepseek_legacy", num_ctx=65536)
+        assert large - base == pytest.approx(270 * (65536 - 2048) / 1000 / 1024)
+    
+    @pytest.mark.asyncio
+    async def test_output_reserve_matches_sent_num_predict(self):
+        """Test that num_ctx reserves room for exactly the output cap Ollama is told to honour"""
+        async with FakeOllama() as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            await self.router.route_request("Simple question", {"max_tokens": 3000, "cache": False})
+            await self.router.close()
+        
+        generation = next(r for r in server.requests if r.get("prompt"))
+        assert generation["options"]["num_predict"] == 3000
+        assert generation["options"]["num_ctx"] == 4096
+        assert self.router._context_tokens_needed("hi", {"num_predict": "3000"}) == 3000
+    
+    @pytest.mark.asyncio
+    async def test_resident_context_reused_then_grown(self):
+        """Test that a big enough resident context is reused and a larger one triggers a reload"""
+        async with FakeOllama() as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            member = self.team["deepcoder_primary"]
+            await self.router._ensure_resident("deepcoder_primary", member, timeout=30, num_ctx=16384)
+            assert self.router._select_num_ctx("deepcoder_primary", member, "hi") == (16384, False)
+            warm, _ = await self.router._ensure_resident("deepcoder_primary", member, timeout=30, num_ctx=16384)
+            assert warm == True
+            warm, _ = await self.router._ensure_resident("deepcoder_primary", member, timeout=30, num_ctx=32768)
+            await self.router.close()
+        
+        assert warm == False
+        assert [r["options"]["num_ctx"] for r in server.requests] == [16384, 32768]
+        assert self.router.residency.resident["deepcoder_primary"].num_ctx == 32768
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -8,7 +8,7 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.ai_team_router import AITeamRouter
+from src.ai_team_router import AITeamRouter, KeywordClassifier
 
 class TestRouting:
     def setup_method(self):
@@ -57,5 +57,54 @@ class TestRouting:
         )
         assert complex >= 4
 
+class TestKeywordClassifier:
+    def test_substring_and_case_semantics(self):
+        """Test that flags match case-insensitive substrings, as the old `in` checks did"""
+        classifier = KeywordClassifier()
+        assert classifier.classify("Build a ReactNative screen") == ("vue_react",)
+        assert classifier.classify("Refactor the Laravel DATABASE layer") == ("php", "data", "complex")
+        assert classifier.classify("imagexcel") == ("enterprise", "visual")
+        assert classifier.classify("What is 2+2?") == ()
+    
+    def test_analyze_task_uses_flags(self):
+        """Test that requirements derive from a single classification"""
+        router = AITeamRouter()
+        requirements = router._analyze_task("Port this PHP screenshot tool", {})
+        assert requirements["keywords"] == ("php", "visual")
+        assert requirements["domain"] == "coding"
+        assert requirements["needs_vision"] == True
+        assert requirements["needs_338_languages"] == True
+
+class TestLatencySelection:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 64.0
+        self.router.residency.mark_loaded("mistral_versatile", self.router.team_members["mistral_versatile"])
+    
+    def test_resident_member_wins_simple_low_priority(self):
+        """Test that a warm QUICK member beats a cold BEST one when quality matters little"""
+        requirements = self.router._analyze_task("Write a simple helper", {"priority": "low", "selection": "latency"})
+        member_id, _ = self.router.select_team_member(requirements)
+        assert member_id == "mistral_versatile"
+        
+        breakdown = requirements["selection_breakdown"]
+        assert breakdown["chosen"] == "mistral_versatile"
+        assert breakdown["candidates"]["mistral_versatile"]["load_s"] == 0.0
+        assert breakdown["candidates"]["deepcoder_primary"]["load_s"] > 0
+        assert {"unload_s", "prompt_eval_s", "generation_s", "latency_s", "quality", "score"} <= set(breakdown["candidates"]["deepcoder_primary"])
+    
+    def test_quality_wins_for_normal_work(self):
+        """Test that normal-priority work still pays the swap for the BEST member"""
+        requirements = self.router._analyze_task("Write a helper", {"selection": "latency"})
+        member_id, _ = self.router.select_team_member(requirements)
+        assert member_id == "deepcoder_primary"
+    
+    def test_tiers_mode_is_default(self):
+        """Test that the fixed tier walk is unchanged unless latency mode is requested"""
+        requirements = self.router._analyze_task("Write a simple helper", {"priority": "low"})
+        member_id, _ = self.router.select_team_member(requirements)
+        assert member_id == "deepcoder_primary"
+        assert "selection_breakdown" not in requirements
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
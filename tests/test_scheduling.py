@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test suite for request queueing and scheduling
+"""
+
+import asyncio
+import httpx
+import json
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.ai_team_router as ai_team_router
+from src.ai_team_router import AITeamRouter, AsyncOptimizedHTTPClient, AffinityRequestQueue, AdmissionController, ResponseCache
+from tests.fake_ollama import FakeOllama
+
+class TestAffinityQueue:
+    def _fill(self, queue, member_ids, context=None):
+        return [queue.put("prompt", dict(context or {}), {}, member_id) for member_id in member_ids]
+    
+    def _cost(self, loaded, costs=None):
+        """Cost function where loaded members have no load time"""
+        costs = costs or {}
+        return lambda item: costs.get(item.member_id, 10.0) + (0.0 if item.member_id in loaded else 20.0)
+    
+    @pytest.mark.asyncio
+    async def test_drains_loaded_member_first(self):
+        """Test that queued work for the loaded member is served before a swap"""
+        queue = AffinityRequestQueue(max_wait_s=60)
+        self._fill(queue, ["deepcoder_primary", "qwen_analyst", "deepcoder_primary", "qwen_analyst"])
+        cost = self._cost({"deepcoder_primary"})
+        
+        order = [queue.select_next(cost).member_id for _ in range(2)]
+        assert order == ["deepcoder_primary", "deepcoder_primary"]
+        assert queue.select_next(cost).member_id == "qwen_analyst"
+    
+    @pytest.mark.asyncio
+    async def test_bounded_wait(self):
+        """Test that a request past max_wait is served even if another model is loaded"""
+        queue = AffinityRequestQueue(max_wait_s=5)
+        starving, _ = self._fill(queue, ["qwen_analyst", "deepcoder_primary"])
+        starving.enqueued_at -= 10
+        
+        assert queue.select_next(self._cost({"deepcoder_primary"})) is starving
+        assert queue.forced_by_wait == 1
+    
+    @pytest.mark.asyncio
+    async def test_high_priority_jumps_batch(self):
+        """Test that an interactive request is not stuck behind low-priority batch work"""
+        queue = AffinityRequestQueue(max_wait_s=600, aging_s=60)
+        self._fill(queue, ["deepseek_legacy"] * 3, {"priority": "low"})
+        interactive, = self._fill(queue, ["gemma_tiny"], {"priority": "high"})
+        
+        assert queue.select_next(self._cost({"deepseek_legacy"})) is interactive
+    
+    @pytest.mark.asyncio
+    async def test_shortest_expected_job_within_class(self):
+        """Test that cheaper jobs run first within a priority class"""
+        queue = AffinityRequestQueue(max_wait_s=600)
+        long_job, short_job = self._fill(queue, ["deepseek_legacy", "gemma_tiny"])
+        cost = self._cost({"deepseek_legacy", "gemma_tiny"}, {"deepseek_legacy": 300.0, "gemma_tiny": 5.0})
+        
+        assert queue.select_next(cost) is short_job
+        assert short_job.expected_cost_s == 5.0
+    
+    @pytest.mark.asyncio
+    async def test_aging_promotes_long_jobs(self):
+        """Test that a waiting low-priority job eventually outranks fresh normal work"""
+        queue = AffinityRequestQueue(max_wait_s=600, aging_s=30)
+        old_low, = self._fill(queue, ["deepseek_legacy"], {"priority": "low"})
+        self._fill(queue, ["gemma_tiny"])
+        old_low.enqueued_at -= 65  # Two aging intervals: low -> high
+        
+        assert queue.select_next(self._cost(set())) is old_low
+    
+    @pytest.mark.asyncio
+    async def test_interleaved_workload_swaps_once_per_member(self):
+        """Test that an interleaved coding/Excel burst is grouped by member"""
+        router = AITeamRouter()
+        async with FakeOllama() as server:
+            router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            router._get_available_memory_gb = lambda: 12.0
+            router.residency.budget_gb = 10.0  # Only one 9GB model fits at a time
+            
+            prompts = ["Create a Vue component", "Write an Excel VBA macro"] * 2
+            results = await asyncio.gather(*(router.submit_request(p) for p in prompts))
+            await router.close()
+        
+        assert router.request_queue.swaps == 2
+        assert all("queue_wait" in r["metadata"] for r in results)
+        assert [r["metadata"]["member_id"] for r in results] == [
+            "deepcoder_primary", "qwen_analyst", "deepcoder_primary", "qwen_analyst"
+        ]
+
+class TestAdmissionControl:
+    def test_retry_after_is_time_until_deadline_fits(self):
+        """Test that Retry-After covers only the part of the backlog that breaks the deadline"""
+        admission = AdmissionController(default_deadline_s=60)
+        assert admission.evaluate(30.0, 20.0) is None
+        assert admission.evaluate(0.0, 500.0) is None  # An empty backlog always admits
+        assert admission.evaluate(50.0, 20.0) == 10
+        assert admission.evaluate(50.0, 20.0, deadline_s=5) == 50
+    
+    @pytest.mark.asyncio
+    async def test_rejects_when_backlog_misses_deadline(self):
+        """Test that queued work ahead of a request is priced from learned service times"""
+        router = AITeamRouter()
+        router._get_available_memory_gb = lambda: 32.0
+        for _ in range(4):
+            router.request_queue.put("prompt", {}, {"complexity": 3}, "qwen_analyst")
+        router.member_stats.record("qwen_analyst", "generation_time", 30.0)
+        router.member_stats.record("qwen_analyst", "load_time", 10.0)
+        
+        result = await router.submit_request("Create a Vue component", {"deadline_s": 60})
+        metadata = result["metadata"]
+        assert metadata["rejected"] and metadata["estimated_wait_s"] == 130.0
+        assert metadata["retry_after_s"] == 130  # Service time alone exceeds the deadline
+        
+        high = router._admission("deepcoder_primary", {}, {"priority": "high", "deadline_s": 60})
+        assert high[0] is None and high[1] == 0.0  # Normal-priority work does not queue ahead of it
+        status = router.get_status()["admission"]
+        assert status["rejected"] == 1 and status["estimated_wait_s"] == 130.0
+    
+    @pytest.mark.asyncio
+    async def test_chat_endpoints_return_429_with_retry_after(self):
+        """Test the HTTP surface of a rejection"""
+        router = ai_team_router.router
+        items = [router.request_queue.put("prompt", {}, {}, "qwen_analyst") for _ in range(3)]
+        transport = httpx.ASGITransport(app=ai_team_router.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://router") as client:
+                chat = await client.post("/api/chat", json={"prompt": "Create a Vue component", "context": {"deadline_s": 1}})
+                stream = await client.post("/api/chat/stream", json={"prompt": "Create a Vue component", "context": {"deadline_s": 1}})
+        finally:
+            for item in items:
+                router.request_queue.pending.remove(item)
+        
+        for response in (chat, stream):
+            assert response.status_code == 429
+            assert int(response.headers["Retry-After"]) == response.json()["metadata"]["retry_after_s"]
+
+    @pytest.mark.asyncio
+    async def test_cached_stream_is_not_rejected(self, tmp_path, monkeypatch):
+        """Test that a cache hit streams even when the backlog would reject queued work"""
+        router = ai_team_router.router
+        monkeypatch.setattr(router, "response_cache", ResponseCache(path=str(tmp_path / "cache.sqlite3")))
+        context = {"temperature": 0, "deadline_s": 1}
+        requirements, member_id = router._plan_request("Create a Vue component", context)
+        router._store_response(router._response_cache_key(member_id, "Create a Vue component", context),
+                               {"response": "cached", "metadata": {"member_id": member_id}})
+        rejected = router.admission.rejected
+        items = [router.request_queue.put("prompt", {}, {}, "qwen_analyst") for _ in range(20)]
+        transport = httpx.ASGITransport(app=ai_team_router.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://router") as client:
+                stream = await client.post("/api/chat/stream", json={"prompt": "Create a Vue component", "context": context})
+        finally:
+            for item in items:
+                router.request_queue.pending.remove(item)
+            router.response_cache.close()
+        
+        assert stream.status_code == 200
+        events = [json.loads(line) for line in stream.text.splitlines()]
+        assert events[0]["content"] == "cached"
+        assert events[-1]["metadata"]["cache_hit"] == True
+        assert router.admission.rejected == rejected
+        assert router.response_cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_endpoint_plans_and_admits_once(self, monkeypatch):
+        """Test that the pre-response admission decision is the one the stream uses and counts"""
+        router = ai_team_router.router
+        calls = {"plan": 0, "admission": 0}
+        plan_request, admission = router._plan_request, router._admission
+
+        def counted(name, fn):
+            def wrapper(*args, **kwargs):
+                calls[name] += 1
+                return fn(*args, **kwargs)
+            return wrapper
+
+        monkeypatch.setattr(router, "_plan_request", counted("plan", plan_request))
+        monkeypatch.setattr(router, "_admission", counted("admission", admission))
+        admitted = router.admission.admitted
+        async with FakeOllama(response_text="hi") as server:
+            router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            transport = httpx.ASGITransport(app=ai_team_router.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://router") as client:
+                response = await client.post("/api/chat/stream", json={"prompt": "Simple question", "context": {"cache": False}})
+            await router.close()
+
+        assert response.status_code == 200
+        assert calls == {"plan": 1, "admission": 1}
+        assert router.admission.admitted == admitted + 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test suite for the Chroma-backed semantic response cache
+"""
+
+import pytest
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_team_router import AITeamRouter, AsyncOptimizedHTTPClient
+from src.chroma_integration import ChromaIntegration, SemanticCache
+from tests.fake_ollama import FakeOllama
+
+class StoredAnswers:
+    """Stands in for ChromaMemory.search_cached_responses with fixed distances"""
+
+    def __init__(self, candidates):
+        self.candidates = candidates
+
+    def search_cached_responses(self, query, domain=None, n_results=3):
+        return [c for c in self.candidates if c["metadata"]["domain"] == domain][:n_results]
+
+    def get_collection_stats(self):
+        return {"response_cache": len(self.candidates)}
+
+class RecordingMemory(StoredAnswers):
+    """StoredAnswers that also answers the miss-path searches and records which thread called"""
+
+    def __init__(self, candidates):
+        super().__init__(candidates)
+        self.threads = []
+
+    def search_similar_conversations(self, query, n_results=5):
+        self.threads.append(threading.get_ident())
+        return []
+
+    def search_code_snippets(self, query, language=None, n_results=5):
+        self.threads.append(threading.get_ident())
+        return []
+
+    def store_conversation(self, prompt, response, metadata):
+        self.threads.append(threading.get_ident())
+
+def candidate(distance, member_id, response="cached answer", domain="coding"):
+    return {
+        "document": "Create a Vue component",
+        "distance": distance,
+        "metadata": {"member_id": member_id, "model": "m", "domain": domain, "response": response}
+    }
+
+class TestSemanticCache:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 32.0
+
+    def test_hit_within_threshold_from_equal_member(self):
+        """Test that a close answer from an equal-rated member is reused"""
+        cache = SemanticCache(StoredAnswers([candidate(0.01, "qwen_analyst")]), review_log_path=None)
+        hit = cache.lookup("Build a Vue component", "coding", "deepcoder_primary", self.router.team_members)
+        assert hit["metadata"]["response"] == "cached answer"
+        assert cache.get_stats()["domains"]["coding"]["distance_distribution"]["<=0.02"] == 1
+
+    def test_weaker_member_and_distant_answers_miss(self):
+        """Test that answers from lower-rated members or beyond the threshold are not served"""
+        memory = StoredAnswers([candidate(0.01, "gemma_tiny"), candidate(0.3, "deepcoder_primary")])
+        cache = SemanticCache(memory, review_log_path=None)
+        assert cache.lookup("Build a Vue component", "coding", "deepcoder_primary", self.router.team_members) is None
+        stats = cache.get_stats()["domains"]["coding"]
+        assert stats["rejected_member"] == 1
+        assert stats["misses"] == 1
+
+    def test_per_domain_threshold_and_false_hit_review(self, tmp_path):
+        """Test threshold overrides and that flagged hits count against the domain"""
+        log_path = str(tmp_path / "review.jsonl")
+        cache = SemanticCache(StoredAnswers([candidate(0.15, "deepcoder_primary")]),
+                              thresholds={"coding": 0.2}, review_log_path=log_path)
+        hit = cache.lookup("Build a Vue component", "coding", "deepcoder_primary", self.router.team_members)
+        assert cache.mark_false_hit(hit["review_id"])
+        assert not cache.mark_false_hit(hit["review_id"])
+        assert cache.get_stats()["domains"]["coding"]["false_hit_rate"] == 1.0
+        with open(log_path) as f:
+            assert len(f.readlines()) == 1
+
+    @pytest.mark.asyncio
+    async def test_enhanced_route_request_skips_model_on_hit(self):
+        """Test that a semantic hit never reaches the router's execution path"""
+        integration = ChromaIntegration.__new__(ChromaIntegration)
+        integration.router = self.router
+        integration.memory = StoredAnswers([candidate(0.01, "deepcoder_primary")])
+        integration.semantic_cache_enabled = True
+        integration.semantic_cache = SemanticCache(integration.memory, review_log_path=None)
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("model should not be called on a semantic cache hit")
+        self.router.route_request = fail
+
+        result = await integration.enhanced_route_request("Create a Vue component")
+        assert result["response"] == "cached answer"
+        assert result["metadata"]["semantic_cache_hit"] == True
+        assert result["metadata"]["selected_member_id"] == "deepcoder_primary"
+
+    @pytest.mark.asyncio
+    async def test_miss_plans_once_and_keeps_chroma_off_the_loop(self):
+        """Test that a miss hands its plan to route_request and runs Chroma calls in worker threads"""
+        integration = ChromaIntegration.__new__(ChromaIntegration)
+        integration.router = self.router
+        integration.memory = RecordingMemory([candidate(0.01, "deepcoder_primary", domain="data")])
+        integration.context_window = 5
+        integration.semantic_cache_enabled = True
+        integration.semantic_cache = SemanticCache(integration.memory, review_log_path=None)
+
+        plans = []
+        plan_request = self.router._plan_request
+        self.router._plan_request = lambda *args: plans.append(args) or plan_request(*args)
+
+        async with FakeOllama(response_text="fresh") as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            result = await integration.enhanced_route_request("Create a Vue component")
+            await self.router.close()
+
+        assert result["response"] == "fresh"
+        assert result["metadata"]["member_id"] == "deepcoder_primary"
+        assert len(plans) == 1
+        assert len(integration.memory.threads) == 3
+        assert threading.get_ident() not in integration.memory.threads
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test suite for token streaming
+"""
+
+import asyncio
+import json
+import pytest
+import httpx
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.ai_team_router as ai_team_router
+from src.ai_team_router import AITeamRouter, AsyncOptimizedHTTPClient, BackendPool, OllamaBackend, parse_stream_line
+from tests.fake_ollama import FakeOllama
+
+class TestStreaming:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 32.0
+    
+    @pytest.mark.asyncio
+    async def test_stream_request_yields_tokens_then_metadata(self):
+        """Test that tokens are forwarded before the final routing metadata"""
+        async with FakeOllama(response_text="one two three") as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            events = [event async for event in self.router.stream_request("Create a Vue component")]
+            await self.router.close()
+        
+        assert [e["type"] for e in events] == ["token", "token", "token", "done"]
+        assert "".join(e["content"] for e in events[:-1]) == "one two three "
+        metadata = events[-1]["metadata"]
+        assert metadata["member_id"] == "deepcoder_primary"
+        assert "queue_wait" in metadata
+        assert metadata["time_to_first_token"] is not None
+    
+    @pytest.mark.asyncio
+    async def test_stream_releases_queue_for_next_request(self):
+        """Test that a finished stream hands the queue back to buffered requests"""
+        async with FakeOllama(response_text="a b") as server:
+            self.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            events = [event async for event in self.router.stream_request("Create a Vue component")]
+            result = await self.router.submit_request("Create a React component")
+            await self.router.close()
+        
+        assert events[-1]["type"] == "done"
+        assert result["response"] == "a b"
+        assert result["metadata"]["warm_hit"] == True
+    
+    @pytest.mark.asyncio
+    async def test_chat_stream_endpoint_ndjson(self):
+        """Test the /api/chat/stream endpoint emits NDJSON events"""
+        async with FakeOllama(response_text="hi there") as server:
+            ai_team_router.router.ollama_client = AsyncOptimizedHTTPClient(server.base_url)
+            transport = httpx.ASGITransport(app=ai_team_router.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://router") as client:
+                response = await client.post("/api/chat/stream", json={"prompt": "Simple question", "context": {}})
+            await ai_team_router.router.close()
+        
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[-1]["type"] == "done"
+        assert "".join(e.get("content", "") for e in events) == "hi there "
+
+class TestSpeculativeDraft:
+    def setup_method(self):
+        self.router = AITeamRouter()
+        self.router._get_available_memory_gb = lambda: 32.0
+    
+    async def run(self, target, drafter, context):
+        self.router.backends = BackendPool([OllamaBackend(target.base_url, 24), OllamaBackend(drafter.base_url, 24)])
+        self.router.backends.backends[1].residency.mark_loaded("gemma_tiny", self.router.team_members["gemma_tiny"])
+        events = [e async for e in self.router.stream_request("Create a Vue component", context)]
+        await self.router.close()
+        return events
+    
+    @pytest.mark.asyncio
+    async def test_draft_streams_while_cold_member_loads(self):
+        """Test that a finished draft is labelled and followed by the selected member's answer"""
+        async with FakeOllama(response_text="final answer", delay=0.2) as target, FakeOllama(response_text="quick draft") as drafter:
+            events = await self.run(target, drafter, {"draft": True})
+        
+        types = [e["type"] for e in events]
+        assert types == ["draft_start", "draft", "draft", "draft_done", "token", "token", "done"]
+        assert "".join(e["content"] for e in events if e["type"] == "draft") == "quick draft "
+        assert events[3]["metadata"]["complete"] and not events[3]["metadata"]["replaced"]
+        metadata = events[-1]["metadata"]
+        assert metadata["member_id"] == "deepcoder_primary"
+        assert metadata["draft"]["member_id"] == "gemma_tiny"
+        assert drafter.requests[0]["options"]["num_predict"] == ai_team_router.DRAFT_MAX_TOKENS
+    
+    @pytest.mark.asyncio
+    async def test_slow_draft_is_cut_when_member_is_ready(self):
+        """Test that the answer replaces a draft still streaming when the load completes"""
+        async with FakeOllama(response_text="final", delay=0.1) as target, \
+                FakeOllama(response_text="a very long draft " * 10, chunk_delay=0.05) as drafter:
+            events = await self.run(target, drafter, {"draft": True})
+        
+        draft_done = next(e for e in events if e["type"] == "draft_done")
+        assert draft_done["metadata"]["replaced"]
+        assert [e["type"] for e in events][-2:] == ["token", "done"]
+    
+    @pytest.mark.asyncio
+    async def test_disconnect_during_draft_cancels_load(self):
+        """Test that a client leaving mid-draft stops the pending load before the backend is released"""
+        async with FakeOllama(response_text="final", delay=0.3) as target, \
+                FakeOllama(response_text="a very long draft " * 10, chunk_delay=0.05) as drafter:
+            self.router.backends = BackendPool([OllamaBackend(target.base_url, 24), OllamaBackend(drafter.base_url, 24)])
+            self.router.backends.backends[1].residency.mark_loaded("gemma_tiny", self.router.team_members["gemma_tiny"])
+            events = self.router.stream_request("Create a Vue component", {"draft": True, "coalesce": False})
+            assert (await events.__anext__())["type"] == "draft_start"
+            assert (await events.__anext__())["type"] == "draft"
+            await events.aclose()
+            await asyncio.sleep(0.5)  # Past the point the load would have finished
+            backend = self.router.backends.backends[0]
+            await self.router.close()
+
+        assert not backend.lock.locked()
+        assert not backend.residency.is_resident("deepcoder_primary")
+        assert not [t for t in asyncio.all_tasks() if "_prepare_member" in repr(t)]
+
+    @pytest.mark.asyncio
+    async def test_draft_holds_its_backend_lock(self):
+        """Test that the drafter's backend is locked while the draft streams and released after"""
+        async with FakeOllama(response_text="final answer", delay=0.2) as target, \
+                FakeOllama(response_text="a b c", chunk_delay=0.02) as drafter:
+            self.router.backends = BackendPool([OllamaBackend(target.base_url, 24), OllamaBackend(drafter.base_url, 24)])
+            draft_backend = self.router.backends.backends[1]
+            draft_backend.residency.mark_loaded("gemma_tiny", self.router.team_members["gemma_tiny"])
+            locked = []
+            async for event in self.router.stream_request("Create a Vue component", {"draft": True}):
+                if event["type"] == "draft":
+                    locked.append(draft_backend.lock.locked())
+            await self.router.close()
+        
+        assert locked and all(locked)
+        assert not draft_backend.lock.locked()
+        assert draft_backend.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_draft_skipped_when_its_backend_is_busy(self):
+        """Test that a busy drafter backend means no draft rather than racing its residency"""
+        async with FakeOllama(response_text="final", delay=0.1) as target, FakeOllama(response_text="draft") as drafter:
+            self.router.backends = BackendPool([OllamaBackend(target.base_url, 24), OllamaBackend(drafter.base_url, 24)])
+            draft_backend = self.router.backends.backends[1]
+            draft_backend.residency.mark_loaded("gemma_tiny", self.router.team_members["gemma_tiny"])
+            async with draft_backend.lock:
+                events = [e async for e in self.router.stream_request("Create a Vue component", {"draft": True})]
+            await self.router.close()
+        
+        assert [e["type"] for e in events] == ["token", "done"]
+        assert "draft" not in events[-1]["metadata"]
+        assert drafter.requests == []
+    
+    @pytest.mark.asyncio
+    async def test_no_draft_by_default(self):
+        """Test that drafting is opt-in"""
+        async with FakeOllama(response_text="final") as target, FakeOllama(response_text="draft") as drafter:
+            events = await self.run(target, drafter, {})
+        
+        assert [e["type"] for e in events] == ["token", "done"]
+        assert drafter.requests == []
+
+class TestStreamParsing:
+    def test_fast_path_matches_json(self):
+        """Test that the sliced token equals the JSON-decoded token"""
+        for token in [" hello", "", "naïve", "tab\tquote\"", "<div>"]:
+            line = json.dumps({"model": "m", "created_at": "t", "response": token, "done": False}, ensure_ascii=False).replace(", ", ",").replace(": ", ":").encode()
+            parsed, chunk = parse_stream_line(line)
+            assert parsed == token
+    
+    def test_final_chunk_is_fully_parsed(self):
+        """Test that the done object is decoded for its statistics"""
+        line = json.dumps({"model": "m", "response": "", "done": True, "eval_count": 12}).encode()
+        token, chunk = parse_stream_line(line)
+        assert token == ""
+        assert chunk["eval_count"] == 12
+    
+    @pytest.mark.asyncio
+    async def test_accumulation_is_opt_in(self):
+        """Test that TokenStream only keeps the text when asked to"""
+        async with FakeOllama(response_text="x y z") as server:
+            client = AsyncOptimizedHTTPClient(server.base_url)
+            plain = client.stream_tokens("gemma3:1b", "hi")
+            tokens = [token async for token in plain]
+            kept = client.stream_tokens("gemma3:1b", "hi", accumulate=True)
+            async for _ in kept:
+                pass
+            await client.close()
+        
+        assert tokens == ["x ", "y ", "z "]
+        assert plain.text == ""
+        assert kept.text == "x y z "
+        assert kept.final["done"] == True
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])